@@ -0,0 +1,132 @@
+"""Concurrent read/write load test against a throwaway database.
+
+Starts 1, 4 and 16 worker processes (like gunicorn workers), each
+driving the app through the Flask test client with a mix of dashboard
+views, task-list pages and progress saves, and prints the throughput
+and error count for each level.
+
+    python -m benchmarks.db_load
+    python -m benchmarks.db_load --workers 1 4 16 --duration 10
+    python -m benchmarks.db_load --database-url postgresql://.../scratch
+
+The database is dropped and reseeded first, so it runs against a fresh
+SQLite file unless --database-url names a scratch database; DATABASE_URL
+from the environment is ignored. Compare SQLITE_WAL=0 against the
+default to see the effect of WAL.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+
+def seed(users, topics_per_user):
+    from app import create_app
+    from benchmarks.seed import seed_database
+    from extensions import db
+
+    with create_app().app_context():
+        db.drop_all()
+        db.create_all()
+        return seed_database(users, subjects=4, topics=max(topics_per_user // 4, 1))
+
+
+def worker(user_ids, duration, write_ratio, results):
+    from app import create_app
+    from extensions import db
+    from models import StudyTask
+
+    app = create_app()
+    rng = random.Random(os.getpid())
+    client = app.test_client()
+    done = errors = 0
+    deadline = time.monotonic() + duration
+
+    try:
+        while time.monotonic() < deadline:
+            user_id = rng.choice(user_ids)
+            with client.session_transaction() as session:
+                session["user_id"] = user_id
+
+            try:
+                if rng.random() < write_ratio:
+                    with app.app_context():
+                        task_ids = [
+                            task_id for (task_id,) in db.session.query(StudyTask.id)
+                            .filter_by(user_id=user_id).limit(20)
+                        ]
+                    response = client.post("/tasks/update", data={
+                        "visible_tasks": task_ids,
+                        "completed_tasks": rng.sample(task_ids, k=len(task_ids) // 2),
+                    })
+                else:
+                    response = client.get(
+                        rng.choice(["/dashboard", "/tasks/all", "/tasks/today"])
+                    )
+                failed = response.status_code >= 500
+            except Exception:
+                # e.g. "database is locked" raised outside a request
+                failed = True
+
+            done += 1
+            errors += failed
+    finally:
+        # Always report, or run_level() would wait forever
+        results.put((done, errors))
+
+
+def run_level(processes, user_ids, duration, write_ratio):
+    results = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(
+            target=worker, args=(user_ids, duration, write_ratio, results)
+        )
+        for _ in range(processes)
+    ]
+
+    for process in workers:
+        process.start()
+    totals = [results.get() for _ in workers]
+    for process in workers:
+        process.join()
+
+    requests_done = sum(done for done, _ in totals)
+    errors = sum(errors for _, errors in totals)
+    return requests_done / duration, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--topics", type=int, default=200)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--database-url",
+                        help="scratch database to use; ALL ITS TABLES ARE DROPPED "
+                             "[default: a new SQLite file in a temp directory]")
+    args = parser.parse_args()
+
+    # Never whatever DATABASE_URL happens to be exported: seed() drops
+    # every table
+    workdir = tempfile.mkdtemp(prefix="studyplanner-load-")
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{workdir}/load.db"
+    os.environ["VIDEO_CACHE_PATH"] = os.path.join(workdir, "video_cache.db")
+    os.environ["VIDEO_PREFETCH_THREAD"] = "0"
+
+    # Seed in a child so no engine or pooled connection is inherited
+    # by the workers on fork
+    with multiprocessing.Pool(1) as pool:
+        user_ids = pool.apply(seed, (args.users, args.topics))
+
+    print(f"database: {os.environ['DATABASE_URL']}")
+    print(f"{'workers':>8} {'req/s':>10} {'errors':>8}")
+    for processes in args.workers:
+        throughput, errors = run_level(processes, user_ids, args.duration, args.write_ratio)
+        print(f"{processes:>8} {throughput:>10.1f} {errors:>8}")
+
+
+if __name__ == "__main__":
+    main()
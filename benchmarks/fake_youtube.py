@@ -0,0 +1,129 @@
+"""Local stand-in for the YouTube Data API search endpoint.
+
+Answers /search with made-up videos after a configurable delay, and
+fails a share of requests with 500s, 429s or a quotaExceeded 403, so
+the client's retries, circuit breaker and quota handling can be
+exercised without a key or network:
+
+    python -m benchmarks.fake_youtube --port 8765 --latency 0.2 --error-rate 0.3
+    YOUTUBE_API_URL=http://127.0.0.1:8765 python app.py
+
+``start()`` runs one in a background thread for scripts.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class FakeYouTube(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, error_rate=0.0, error_status=500,
+                 quota=None, seed=0):
+        super().__init__(address, Handler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        # Searches allowed before every request gets quotaExceeded
+        self.quota = quota
+        self.random = random.Random(seed)
+
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+
+        with server.lock:
+            server.requests += 1
+            count = server.requests
+            fail = server.random.random() < server.error_rate
+
+        if server.latency:
+            time.sleep(server.latency)
+
+        if not url.path.endswith("/search"):
+            return self.reply(404, {"error": {"code": 404, "message": "Not found"}})
+        if not params.get("key"):
+            return self.reply(400, {"error": {"code": 400, "message": "API key missing"}})
+        if server.quota is not None and count > server.quota:
+            return self.reply(403, {"error": {"code": 403, "errors": [
+                {"reason": "quotaExceeded", "message": "Quota exceeded"}
+            ]}})
+        if fail:
+            headers = {"Retry-After": "0"} if server.error_status == 429 else {}
+            return self.reply(server.error_status, {"error": {"code": server.error_status}}, headers)
+
+        query = params.get("q", [""])[0]
+        limit = int(params.get("maxResults", ["3"])[0])
+        self.reply(200, {"items": [
+            {
+                "id": {"videoId": f"fake{count}x{i}"},
+                "snippet": {
+                    "title": f"{query} #{i + 1}",
+                    "thumbnails": {"medium": {"url": f"https://i.ytimg.com/vi/fake{count}x{i}/mqdefault.jpg"}},
+                },
+            }
+            for i in range(limit)
+        ]})
+
+    def reply(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start(port=0, **options):
+    """Serve in a daemon thread; returns the server (see ``.url``)."""
+    server = FakeYouTube(("127.0.0.1", port), **options)
+    threading.Thread(target=server.serve_forever, name="fake-youtube", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="seconds before each answer")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="share of requests that fail")
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--quota", type=int, default=None,
+                        help="searches before quotaExceeded")
+    args = parser.parse_args()
+
+    server = FakeYouTube(("127.0.0.1", args.port), latency=args.latency,
+                         error_rate=args.error_rate, error_status=args.error_status,
+                         quota=args.quota)
+    print(f"Fake YouTube API on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""Dashboard latency while a burst of logins hits the same server.
+
+Runs the app in a threaded server in a child process, keeps a few
+logged-in clients loading their dashboards, and measures them first on
+their own, then while many more clients post to /login as fast as
+they can (right and wrong passwords). With hashing on its bounded pool
+the dashboard numbers should barely move between the two phases:
+
+    python -m benchmarks.login_storm
+    python -m benchmarks.login_storm --hash-workers 0    # hash inline, as before
+    python -m benchmarks.login_storm --throttle          # with the login limits on
+
+Every storm client comes from 127.0.0.1, so with --throttle almost all
+of the storm is answered with 429 once the per-IP burst is spent.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+
+SERVER = """
+import sys
+from werkzeug.serving import run_simple
+from app import create_app
+
+run_simple("127.0.0.1", int(sys.argv[1]), create_app(), threaded=True)
+"""
+
+
+def seed(users):
+    from app import create_app
+    from benchmarks.seed import seed_database
+    from extensions import db
+
+    with create_app().app_context():
+        db.drop_all()
+        db.create_all()
+        return seed_database(users, subjects=4, topics=25)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(base_url, timeout=30):
+    import requests
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f"{base_url}/login", timeout=1)
+            return
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+def login(session, base_url, user_id, password):
+    return session.post(
+        f"{base_url}/login",
+        data={"email": f"user{user_id}@example.com", "password": password},
+        allow_redirects=False,
+    )
+
+
+def dashboard_client(base_url, user_id, stop, timings):
+    import requests
+    from benchmarks.seed import PASSWORD
+
+    session = requests.Session()
+    login(session, base_url, user_id, PASSWORD)
+
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = session.get(f"{base_url}/dashboard", allow_redirects=False)
+        elapsed = time.perf_counter() - started
+        timings.append((time.monotonic(), elapsed, response.status_code))
+
+
+def storm_client(base_url, user_ids, stop, results, seed):
+    import requests
+    from benchmarks.seed import PASSWORD
+
+    rng = random.Random(seed)
+    while not stop.is_set():
+        session = requests.Session()
+        password = PASSWORD if rng.random() < 0.5 else "wrong password"
+        started = time.perf_counter()
+        response = login(session, base_url, rng.choice(user_ids), password)
+        results.append((time.perf_counter() - started, response.status_code))
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def summarize(label, timings, storm, seconds):
+    latencies = [elapsed * 1000 for _, elapsed, _ in timings]
+    line = (
+        f"{label:<8} {percentile(latencies, 0.5):>8.1f} {percentile(latencies, 0.9):>8.1f}"
+        f" {percentile(latencies, 0.99):>8.1f} {len(timings) / seconds:>8.1f}"
+    )
+
+    if storm:
+        statuses = [status for _, status in storm]
+        login_ms = [elapsed * 1000 for elapsed, _ in storm]
+        line += (
+            f" {len(storm) / seconds:>9.1f} {statistics.median(login_ms):>9.1f}"
+            f" {statuses.count(429):>6} {statuses.count(503):>6}"
+        )
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--dashboards", type=int, default=4,
+                        help="logged-in clients loading the dashboard")
+    parser.add_argument("--storm", type=int, default=32,
+                        help="clients posting to /login during the storm")
+    parser.add_argument("--duration", type=float, default=5.0,
+                        help="seconds per phase")
+    parser.add_argument("--hash-workers", type=int, default=None,
+                        help="PASSWORD_HASH_WORKERS for the server (0 = inline)")
+    parser.add_argument("--throttle", action="store_true",
+                        help="keep the per-IP and per-email login limits on")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="studyplanner-storm-")
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{workdir}/storm.db")
+    os.environ.setdefault("VIDEO_CACHE_PATH", os.path.join(workdir, "video_cache.db"))
+    os.environ["VIDEO_PREFETCH_THREAD"] = "0"
+    # Render every dashboard instead of serving it from the page cache
+    os.environ["PAGE_CACHE_ENABLED"] = "0"
+    os.environ["AUTH_THROTTLE_ENABLED"] = "1" if args.throttle else "0"
+    if args.hash_workers is not None:
+        os.environ["PASSWORD_HASH_WORKERS"] = str(args.hash_workers)
+
+    with multiprocessing.Pool(1) as pool:
+        user_ids = pool.apply(seed, (args.users,))
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        [sys.executable, "-c", SERVER, str(port)],
+        cwd=root, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+    try:
+        wait_until_up(base_url)
+
+        stop = threading.Event()
+        timings = []
+        clients = [
+            threading.Thread(
+                target=dashboard_client, args=(base_url, user_id, stop, timings)
+            )
+            for user_id in user_ids[:args.dashboards]
+        ]
+        for thread in clients:
+            thread.start()
+
+        # Let the clients log in before measuring
+        while len(timings) < args.dashboards:
+            time.sleep(0.05)
+        quiet_start = time.monotonic()
+        time.sleep(args.duration)
+        storm_start = time.monotonic()
+
+        stop_storm = threading.Event()
+        storm = []
+        stormers = [
+            threading.Thread(
+                target=storm_client, args=(base_url, user_ids, stop_storm, storm, i)
+            )
+            for i in range(args.storm)
+        ]
+        for thread in stormers:
+            thread.start()
+        time.sleep(args.duration)
+        storm_end = time.monotonic()
+
+        stop_storm.set()
+        stop.set()
+        for thread in clients + stormers:
+            thread.join()
+    finally:
+        server.terminate()
+        server.wait()
+
+    quiet = [t for t in timings if quiet_start <= t[0] < storm_start]
+    during = [t for t in timings if storm_start <= t[0] < storm_end]
+
+    print(f"hash workers: {os.environ.get('PASSWORD_HASH_WORKERS', 'default')}, "
+          f"throttle: {'on' if args.throttle else 'off'}, "
+          f"{args.dashboards} dashboard / {args.storm} login clients")
+    print(f"{'phase':<8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'dash/s':>8}"
+          f" {'logins/s':>9} {'login ms':>9} {'429':>6} {'503':>6}")
+    summarize("quiet", quiet, None, storm_start - quiet_start)
+    summarize("storm", during, storm, storm_end - storm_start)
+
+
+if __name__ == "__main__":
+    main()
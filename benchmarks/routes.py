@@ -0,0 +1,383 @@
+"""Latency and query counts of the hot routes on a seeded database.
+
+Builds a throwaway SQLite database, seeds it (see benchmarks/seed.py),
+stubs the YouTube search so nothing leaves the machine, then drives each
+scenario through the Flask test client and reports latency percentiles
+and queries per request. Results can be saved as JSON and compared with
+a stored baseline; the comparison exits non-zero on a regression.
+
+    python -m benchmarks.routes
+    python -m benchmarks.routes --users 50 --topics 40 --iterations 100
+    python -m benchmarks.routes --only dashboard generate_plan
+    python -m benchmarks.routes --save benchmarks/baseline.json
+    python -m benchmarks.routes --compare benchmarks/baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def fake_search(topic):
+    # Stands in for utils.youtube_helper.search_videos
+    slug = "-".join(topic.lower().split())
+    return [
+        {
+            "title": f"{topic} tutorial {n}",
+            "thumbnail": f"https://img.example.com/{slug}/{n}.jpg",
+            "video_id": f"{slug}-{n}",
+            "url": f"https://www.youtube.com/watch?v={slug}-{n}",
+        }
+        for n in range(1, 4)
+    ]
+
+
+# -------------------------
+# Scenarios
+# -------------------------
+#
+# Each scenario returns (method, path, data) for one request made as
+# ``user_id``. Set-up that has to happen before the request (resetting
+# a plan, making tasks overdue) runs first and is neither timed nor
+# counted.
+
+def reset_plan(user_id):
+    from extensions import db
+    from models import StudyTask, SubjectProgress, UserProgress
+
+    # Counters are reseeded from the tasks on next use
+    for model in (StudyTask, SubjectProgress, UserProgress):
+        model.query.filter_by(user_id=user_id).delete()
+    db.session.commit()
+
+
+def make_overdue(user_id, count=10):
+    from extensions import db
+    from models import StudyTask, SubjectProgress, UserProgress
+
+    task_ids = [
+        task_id for (task_id,) in db.session.query(StudyTask.id).filter(
+            StudyTask.user_id == user_id,
+            StudyTask.task_date >= date.today(),
+            StudyTask.is_completed == False
+        ).order_by(StudyTask.id).limit(count)
+    ]
+    StudyTask.query.filter(StudyTask.id.in_(task_ids)).update(
+        {"task_date": date.today() - timedelta(days=3)}, synchronize_session=False
+    )
+    for model in (SubjectProgress, UserProgress):
+        model.query.filter_by(user_id=user_id).delete()
+    db.session.commit()
+
+
+def visible_task_ids(user_id, limit=50):
+    from extensions import db
+    from models import StudyTask
+
+    return [
+        task_id for (task_id,) in db.session.query(StudyTask.id)
+        .filter_by(user_id=user_id).order_by(StudyTask.task_date, StudyTask.id).limit(limit)
+    ]
+
+
+def scenario_generate_plan(user_id, iteration, rng):
+    reset_plan(user_id)
+    return "POST", "/generate-plan", {}
+
+
+def scenario_replan(user_id, iteration, rng):
+    # Changing the study time re-plans every pending task
+    return "POST", "/add-study-time", {
+        "hours_per_day": str(3 + iteration % 2), "days_per_week": "6"
+    }
+
+
+def scenario_auto_reschedule(user_id, iteration, rng):
+    make_overdue(user_id)
+    return "GET", "/auto-reschedule", None
+
+
+def scenario_bulk_update(user_id, iteration, rng):
+    task_ids = visible_task_ids(user_id)
+    return "POST", "/tasks/update", {
+        "visible_tasks": task_ids,
+        "completed_tasks": rng.sample(task_ids, k=len(task_ids) // 2),
+    }
+
+
+def scenario_import_topics(user_id, iteration, rng):
+    # A 200-line syllabus paste, half of it already known
+    names = [f"Imported topic {iteration}-{n}" for n in range(100)]
+    names += [f"Subject 1 topic {n + 1}" for n in range(100)]
+    return "POST", "/add-topic", {"topic_names": "\n".join(["# Subject 1"] + names)}
+
+
+SCENARIOS = {
+    "dashboard": lambda user_id, i, rng: ("GET", "/dashboard", None),
+    "tasks_today": lambda user_id, i, rng: ("GET", "/tasks/today", None),
+    "tasks_all": lambda user_id, i, rng: ("GET", "/tasks/all", None),
+    "tasks_all_filtered": lambda user_id, i, rng: (
+        "GET", "/tasks/all?status=pending&per_page=20", None
+    ),
+    "api_tasks": lambda user_id, i, rng: ("GET", "/api/v1/tasks?limit=100", None),
+    "generate_plan": scenario_generate_plan,
+    "replan": scenario_replan,
+    "auto_reschedule": scenario_auto_reschedule,
+    "bulk_update": scenario_bulk_update,
+    "import_topics": scenario_import_topics,
+}
+
+
+# -------------------------
+# Measuring
+# -------------------------
+
+def summarize(timings, queries, errors):
+    ordered = sorted(timings)
+
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+    return {
+        "iterations": len(ordered),
+        "p50_ms": round(percentile(50) * 1000, 3),
+        "p90_ms": round(percentile(90) * 1000, 3),
+        "p99_ms": round(percentile(99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+        "queries": round(statistics.fmean(queries), 2) if queries else 0,
+        "errors": errors,
+    }
+
+
+def run_scenario(app, client, counter, scenario, user_ids, iterations, warmup, seed):
+    from extensions import db
+
+    rng = random.Random(seed)
+    timings = []
+    queries = []
+    errors = 0
+
+    for i in range(warmup + iterations):
+        user_id = user_ids[i % len(user_ids)]
+        with client.session_transaction() as session:
+            session["user_id"] = user_id
+
+        with app.app_context():
+            method, path, data = scenario(user_id, i, rng)
+            db.session.remove()
+
+        counter["queries"] = 0
+        started = time.perf_counter()
+        response = client.open(path, method=method, data=data)
+        response.get_data()
+        elapsed = time.perf_counter() - started
+        response.close()
+
+        if i < warmup:
+            continue
+        timings.append(elapsed)
+        queries.append(counter["queries"])
+        errors += response.status_code >= 400
+
+    return summarize(timings, queries, errors)
+
+
+def run_scheduler(topics, iterations, seed):
+    """The pure scheduler on ``topics`` topics, outside of any request."""
+    from utils.scheduler import schedule
+
+    rng = random.Random(seed)
+    today = date.today()
+    subjects = max(topics // 500, 1)
+    exam_dates = {s: today + timedelta(days=rng.randint(30, 365)) for s in range(subjects)}
+    topic_rows = [(t, rng.randrange(subjects)) for t in range(topics)]
+
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        schedule(topic_rows, exam_dates, tasks_per_day=200, days_per_week=6, start=today)
+        timings.append(time.perf_counter() - started)
+
+    return summarize(timings, [], 0)
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    workdir = tempfile.mkdtemp(prefix="studyplanner-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    os.environ["VIDEO_CACHE_PATH"] = os.path.join(workdir, "video_cache.db")
+    os.environ["VIDEO_PREFETCH_THREAD"] = "0"
+    os.environ["SLOW_REQUEST_MS"] = "0"
+
+    from sqlalchemy import event
+
+    import migrations
+    from app import create_app
+    from benchmarks.seed import seed_database
+    from extensions import db
+    from models import Topic
+    from utils import youtube_helper
+
+    youtube_helper.search_videos = fake_search
+
+    app = create_app()
+    counter = {"queries": 0}
+
+    with app.app_context():
+        db.create_all()
+        migrations.upgrade(db.engine, fresh=True)
+        user_ids = seed_database(
+            args.users, args.subjects, args.topics, seed=args.seed
+        )
+
+        if not args.cold_videos:
+            names = [name for (name,) in db.session.query(Topic.name).distinct()]
+            youtube_helper.get_top_videos_many(names, deadline=None)
+
+        @event.listens_for(db.engine, "after_cursor_execute")
+        def count_query(*_):
+            counter["queries"] += 1
+
+    client = app.test_client()
+    results = {}
+
+    # By default every user is seen once before measuring, so first-visit
+    # work (seeding the progress counters) isn't part of the numbers
+    warmup = len(user_ids) if args.warmup is None else args.warmup
+
+    for name, scenario in SCENARIOS.items():
+        if args.only and name not in args.only:
+            continue
+        results[name] = run_scenario(
+            app, client, counter, scenario, user_ids,
+            args.iterations, warmup, args.seed
+        )
+        print_row(name, results[name])
+
+    if args.scheduler_topics and (not args.only or "scheduler" in args.only):
+        name = f"scheduler_{args.scheduler_topics}"
+        results[name] = run_scheduler(args.scheduler_topics, max(args.iterations // 10, 3), args.seed)
+        print_row(name, results[name])
+
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "users": args.users,
+            "subjects": args.subjects,
+            "topics": args.topics,
+            "iterations": args.iterations,
+            "seed": args.seed,
+            "videos": "cold" if args.cold_videos else "warm",
+        },
+        "results": results,
+    }
+
+
+# -------------------------
+# Reporting
+# -------------------------
+
+def print_header():
+    print(f"{'scenario':<22} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} "
+          f"{'mean ms':>9} {'queries':>8} {'errors':>7}")
+
+
+def print_row(name, result):
+    print(f"{name:<22} {result['p50_ms']:>9.2f} {result['p90_ms']:>9.2f} "
+          f"{result['p99_ms']:>9.2f} {result['mean_ms']:>9.2f} "
+          f"{result['queries']:>8g} {result['errors']:>7}")
+
+
+def compare(current, baseline, tolerance):
+    """Print the change per scenario and return the regressed names.
+
+    A scenario regresses when its median is more than ``tolerance``
+    (a fraction) slower or it runs more queries than the baseline.
+    """
+    regressions = []
+
+    print()
+    print(f"{'scenario':<22} {'p50 base':>9} {'p50 now':>9} {'change':>8} "
+          f"{'queries':>12}")
+
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:<22} {'-':>9} {result['p50_ms']:>9.2f} {'new':>8}")
+            continue
+
+        change = (result["p50_ms"] - base["p50_ms"]) / base["p50_ms"] if base["p50_ms"] else 0
+        slower = change > tolerance
+        more_queries = result["queries"] > base["queries"]
+        flag = "  REGRESSION" if slower or more_queries else ""
+
+        print(f"{name:<22} {base['p50_ms']:>9.2f} {result['p50_ms']:>9.2f} "
+              f"{change:>+8.0%} {base['queries']:>5g} -> {result['queries']:<4g}{flag}")
+        if flag:
+            regressions.append(name)
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--subjects", type=int, default=4)
+    parser.add_argument("--topics", type=int, default=25, help="per subject")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, help="unmeasured requests first (default: one per user)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scheduler-topics", type=int, default=100_000,
+                        help="size of the scheduler-only run (0 to skip)")
+    parser.add_argument("--cold-videos", action="store_true",
+                        help="start with an empty video cache")
+    parser.add_argument("--only", nargs="+", metavar="SCENARIO",
+                        help=f"any of: {', '.join(SCENARIOS)}, scheduler")
+    parser.add_argument("--save", metavar="PATH", help="write the results as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="baseline JSON to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed median slow-down before it counts as a regression")
+    args = parser.parse_args()
+
+    print_header()
+    current = run(args)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nSaved to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
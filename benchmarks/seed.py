@@ -0,0 +1,86 @@
+"""Deterministic test data for the benchmarks.
+
+``seed_database`` fills an empty schema with N users, each with a few
+subjects, topics and (optionally) one task per topic spread around
+today: some done, some missed, some due, most upcoming. The same seed
+always gives the same rows, so query counts are comparable across runs.
+"""
+import random
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import insert, text
+
+from extensions import db
+from models import Exam, StudyTask, StudyTime, Subject, Topic, User
+from passwords import hash_password
+
+
+PASSWORD = "benchmark"
+CHUNK = 5000
+
+
+def seed_database(users=20, subjects=4, topics=25, tasks=True, seed=0, today=None):
+    """Insert the data set and return the list of user IDs.
+
+    Every user gets the same password (``PASSWORD``); hashing it once
+    keeps seeding fast.
+    """
+    rng = random.Random(seed)
+    today = today or date.today()
+    password = hash_password(PASSWORD)
+
+    rows = {User: [], StudyTime: [], Subject: [], Exam: [], Topic: [], StudyTask: []}
+    subject_id = topic_id = 0
+
+    for user_id in range(1, users + 1):
+        rows[User].append({
+            "id": user_id, "name": f"User {user_id}",
+            "email": f"user{user_id}@example.com", "password": password,
+        })
+        rows[StudyTime].append({
+            "id": user_id, "user_id": user_id,
+            "hours_per_day": rng.choice([2, 3, 4, 6]),
+            "days_per_week": rng.choice([5, 6, 7]),
+        })
+
+        for s in range(subjects):
+            subject_id += 1
+            exam_date = today + timedelta(days=rng.randint(20, 120))
+            rows[Subject].append({"id": subject_id, "name": f"Subject {s + 1}", "user_id": user_id})
+            rows[Exam].append({"id": subject_id, "subject_id": subject_id, "exam_date": exam_date})
+
+            for t in range(topics):
+                topic_id += 1
+                rows[Topic].append({
+                    "id": topic_id, "name": f"Subject {s + 1} topic {t + 1}",
+                    "subject_id": subject_id,
+                })
+                if not tasks:
+                    continue
+
+                # A third of the plan is behind us, the rest before the exam
+                days_left = (exam_date - today).days
+                task_date = today + timedelta(days=rng.randint(-days_left // 2, days_left - 1))
+                completed = task_date < today and rng.random() < 0.7
+                rows[StudyTask].append({
+                    "id": topic_id, "user_id": user_id, "subject_id": subject_id,
+                    "topic_id": topic_id, "task_date": task_date,
+                    "is_completed": completed,
+                    # Done in the evening of the planned day
+                    "completed_at": datetime.combine(task_date, time(19)) if completed else None,
+                })
+
+    for model, values in rows.items():
+        for start in range(0, len(values), CHUNK):
+            db.session.execute(insert(model), values[start:start + CHUNK])
+
+    if db.engine.dialect.name == "postgresql":
+        # IDs were given explicitly, so move the sequences past them
+        for model in rows:
+            table = model.__table__.name
+            db.session.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'),"
+                f" COALESCE((SELECT MAX(id) FROM \"{table}\"), 1))"
+            ))
+    db.session.commit()
+
+    return list(range(1, users + 1))
@@ -0,0 +1,80 @@
+"""Worker start-up cost: importing the app, building it, first request.
+
+Each run is a fresh interpreter, like a newly forked or recycled
+worker. Prints the median of each phase and lists heavy modules that
+were loaded before anything asked for them.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --runs 20 --path /login
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+
+# Only needed once a video actually has to be fetched, or a forecast made
+LAZY_MODULES = [
+    "requests", "dotenv", "utils.youtube_helper", "utils.youtube_client",
+    "numpy", "utils.analytics",
+]
+
+PROBE = """
+import json, sys, time
+
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app()
+created = time.perf_counter()
+response = application.test_client().get(sys.argv[1])
+served = time.perf_counter()
+
+print(json.dumps({
+    "import": imported - started,
+    "create_app": created - imported,
+    "first_request": served - created,
+    "status": response.status_code,
+    "loaded": [name for name in sys.argv[2:] if name in sys.modules],
+}))
+"""
+
+
+def probe(path, env):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE, path, *LAZY_MODULES],
+        cwd=root, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--path", default="/")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="studyplanner-startup-")
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", f"sqlite:///{workdir}/startup.db")
+    env.setdefault("VIDEO_CACHE_PATH", os.path.join(workdir, "video_cache.db"))
+    env["VIDEO_PREFETCH_THREAD"] = "0"
+
+    runs = [probe(args.path, env) for _ in range(args.runs)]
+
+    print(f"{'phase':<14} {'median ms':>10} {'max ms':>8}")
+    for phase in ("import", "create_app", "first_request"):
+        timings = [run[phase] * 1000 for run in runs]
+        print(f"{phase:<14} {statistics.median(timings):>10.1f} {max(timings):>8.1f}")
+
+    print(f"GET {args.path} -> {runs[-1]['status']}")
+    loaded = sorted({name for run in runs for name in run["loaded"]})
+    print(f"loaded eagerly: {', '.join(loaded) if loaded else 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import json
+from datetime import date
+from flask import Blueprint, Response, redirect, request, session, stream_with_context, url_for
+from sqlalchemy import select
+
+from extensions import db
+from models import Exam, StudyTask, StudyTime, Subject, Topic, User
+
+
+bp = Blueprint("api", __name__)
+
+
+API_DEFAULT_LIMIT = 100
+API_MAX_LIMIT = 1000
+
+
+def api_resource(name, user_id):
+    """Columns and base query for one API collection, scoped to the user.
+
+    Returns ``(columns, query)`` where columns maps each public field
+    name to its SQL expression. Every collection is ordered by ``id``.
+    """
+    if name == "tasks":
+        columns = {
+            "id": StudyTask.id,
+            "date": StudyTask.task_date,
+            "completed": StudyTask.is_completed,
+            "subject_id": StudyTask.subject_id,
+            "subject": Subject.name,
+            "topic_id": StudyTask.topic_id,
+            "topic": Topic.name,
+        }
+        query = select().select_from(StudyTask).join(
+            Subject, StudyTask.subject_id == Subject.id
+        ).join(
+            Topic, StudyTask.topic_id == Topic.id
+        ).where(StudyTask.user_id == user_id)
+        return columns, query
+
+    if name == "subjects":
+        columns = {"id": Subject.id, "name": Subject.name}
+        return columns, select().where(Subject.user_id == user_id)
+
+    if name == "topics":
+        columns = {"id": Topic.id, "name": Topic.name, "subject_id": Topic.subject_id}
+        return columns, select().select_from(Topic).join(Subject).where(
+            Subject.user_id == user_id
+        )
+
+    if name == "exams":
+        columns = {"id": Exam.id, "exam_date": Exam.exam_date, "subject_id": Exam.subject_id}
+        return columns, select().select_from(Exam).join(Subject).where(
+            Subject.user_id == user_id
+        )
+
+    if name == "study-time":
+        columns = {
+            "id": StudyTime.id,
+            "hours_per_day": StudyTime.hours_per_day,
+            "days_per_week": StudyTime.days_per_week,
+        }
+        return columns, select().where(StudyTime.user_id == user_id)
+
+    if name == "users":
+        # Only ever the caller's own record
+        columns = {"id": User.id, "name": User.name, "email": User.email}
+        return columns, select().where(User.id == user_id)
+
+    return None, None
+
+
+def api_row(row):
+    return {
+        key: value.isoformat() if isinstance(value, date) else value
+        for key, value in row._mapping.items()
+    }
+
+
+def legacy_redirect(resource, fields):
+    """Send one of the old unscoped listings to its /api/v1 collection,
+    keeping the fields it used to return."""
+    args = request.args.to_dict()
+    args.setdefault("fields", ",".join(fields))
+    return redirect(url_for("api.api_list", resource=resource, **args), 301)
+
+
+@bp.route("/api/v1/<resource>")
+def api_list(resource):
+    user_id = session.get("user_id")
+    if not user_id:
+        return {"error": "authentication required"}, 401
+
+    columns, query = api_resource(resource, user_id)
+    if columns is None:
+        return {"error": f"unknown resource '{resource}'"}, 404
+
+    # Sparse fieldsets: ?fields=date,topic
+    fields = [f for f in request.args.get("fields", "").split(",") if f]
+    unknown = [f for f in fields if f not in columns]
+    if unknown:
+        return {"error": f"unknown field(s): {', '.join(unknown)}"}, 400
+
+    selected = fields or list(columns)
+    id_column = columns["id"]
+    query = query.add_columns(
+        *(columns[field].label(field) for field in selected)
+    ).order_by(id_column)
+
+    # Full export as NDJSON, streamed in chunks from a server-side cursor
+    if request.args.get("format") == "ndjson":
+        def generate():
+            result = db.session.execute(query.execution_options(yield_per=1000))
+            for row in result:
+                yield json.dumps(api_row(row)) + "\n"
+
+        return Response(
+            stream_with_context(generate()),
+            mimetype="application/x-ndjson"
+        )
+
+    limit = min(max(request.args.get("limit", API_DEFAULT_LIMIT, type=int), 1), API_MAX_LIMIT)
+    cursor = request.args.get("cursor", type=int)
+    if cursor is not None:
+        query = query.where(id_column > cursor)
+
+    # The id is needed for the cursor even when it isn't a selected field
+    query = query.add_columns(id_column.label("_cursor"))
+    rows = db.session.execute(query.limit(limit + 1)).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    data = []
+    for row in rows:
+        item = api_row(row)
+        item.pop("_cursor")
+        data.append(item)
+
+    return {
+        "data": data,
+        "next_cursor": str(rows[-1]._cursor) if has_more else None,
+    }
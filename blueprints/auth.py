@@ -0,0 +1,135 @@
+from flask import Blueprint, flash, redirect, render_template, request, session, url_for
+from sqlalchemy import update
+
+from blueprints.api import legacy_redirect
+from extensions import db
+from identity import login_user, logout_user
+from models import User
+from passwords import HashingBusy, hash_password, needs_rehash, verify_password
+from throttle import retry_after, retry_later
+
+
+BUSY_MESSAGE = "We're handling a lot of sign-ins right now. Please try again in a moment."
+
+
+bp = Blueprint("auth", __name__)
+
+
+@bp.route("/")
+def home():
+    if session.get("user_id"):
+        return redirect(url_for("planner.dashboard"))
+    return render_template("home.html")
+
+
+
+
+
+@bp.route("/register", methods=["GET", "POST"])
+def register():
+    if request.method == "POST":
+        name = request.form["name"]
+        email = request.form["email"]
+        password = request.form["password"]
+
+        wait = retry_after(auth_ip=request.remote_addr)
+        if wait:
+            return retry_later(
+                "register.html", wait, "Too many attempts. Please try again later."
+            )
+
+        existing_user = User.query.filter_by(email=email).first()
+        if existing_user:
+            return render_template("register.html", error="User already exists")
+
+        # Don't hold a pooled connection while waiting for the hash
+        db.session.close()
+
+        try:
+            hashed_password = hash_password(password)
+        except HashingBusy:
+            return retry_later("register.html", 1, BUSY_MESSAGE, 503)
+
+        user = User(
+            name=name,
+            email=email,
+            password=hashed_password
+        )
+
+        db.session.add(user)
+        db.session.commit()
+
+        login_user(user.id)
+
+        return redirect(url_for("planner.add_study_time"))
+
+    return render_template("register.html")
+
+
+@bp.route("/login", methods=["GET", "POST"])
+def login():
+    if request.method == "POST":
+        email = request.form["email"]
+        password = request.form["password"]
+
+        wait = retry_after(
+            auth_ip=request.remote_addr, login_email=email.strip().lower()
+        )
+        if wait:
+            return retry_later(
+                "login.html", wait, "Too many login attempts. Please try again later."
+            )
+
+        account = db.session.query(User.id, User.password).filter(User.email == email).first()
+
+        # Don't hold a pooled connection while waiting for the hash: a
+        # burst of logins would take them all and stall every other page
+        db.session.close()
+
+        try:
+            valid = verify_password(account.password if account else None, password)
+        except HashingBusy:
+            return retry_later("login.html", 1, BUSY_MESSAGE, 503)
+
+        if valid and needs_rehash(account.password):
+            # Hashing settings changed since this password was set;
+            # if the pool is full it's upgraded on a later login instead
+            try:
+                new_hash = hash_password(password)
+                db.session.execute(
+                    update(User).where(User.id == account.id).values(password=new_hash)
+                )
+                db.session.commit()
+            except HashingBusy:
+                pass
+
+        if valid:
+            login_user(account.id)
+            return redirect(url_for("planner.dashboard"))
+        else:
+            flash("Invalid credentials", "danger")
+            return redirect(url_for("auth.login"))
+
+    return render_template("login.html")
+
+@bp.route("/logout")
+def logout():
+    logout_user()
+    return redirect(url_for("auth.login"))
+
+
+@bp.route("/add-user")
+def add_user():
+    class User(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        name = db.Column(db.String(100), nullable=False)
+        email = db.Column(db.String(100), unique=True, nullable=False)
+        password = db.Column(db.String(200), nullable=False)
+
+        def __repr__(self):
+            return f"<User {self.email}>"
+
+
+@bp.route("/users")
+def get_users():
+    return legacy_redirect("users", ["id", "name", "email"])
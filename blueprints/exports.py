@@ -0,0 +1,193 @@
+import hmac
+import io
+import secrets
+from itertools import islice
+from flask import (
+    Blueprint, Response, current_app, flash, redirect, render_template, request,
+    session, stream_with_context, url_for
+)
+from itsdangerous import BadSignature, URLSafeSerializer
+from sqlalchemy import select, update
+
+from extensions import db
+from identity import login_required
+from models import StudyTask, Subject, Topic, User
+from page_cache import not_modified
+from planning import import_tasks, prefetch_upcoming_videos
+from utils.task_feed import csv_chunks, ical_events, parse_task_csv
+
+
+bp = Blueprint("exports", __name__)
+
+
+# -------------------------
+# Feed tokens
+# -------------------------
+
+def feed_serializer():
+    return URLSafeSerializer(current_app.secret_key, salt="task-feed")
+
+
+def rotate_feed_secret(user_id):
+    secret = secrets.token_urlsafe(16)
+    db.session.execute(update(User).where(User.id == user_id).values(feed_secret=secret))
+    db.session.commit()
+    return secret
+
+
+def feed_token(user_id):
+    """Token for ``?token=``: lets a calendar app, which has no session
+    cookie, read this user's plan. Signs the user's feed secret along
+    with the ID, so it's valid until the user resets the link (or
+    SECRET_KEY changes)."""
+    secret = db.session.query(User.feed_secret).filter(User.id == user_id).scalar()
+    if secret is None:
+        secret = rotate_feed_secret(user_id)
+    return feed_serializer().dumps([user_id, secret])
+
+
+def feed_user_id():
+    token = request.args.get("token")
+    if not token:
+        return session.get("user_id")
+
+    try:
+        user_id, secret = feed_serializer().loads(token)
+    except (BadSignature, TypeError, ValueError):
+        return None
+
+    current = db.session.query(User.feed_secret).filter(User.id == user_id).scalar()
+    if not isinstance(secret, str) or current is None or not hmac.compare_digest(current, secret):
+        return None
+    return user_id
+
+
+@bp.route("/tasks/feed/reset", methods=["POST"])
+@login_required
+def reset_feed():
+    rotate_feed_secret(session["user_id"])
+    flash("Calendar feed link reset. Subscribe again with the new address; "
+          "the old one no longer works.", "success")
+    return redirect(url_for("exports.import_plan"))
+
+
+# -------------------------
+# Export
+# -------------------------
+
+def task_rows(user_id, *columns):
+    # Streamed from a server-side cursor, 1000 rows at a time
+    query = select(*columns).select_from(StudyTask).join(
+        Subject, StudyTask.subject_id == Subject.id
+    ).join(
+        Topic, StudyTask.topic_id == Topic.id
+    ).where(
+        StudyTask.user_id == user_id
+    ).order_by(StudyTask.task_date, StudyTask.id)
+
+    return db.session.execute(query.execution_options(yield_per=1000))
+
+
+def export_response(kind, mimetype, generate, filename=None):
+    """Stream ``generate(user_id)``, or answer 304 when the plan hasn't
+    changed since the client's copy (clients poll feeds often)."""
+    user_id = feed_user_id()
+    if not user_id:
+        if request.args.get("token"):
+            return {"error": "invalid feed token"}, 403
+        return redirect(url_for("auth.login"))
+
+    # Bumped on every write to the user's plan, see page_cache.py
+    version = db.session.query(User.cache_version).filter(User.id == user_id).scalar()
+    if version is None:
+        return {"error": "unknown user"}, 404
+
+    etag = f"{kind}-{user_id}-{version}"
+    if request.if_none_match.contains_weak(etag):
+        return not_modified(etag)
+
+    response = Response(stream_with_context(generate(user_id)), mimetype=mimetype)
+    response.set_etag(etag, weak=True)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    if filename:
+        response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+@bp.route("/tasks/export.ics")
+def export_ics():
+    def generate(user_id):
+        rows = task_rows(
+            user_id, StudyTask.id, StudyTask.task_date, StudyTask.is_completed,
+            Subject.name, Topic.name
+        )
+        yield from ical_events(rows, "Study plan", request.host.split(":")[0])
+
+    return export_response("ics", "text/calendar", generate)
+
+
+@bp.route("/tasks/export.csv")
+def export_csv():
+    def generate(user_id):
+        rows = task_rows(
+            user_id, StudyTask.task_date, Subject.name, Topic.name, StudyTask.is_completed
+        )
+        yield from csv_chunks(rows)
+
+    return export_response("csv", "text/csv", generate, filename="study-plan.csv")
+
+
+# -------------------------
+# Import
+# -------------------------
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+@bp.route("/tasks/import", methods=["GET", "POST"])
+@login_required
+def import_plan():
+    user_id = session["user_id"]
+
+    if request.method == "POST":
+        upload = request.files.get("task_file")
+        if not upload or not upload.filename:
+            flash("Please choose a CSV file.", "danger")
+            return redirect(url_for("exports.import_plan"))
+
+        # Read and written one batch at a time, so a large file never
+        # sits in memory (or in one transaction) all at once
+        lines = io.TextIOWrapper(upload.stream, encoding="utf-8-sig", newline="")
+        added = duplicates = rejected = 0
+        try:
+            for batch in batches(parse_task_csv(lines), current_app.config["TASK_IMPORT_BATCH"]):
+                result = import_tasks(user_id, batch)
+                added += result.added
+                duplicates += result.duplicates
+                rejected += result.rejected
+        except (ValueError, UnicodeDecodeError) as e:
+            flash(f"Could not read the tasks: {e}", "danger")
+            if not added:
+                return redirect(url_for("exports.import_plan"))
+
+        message = f"{added} task(s) imported."
+        if duplicates:
+            message += f" {duplicates} already planned topic(s) skipped."
+        if rejected:
+            message += f" {rejected} row(s) without a valid date, subject or topic skipped."
+        flash(message, "success")
+
+        if added:
+            prefetch_upcoming_videos([user_id])
+        return redirect(url_for("tasks.all_tasks"))
+
+    token = feed_token(user_id)
+    return render_template(
+        "import_tasks.html",
+        ics_url=url_for("exports.export_ics", token=token, _external=True),
+        csv_url=url_for("exports.export_csv")
+    )
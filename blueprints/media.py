@@ -0,0 +1,33 @@
+from flask import Blueprint, render_template
+
+from models import Topic
+from utils.video_cache import video_cache
+from utils.video_prefetch import stored_videos_for
+
+
+bp = Blueprint("media", __name__)
+
+
+@bp.route("/topic/<int:topic_id>")
+def topic_detail(topic_id):
+    topic = Topic.query.get_or_404(topic_id)
+
+    videos = stored_videos_for([topic.name])[topic.name]
+
+    return render_template("topic_detail.html", topic=topic, videos=videos)
+
+
+@bp.route("/video-cache/stats")
+def video_cache_statistics():
+    return video_cache.stats()
+
+
+def videos_for_topics(topics):
+    # Stored results only; misses are queued for the prefetch worker
+    topic_names = dict(topics)
+    videos_by_name = stored_videos_for(topic_names.values())
+
+    return {
+        topic_id: videos_by_name.get(name, [])
+        for topic_id, name in topic_names.items()
+    }
@@ -0,0 +1,357 @@
+import math
+from datetime import date, datetime
+from flask import (
+    Blueprint, current_app, flash, redirect, render_template, request, session, url_for
+)
+
+from blueprints.api import legacy_redirect
+from blueprints.media import videos_for_topics
+from extensions import db
+from identity import current_user, invalidate_profile, login_required
+from models import Exam, StudyTask, StudyTime, Subject, Topic
+from page_cache import cached_page, invalidate_pages
+from planning import import_topics, plan_tasks, prefetch_upcoming_videos
+from progress import completion_rows, dashboard_stats
+from utils.scheduler import NO_EXAM, PAST_DEADLINE
+from utils.topic_import import parse_topics
+
+
+bp = Blueprint("planner", __name__)
+
+
+@bp.route("/add-subject", methods=["GET", "POST"])
+@login_required
+def add_subject():
+    user = current_user
+
+    if request.method == "POST":
+        name = request.form["name"]
+
+        subject = Subject(name=name, user_id=user.id)
+        db.session.add(subject)
+        invalidate_pages([user.id])
+        db.session.commit()
+
+        flash("Subject added successfully!", "success")
+
+    return render_template("add_subject.html")
+
+
+
+@bp.route("/subjects")
+def get_subjects():
+    return legacy_redirect("subjects", ["id", "name"])
+
+@bp.route("/add-topic", methods=["GET", "POST"])
+@login_required
+def add_topic():
+    user_id = session["user_id"]
+
+    subjects = Subject.query.filter_by(user_id=user_id).all()
+
+    if request.method == "POST":
+        subject_id = request.form.get("subject_id", type=int)
+        upload = request.files.get("topic_file")
+
+        try:
+            pairs = parse_topics(request.form.get("topic_names", ""))
+            if upload and upload.filename:
+                text = upload.read().decode("utf-8-sig")
+                pairs += parse_topics(text, filename=upload.filename)
+        except (ValueError, UnicodeDecodeError) as e:
+            flash(f"Could not read the topics: {e}", "danger")
+            return redirect(url_for("planner.add_topic"))
+
+        if not pairs:
+            flash("Please select subject and enter topics.", "danger")
+            return redirect(url_for("planner.add_topic"))
+
+        result = import_topics(user_id, pairs, subject_id)
+
+        message = f"{result.added} topic(s) added successfully!"
+        if result.new_subjects:
+            message += f" {result.new_subjects} new subject(s) created."
+        if result.duplicates:
+            message += f" {result.duplicates} duplicate(s) skipped."
+        flash(message, "success")
+        if result.rejected:
+            flash(
+                f"{result.rejected} topic(s) skipped: no subject selected or name too long.",
+                "danger"
+            )
+
+        if result.added:
+            flash_replan(replan_if_planned(user_id, result.subject_ids))
+        return redirect(url_for("planner.dashboard"))
+
+    return render_template("add_topic.html", subjects=subjects)
+
+
+
+
+@bp.route("/topics")
+def get_topics():
+    return legacy_redirect("topics", ["id", "name", "subject_id"])
+
+
+@bp.route("/add-exam", methods=["GET", "POST"])
+def add_exam():
+    subjects = Subject.query.all()
+
+    if request.method == "POST":
+        subject_id = request.form["subject_id"]
+        exam_date_str = request.form["exam_date"]
+        exam_date = datetime.strptime(exam_date_str, "%Y-%m-%d").date()
+
+
+        existing_exam = Exam.query.filter_by(subject_id=subject_id).first()
+
+        if existing_exam:
+            existing_exam.exam_date = exam_date
+        else:
+            exam = Exam(subject_id=subject_id, exam_date=exam_date)
+            db.session.add(exam)
+
+        subject = Subject.query.get(subject_id)
+        if subject:
+            invalidate_pages([subject.user_id])
+
+        db.session.commit()
+        flash("Date added successfully!", "success")
+
+        if subject:
+            flash_replan(replan_if_planned(subject.user_id, [subject.id]))
+
+    return render_template("add_exam.html", subjects=subjects)
+
+@bp.route("/exams")
+def get_exams():
+    return legacy_redirect("exams", ["id", "exam_date", "subject_id"])
+
+@bp.route("/add-study-time", methods=["GET", "POST"])
+@login_required
+def add_study_time():
+    user = current_user
+
+    if request.method == "POST":
+        hours_per_day = float(request.form["hours_per_day"])
+        days_per_week = int(request.form["days_per_week"])
+
+        existing = StudyTime.query.filter_by(user_id=user.id).first()
+
+        if existing:
+            existing.hours_per_day = hours_per_day
+            existing.days_per_week = days_per_week
+        else:
+            study_time = StudyTime(
+                hours_per_day=hours_per_day,
+                days_per_week=days_per_week,
+                user_id=user.id
+            )
+            db.session.add(study_time)
+
+        invalidate_pages([user.id])
+        db.session.commit()
+        invalidate_profile(user.id)
+        flash("Study-Time added successfully!", "success")
+
+        flash_replan(replan_if_planned(user.id))
+
+    return render_template("add_study_time.html")
+
+
+@bp.route("/study-time")
+def get_study_time():
+    return legacy_redirect("study-time", ["id", "hours_per_day", "days_per_week"])
+
+
+def flash_unplaced(result):
+    missed_deadline = [t for t in result.unplaced if t.reason == PAST_DEADLINE]
+    if missed_deadline:
+        flash(
+            f"{len(missed_deadline)} topic(s) could not be scheduled "
+            f"before their exam. Consider increasing study time.",
+            "danger"
+        )
+
+    no_exam = [t for t in result.unplaced if t.reason == NO_EXAM]
+    if no_exam:
+        flash(
+            f"{len(no_exam)} topic(s) skipped: their subject has no exam. "
+            f"Add an exam date to schedule them.",
+            "warning"
+        )
+
+
+def flash_replan(result):
+    if result is None:
+        return
+
+    if result.inserted or result.updated or result.deleted:
+        flash(
+            f"Plan updated: {result.inserted} added, {result.updated} moved, "
+            f"{result.deleted} removed.",
+            "success"
+        )
+    flash_unplaced(result)
+
+
+def study_settings(user_id):
+    # The logged-in user's come with the cached profile
+    if current_user and current_user.id == user_id:
+        return current_user.study_time
+    return StudyTime.query.filter_by(user_id=user_id).first()
+
+
+def replan_if_planned(user_id, subject_ids=None):
+    # Keep an existing plan in step with new settings, exams or topics;
+    # users who haven't generated a plan yet are left alone
+    has_plan = db.session.query(StudyTask.id).filter(StudyTask.user_id == user_id)
+    if subject_ids is not None:
+        has_plan = has_plan.filter(StudyTask.subject_id.in_(subject_ids))
+    if not has_plan.first():
+        return None
+
+    study_time = study_settings(user_id)
+    if not study_time or int(study_time.hours_per_day) == 0:
+        return None
+
+    result = plan_tasks(user_id, study_time, subject_ids, rebalance=True)
+    prefetch_upcoming_videos([user_id])
+    return result
+
+
+@bp.route("/generate-plan", methods=["GET", "POST"])
+def generate_plan():
+    if request.method == "POST":
+        if not current_user:
+            return redirect(url_for("auth.login"))
+
+        user_id = current_user.id
+        study_time = current_user.study_time
+        if not study_time:
+            return "Please set study time first"
+
+        max_tasks_per_day = int(study_time.hours_per_day)
+        if max_tasks_per_day == 0:
+            return "Study time too low to generate plan"
+
+        result = plan_tasks(user_id, study_time)
+        prefetch_upcoming_videos([user_id])
+
+        flash("Plan generated successfully!", "success")
+        flash_unplaced(result)
+
+    return render_template("generate_plan.html")
+
+
+@bp.route("/dashboard")
+@cached_page
+@login_required
+def dashboard():
+    user = current_user
+    today = date.today()
+
+    stats = dashboard_stats(user.id, today)
+
+    total_tasks = stats["total_tasks"]
+    completed_tasks = stats["completed_tasks"]
+
+    completion_percentage = (
+        (completed_tasks / total_tasks) * 100 if total_tasks else 0
+    )
+
+    # -------------------------
+    # Progress Prediction
+    # -------------------------
+
+    # NumPy is only loaded once someone opens a dashboard
+    from utils.analytics import AT_RISK, completions, forecast, plans
+
+    # The counters above plus the last few weeks' completions, so the
+    # cost doesn't grow with the length of the plan
+    window = current_app.config["FORECAST_WINDOW_DAYS"]
+    pace, risks = forecast(
+        plans(stats["plan_rows"]),
+        completions(completion_rows(today, window, [user.id]), today),
+        today,
+        window
+    )
+
+    prediction_message = None
+    predicted_finish = None
+
+    if completed_tasks > 0 and len(pace.user_ids) and total_tasks > completed_tasks:
+        # NaT (nothing done lately) comes back as None
+        predicted_finish = pace.finish_dates[0].item()
+
+        if predicted_finish:
+            prediction_message = (
+                f"At current pace ({pace.velocity[0]:.1f} tasks a day over the "
+                f"last {window} days), you will finish by "
+                f"{predicted_finish.strftime('%Y-%m-%d')}"
+            )
+
+    # -------------------------
+    # Exam Check
+    # -------------------------
+
+    # Share of each subject's open tasks projected to be left at its
+    # exam; NaN for subjects without one. Until something is completed
+    # there is no pace to judge by, so nothing is flagged.
+    subject_risk = dict(zip(risks.subject_ids.tolist(), risks.risk.tolist()))
+    at_risk = []
+    for name, entry in stats["subject_progress"].items():
+        scores = [subject_risk.get(subject_id, math.nan) for subject_id in entry["subject_ids"]]
+        entry["exam_risk"] = max((s for s in scores if not math.isnan(s)), default=None)
+        entry["left_at_exam"] = None
+        if completed_tasks > 0 and (entry["exam_risk"] or 0) >= AT_RISK:
+            entry["left_at_exam"] = round(entry["exam_risk"] * 100)
+            at_risk.append(name)
+
+    has_exam = any(entry["exam_risk"] is not None for entry in stats["subject_progress"].values())
+
+    status_message = None
+    status_type = None
+
+    if completed_tasks > 0 and has_exam:
+        if at_risk:
+            status_message = (
+                f"You may not finish {', '.join(at_risk)} before "
+                f"{'the exam' if len(at_risk) == 1 else 'their exams'}. "
+                f"Consider increasing study time."
+            )
+            status_type = "danger"
+        else:
+            status_message = "You are on track to complete before the exam."
+            status_type = "success"
+
+    # -------------------------
+    # YouTube Videos for Today's Tasks
+    # -------------------------
+
+    today_topics = db.session.query(Topic.id, Topic.name).join(
+        StudyTask, StudyTask.topic_id == Topic.id
+    ).filter(
+        StudyTask.user_id == user.id,
+        StudyTask.task_date == today
+    ).distinct().all()
+
+    videos_map = videos_for_topics(today_topics)
+
+    return render_template(
+        "dashboard.html",
+        user=user,
+        total_tasks=total_tasks,
+        completed_tasks=completed_tasks,
+        pending_tasks=stats["pending_tasks"],
+        missed_tasks=stats["missed_tasks"],
+        today_tasks=stats["today_tasks"],
+        upcoming_tasks=stats["upcoming_tasks"],
+        completion_percentage=completion_percentage,
+        subject_progress=stats["subject_progress"],
+        prediction_message=prediction_message,
+        status_message=status_message,
+        status_type=status_type,
+        videos_map=videos_map
+    )
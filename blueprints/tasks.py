@@ -0,0 +1,256 @@
+from datetime import date, datetime
+from flask import Blueprint, redirect, render_template, request, session, url_for
+from sqlalchemy import func, or_, update
+from sqlalchemy.orm import joinedload
+
+from blueprints.api import legacy_redirect
+from blueprints.media import videos_for_topics
+from extensions import db
+from identity import login_required
+from leases import hold_users
+from models import StudyTask
+from page_cache import cached_page
+from planning import prefetch_upcoming_videos, reschedule_missed_tasks
+from progress import ProgressDelta
+
+
+bp = Blueprint("tasks", __name__)
+
+
+@bp.route("/tasks")
+def view_tasks():
+    return legacy_redirect("tasks", ["date", "subject", "topic", "completed"])
+
+
+@bp.route("/tasks/all")
+@login_required
+def all_tasks():
+    user_id = session["user_id"]
+
+    today = date.today()
+    per_page = min(max(request.args.get("per_page", 50, type=int), 1), 200)
+    status = request.args.get("status", "all")
+    start = parse_date_arg("start")
+    end = parse_date_arg("end")
+    after = parse_cursor(request.args.get("after"))
+    before = parse_cursor(request.args.get("before"))
+
+    # subject and topic come in the same query (both many-to-one)
+    query = StudyTask.query.options(
+        joinedload(StudyTask.subject),
+        joinedload(StudyTask.topic)
+    ).filter(StudyTask.user_id == user_id)
+
+    if start:
+        query = query.filter(StudyTask.task_date >= start)
+    if end:
+        query = query.filter(StudyTask.task_date <= end)
+
+    is_completed = func.coalesce(StudyTask.is_completed, False)
+    if status == "completed":
+        query = query.filter(is_completed == True)
+    elif status == "pending":
+        query = query.filter(is_completed == False)
+    elif status == "missed":
+        query = query.filter(is_completed == False, StudyTask.task_date < today)
+
+    # Keyset pagination on (task_date, id): each page is one indexed
+    # range read, however deep into the history it is
+    if before:
+        query = query.filter(
+            StudyTask.task_date <= before[0],
+            or_(
+                StudyTask.task_date < before[0],
+                StudyTask.id < before[1]
+            )
+        ).order_by(StudyTask.task_date.desc(), StudyTask.id.desc())
+    else:
+        if after:
+            query = query.filter(
+                StudyTask.task_date >= after[0],
+                or_(
+                    StudyTask.task_date > after[0],
+                    StudyTask.id > after[1]
+                )
+            )
+        query = query.order_by(StudyTask.task_date, StudyTask.id)
+
+    tasks = query.limit(per_page + 1).all()
+
+    has_more = len(tasks) > per_page
+    tasks = tasks[:per_page]
+    if before:
+        tasks.reverse()
+
+    filters = {
+        key: value for key, value in request.args.items()
+        if key in ("status", "start", "end", "per_page") and value
+    }
+
+    # Paging backwards, the page we came from is always there
+    has_next = True if before else has_more
+    has_prev = has_more if before else bool(after)
+
+    next_url = prev_url = None
+    if tasks and has_next:
+        next_url = url_for("tasks.all_tasks", after=format_cursor(tasks[-1]), **filters)
+    if tasks and has_prev:
+        prev_url = url_for("tasks.all_tasks", before=format_cursor(tasks[0]), **filters)
+
+    return render_template(
+        "all_tasks.html",
+        tasks=tasks,
+        status=status,
+        start=start,
+        end=end,
+        next_url=next_url,
+        prev_url=prev_url
+    )
+
+
+def parse_date_arg(name):
+    try:
+        return datetime.strptime(request.args.get(name, ""), "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+def format_cursor(task):
+    return f"{task.task_date.isoformat()}.{task.id}"
+
+
+def parse_cursor(cursor):
+    # "2026-01-31.42" -> (date(2026, 1, 31), 42)
+    try:
+        task_date, task_id = (cursor or "").split(".")
+        return datetime.strptime(task_date, "%Y-%m-%d").date(), int(task_id)
+    except ValueError:
+        return None
+
+
+@bp.route("/tasks/today")
+@cached_page
+@login_required
+def today_tasks():
+    user_id = session["user_id"]
+    today = date.today()
+
+    tasks = StudyTask.query.options(
+        joinedload(StudyTask.subject),
+        joinedload(StudyTask.topic)
+    ).filter_by(
+        user_id=user_id,
+        task_date=today
+    ).all()
+
+    # -------------------------
+    # YouTube Integration
+    # -------------------------
+    videos_map = videos_for_topics(
+        (task.topic.id, task.topic.name) for task in tasks
+    )
+
+    return render_template(
+        "today_tasks.html",
+        tasks=tasks,
+        videos_map=videos_map
+    )
+
+@bp.route("/tasks/update", methods=["POST"])
+@login_required
+def bulk_complete_tasks():
+    user_id = session["user_id"]
+
+    selected_ids = {int(task_id) for task_id in request.form.getlist("completed_tasks")}
+
+    # The task pages post every task they showed as "visible_tasks", so
+    # unchecked boxes are known. Older forms without it fall back to
+    # treating every task of the user as shown.
+    visible_ids = {int(task_id) for task_id in request.form.getlist("visible_tasks")}
+
+    hold_users([user_id])
+    state = db.session.query(
+        StudyTask.id, StudyTask.is_completed, StudyTask.subject_id, StudyTask.task_date
+    ).filter(StudyTask.user_id == user_id)
+
+    if visible_ids:
+        state = state.filter(StudyTask.id.in_(visible_ids | selected_ids))
+    else:
+        state = state.filter(
+            StudyTask.id.in_(selected_ids) | (StudyTask.is_completed == True)
+        )
+
+    to_complete = []
+    to_reopen = []
+    progress = ProgressDelta()
+
+    for task_id, is_completed, subject_id, task_date in state:
+        completed = task_id in selected_ids
+        if completed == bool(is_completed):
+            continue
+
+        (to_complete if completed else to_reopen).append(task_id)
+        progress.set_completed(user_id, subject_id, task_date, completed)
+
+    if to_complete or to_reopen:
+        progress.apply()
+        now = datetime.now()
+
+        for task_ids, completed in ((to_complete, True), (to_reopen, False)):
+            if task_ids:
+                db.session.execute(
+                    update(StudyTask)
+                    .where(StudyTask.id.in_(task_ids), StudyTask.user_id == user_id)
+                    .values(is_completed=completed, completed_at=now if completed else None)
+                    .execution_options(synchronize_session=False)
+                )
+
+        db.session.commit()
+
+    # Return to the same page of the task list
+    next_url = request.form.get("next", "")
+    if not next_url.startswith(url_for("tasks.all_tasks")):
+        next_url = url_for("tasks.all_tasks")
+
+    return redirect(next_url)
+
+
+@bp.route("/complete-task/<int:task_id>")
+def complete_task(task_id):
+    owner_id = db.session.query(StudyTask.user_id).filter(StudyTask.id == task_id).scalar()
+    if owner_id is not None:
+        hold_users([owner_id])
+
+    task = StudyTask.query.get(task_id)
+
+    if not task:
+        return "Task not found"
+
+    if not task.is_completed:
+        progress = ProgressDelta()
+        progress.set_completed(task.user_id, task.subject_id, task.task_date, True)
+        progress.apply()
+        task.completed_at = datetime.now()
+
+    task.is_completed = True
+    db.session.commit()
+
+    return f"Task {task_id} marked as completed"
+
+
+@bp.route("/auto-reschedule")
+@login_required
+def auto_reschedule():
+    # Only the user's own tasks; everyone's are moved by the nightly
+    # batch job (flask run-jobs reschedule)
+    user_id = session["user_id"]
+
+    # One transaction, so the hold lasts until the moves are written
+    hold_users([user_id])
+    moved, user_ids = reschedule_missed_tasks(user_id, batch_size=None)
+
+    if not moved:
+        return "No missed tasks 🎉"
+
+    prefetch_upcoming_videos(user_ids)
+    return f"{moved} task(s) rescheduled successfully"
@@ -0,0 +1,255 @@
+import os
+import time
+import click
+from datetime import date, timedelta
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import func, inspect, select
+
+import jobs
+import migrations
+from extensions import db
+from models import Exam, StudyTask, StudyTime, Subject, SubjectProgress, Topic, User, UserProgress
+from progress import (
+    PROGRESS_FIELDS, aggregate_progress, completed_since, completion_rows, ensure_progress,
+    plan_rows
+)
+
+
+@click.command("rebuild-progress")
+@with_appcontext
+@click.option("--check", is_flag=True,
+              help="Only report users whose counters are out of date.")
+def rebuild_progress_command(check):
+    """Recompute the stored progress counters from the task table."""
+    today = date.today()
+    user_ids = [user_id for (user_id,) in db.session.query(User.id)]
+
+    ensure_progress(user_ids, today)
+    users, subjects = aggregate_progress(user_ids, today)
+
+    stored_subjects = {
+        (row.user_id, row.subject_id): [row.total, row.completed]
+        for row in SubjectProgress.query.filter(SubjectProgress.total > 0)
+    }
+
+    mismatched = set()
+    for progress in UserProgress.query:
+        expected = users.get(progress.user_id)
+        if expected is None:
+            continue
+        if any(getattr(progress, field) != expected[field] for field in PROGRESS_FIELDS):
+            mismatched.add(progress.user_id)
+    for key in set(stored_subjects) | {k for k, v in subjects.items() if v[0]}:
+        if stored_subjects.get(key) != subjects.get(key):
+            mismatched.add(key[0])
+
+    if check:
+        db.session.rollback()
+        for user_id in sorted(mismatched):
+            click.echo(f"user {user_id}: progress counters out of date")
+        click.echo(f"{len(mismatched)} of {len(user_ids)} user(s) inconsistent")
+        if mismatched:
+            raise SystemExit(1)
+        return
+
+    UserProgress.query.delete()
+    SubjectProgress.query.delete()
+    db.session.flush()
+    ensure_progress(user_ids, today)
+    db.session.commit()
+    click.echo(f"Rebuilt progress for {len(user_ids)} user(s), {len(mismatched)} were inconsistent")
+
+
+def hot_queries(user_id=1, today=None):
+    """The filters behind the busiest routes, for the EXPLAIN check."""
+    today = today or date.today()
+    window = current_app.config["FORECAST_WINDOW_DAYS"]
+    pending = func.coalesce(StudyTask.is_completed, False) == False
+
+    return {
+        "today_tasks": select(StudyTask).where(
+            StudyTask.user_id == user_id, StudyTask.task_date == today
+        ),
+        "all_tasks": select(StudyTask).where(
+            StudyTask.user_id == user_id
+        ).order_by(StudyTask.task_date),
+        "dashboard subjects": select(
+            SubjectProgress.subject_id, Subject.name, Exam.exam_date
+        ).join(SubjectProgress.subject).outerjoin(
+            Exam, Exam.subject_id == SubjectProgress.subject_id
+        ).where(SubjectProgress.user_id == user_id, SubjectProgress.total > 0),
+        "dashboard recent completions": select(
+            StudyTask.subject_id, StudyTask.task_date, StudyTask.completed_at
+        ).where(
+            StudyTask.user_id == user_id, completed_since(today - timedelta(days=window - 1))
+        ),
+        "dashboard rollover": select(
+            StudyTask.task_date, func.count(StudyTask.id)
+        ).where(
+            StudyTask.user_id == user_id,
+            pending,
+            StudyTask.task_date > today - timedelta(days=7),
+            StudyTask.task_date <= today
+        ).group_by(StudyTask.task_date),
+        "generate_plan planned topics": select(StudyTask.topic_id).where(
+            StudyTask.user_id == user_id
+        ),
+        "generate_plan daily load": select(
+            StudyTask.task_date, func.count(StudyTask.id)
+        ).where(
+            StudyTask.user_id == user_id, StudyTask.task_date >= today
+        ).group_by(StudyTask.task_date),
+        "reschedule missed": select(StudyTask.id).where(
+            StudyTask.user_id.in_([user_id, user_id + 1]),
+            StudyTask.task_date < today,
+            StudyTask.is_completed == False
+        ),
+        "bulk_complete_tasks": select(StudyTask.id, StudyTask.is_completed).where(
+            StudyTask.user_id == user_id, StudyTask.id.in_([1, 2, 3])
+        ),
+        "add_topic duplicate check": select(Topic.id).where(
+            Topic.subject_id == 1, Topic.name == "Recursion"
+        ),
+        "add_exam": select(Exam).where(Exam.subject_id == 1),
+        "add_study_time": select(StudyTime).where(StudyTime.user_id == user_id),
+    }
+
+
+@click.command("db-upgrade")
+@with_appcontext
+def db_upgrade_command():
+    """Create missing tables and apply pending schema migrations."""
+    fresh = not inspect(db.engine).has_table("study_task")
+    db.create_all()
+
+    ran = migrations.upgrade(db.engine, fresh=fresh)
+    for name in ran:
+        click.echo(f"Applied {name}")
+    click.echo("Database is up to date")
+
+
+@click.command("check-indexes")
+@with_appcontext
+def check_indexes_command():
+    """EXPLAIN each hot query and fail if any of them scans a whole table."""
+    failures = 0
+
+    with db.engine.connect() as connection:
+        for name, statement in hot_queries().items():
+            plan = migrations.explain(connection, statement)
+            scans = migrations.full_scans(plan)
+
+            status = "FULL SCAN" if scans else "ok"
+            click.echo(f"{status:9} {name}: {'; '.join(plan)}")
+            failures += bool(scans)
+
+    if failures:
+        click.echo(f"{failures} hot query(ies) without a usable index")
+        raise SystemExit(1)
+
+
+@click.command("run-jobs")
+@with_appcontext
+@click.argument("job_names", nargs=-1, type=click.Choice(list(jobs.JOBS)))
+@click.option("--workers", type=int, default=lambda: min(os.cpu_count() or 1, 4),
+              show_default="CPUs, at most 4", help="Worker processes.")
+@click.option("--chunk-size", type=int, default=100, show_default=True,
+              help="Users per chunk (and per transaction).")
+@click.option("--checkpoint", "checkpoint_path", type=click.Path(dir_okay=False),
+              help="Progress file [default: instance/jobs-checkpoint.json].")
+@click.option("--resume", is_flag=True,
+              help="Skip the chunks an interrupted run of the same jobs finished today.")
+@click.option("--lease-ttl", type=int, default=600, show_default=True,
+              help="Seconds before another runner may take over a user.")
+def run_jobs_command(job_names, workers, chunk_size, checkpoint_path, resume, lease_ttl):
+    """Run the nightly maintenance jobs over all users (default: all jobs)."""
+    if checkpoint_path is None:
+        os.makedirs(current_app.instance_path, exist_ok=True)
+        checkpoint_path = os.path.join(current_app.instance_path, "jobs-checkpoint.json")
+
+    jobs.run_jobs(
+        [name for name in jobs.JOBS if name in job_names] if job_names else list(jobs.JOBS),
+        workers=workers,
+        chunk_size=chunk_size,
+        checkpoint_path=checkpoint_path,
+        resume=resume,
+        lease_ttl=lease_ttl,
+        echo=click.echo
+    )
+
+
+@click.command("progress-report")
+@with_appcontext
+@click.option("--window", type=int,
+              help="Days of completions that set each user's pace "
+                   "[default: FORECAST_WINDOW_DAYS].")
+@click.option("--top", type=int, default=10, show_default=True,
+              help="At-risk users to list.")
+def progress_report_command(window, top):
+    """Pace, predicted finish and exam risk across all users."""
+    import numpy as np
+    from utils.analytics import (
+        AT_RISK, burndown, completions, daily_completions, first_columns, forecast, plans,
+        rolling_velocity
+    )
+
+    window = window or current_app.config["FORECAST_WINDOW_DAYS"]
+    today = date.today()
+    start = today - timedelta(days=window - 1)
+
+    started = time.perf_counter()
+    ensure_progress([user_id for (user_id,) in db.session.query(User.id)], today)
+    db.session.commit()
+    plan = plans(plan_rows())
+    done = completions(completion_rows(today, window), today)
+    loaded = time.perf_counter()
+    pace, risks = forecast(plan, done, today, window)
+    analysed = time.perf_counter()
+
+    click.echo(f"{len(plan.subject_ids)} subject(s) of {len(pace.user_ids)} user(s), "
+               f"{len(done.user_ids)} recent completion(s), loaded in "
+               f"{loaded - started:.2f}s, analysed in {analysed - loaded:.3f}s")
+    if not len(pace.user_ids):
+        return
+
+    # Day by day across the cohort
+    counts = daily_completions(done, pace.user_ids, start, today)
+    velocity = rolling_velocity(counts, window, first_columns(plan, start))
+    remaining = burndown(plan, done, start, today).sum(axis=0)
+
+    click.echo(f"{'day':<12} {'completed':>9} {'open':>8} {'median pace':>12}")
+    for offset, (completed, still_open, median) in enumerate(
+        zip(counts.sum(axis=0), remaining, np.median(velocity, axis=0))
+    ):
+        click.echo(f"{start + timedelta(days=offset)!s:<12} {completed:>9} "
+                   f"{still_open:>8} {median:>12.2f}")
+
+    open_tasks = pace.total - pace.completed
+    p10, p50, p90 = np.percentile(pace.velocity, [10, 50, 90])
+    click.echo(f"Completed {pace.completed.sum()} of {pace.total.sum()} task(s) "
+               f"({pace.completed.sum() / pace.total.sum():.0%})")
+    click.echo(f"Tasks a day over the last {window} days: "
+               f"p10 {p10:.2f}, median {p50:.2f}, p90 {p90:.2f}")
+    click.echo(f"{np.count_nonzero((pace.velocity == 0) & (open_tasks > 0))} user(s) "
+               f"with open tasks completed none in that time")
+
+    # NaN (no exams) compares False
+    flagged = np.flatnonzero(pace.exam_risk >= AT_RISK)
+    click.echo(f"{len(flagged)} user(s) with {np.count_nonzero(risks.risk >= AT_RISK)} "
+               f"subject(s) at risk of not being finished before the exam")
+
+    for index in flagged[np.argsort(-pace.exam_risk[flagged], kind="stable")][:top]:
+        finish = pace.finish_dates[index].item()
+        click.echo(
+            f"  user {pace.user_ids[index]}: {open_tasks[index]} open, "
+            f"{pace.velocity[index]:.2f} a day, "
+            f"finish {finish.isoformat() if finish else 'not in sight'}, "
+            f"{pace.exam_risk[index]:.0%} left at the exam"
+        )
+
+
+def register_commands(app):
+    for command in (rebuild_progress_command, db_upgrade_command, check_indexes_command,
+                    run_jobs_command, progress_report_command):
+        app.cli.add_command(command)
@@ -0,0 +1,114 @@
+import os
+
+
+def database_url():
+    url = os.getenv("DATABASE_URL", "sqlite:///studyplanner.db")
+
+    # Heroku-style URLs use a scheme SQLAlchemy no longer accepts
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    return url
+
+
+def env_flag(name, default):
+    return os.getenv(name, default).lower() in ("1", "true", "yes", "on")
+
+
+class Config:
+    SQLALCHEMY_DATABASE_URI = database_url()
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkey")
+
+    # Largest request body accepted, e.g. a topic import file
+    MAX_CONTENT_LENGTH = int(os.getenv("MAX_UPLOAD_BYTES", str(2 * 1024 * 1024)))
+
+    # Rows of an uploaded task CSV written per transaction
+    TASK_IMPORT_BATCH = int(os.getenv("TASK_IMPORT_BATCH", "1000"))
+
+    # Trailing days whose completions set the pace of the dashboard
+    # forecast and the cohort report
+    FORECAST_WINDOW_DAYS = int(os.getenv("FORECAST_WINDOW_DAYS", "14"))
+
+    # Days ahead (including today) whose topics get their videos prefetched
+    VIDEO_PREFETCH_DAYS = int(os.getenv("VIDEO_PREFETCH_DAYS", "3"))
+
+    # Connection pool for server databases (PostgreSQL, MySQL)
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING = env_flag("DB_POOL_PRE_PING", "true")
+
+    # SQLite pragmas, applied to every new connection
+    SQLITE_WAL = env_flag("SQLITE_WAL", "true")
+    SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+    # Request instrumentation, see instrumentation.py. Requests slower
+    # than SLOW_REQUEST_MS are logged with their SQL (0 turns that off)
+    METRICS_ENABLED = env_flag("METRICS_ENABLED", "true")
+    SERVER_TIMING = env_flag("SERVER_TIMING", "false")
+    SLOW_REQUEST_MS = int(os.getenv("SLOW_REQUEST_MS", "500"))
+
+    # Per-user page cache, see page_cache.py. Pages live in this process
+    # unless PAGE_CACHE_URL points at a Redis server. Change
+    # PAGE_CACHE_SALT on deploy so browsers drop pages rendered by the
+    # old templates.
+    PAGE_CACHE_ENABLED = env_flag("PAGE_CACHE_ENABLED", "true")
+    PAGE_CACHE_URL = os.getenv("PAGE_CACHE_URL", "")
+    PAGE_CACHE_SIZE = int(os.getenv("PAGE_CACHE_SIZE", "1024"))
+    PAGE_CACHE_TTL = int(os.getenv("PAGE_CACHE_TTL", str(24 * 3600)))
+    PAGE_CACHE_SALT = os.getenv("PAGE_CACHE_SALT", "")
+
+    # Server-side sessions, see sessions.py: memory://, sqlite:///path,
+    # file:///dir or redis://host. Left empty, sessions stay in the signed
+    # cookie and the logged-in user's profile is loaded on every request.
+    SESSION_STORE_URL = os.getenv("SESSION_STORE_URL", "")
+    PROFILE_CACHE_TTL = int(os.getenv("PROFILE_CACHE_TTL", "3600"))
+
+    # Password hashing, see passwords.py. Any werkzeug method works, e.g.
+    # "scrypt:16384:8:1" or "pbkdf2:sha256:600000"; stored hashes are
+    # upgraded to it as users log in. PASSWORD_HASH_WORKERS=0 hashes on
+    # the request thread.
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt")
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "32"))
+    PASSWORD_HASH_NICE = int(os.getenv("PASSWORD_HASH_NICE", "10"))
+
+    # Login and registration attempts allowed per client IP, and login
+    # attempts per email address, see throttle.py
+    AUTH_THROTTLE_ENABLED = env_flag("AUTH_THROTTLE_ENABLED", "true")
+    AUTH_IP_PER_MINUTE = float(os.getenv("AUTH_IP_PER_MINUTE", "30"))
+    AUTH_IP_BURST = int(os.getenv("AUTH_IP_BURST", "10"))
+    LOGIN_EMAIL_PER_MINUTE = float(os.getenv("LOGIN_EMAIL_PER_MINUTE", "5"))
+    LOGIN_EMAIL_BURST = int(os.getenv("LOGIN_EMAIL_BURST", "5"))
+
+
+def engine_options(config):
+    """SQLALCHEMY_ENGINE_OPTIONS for the configured database URL."""
+    if config["SQLALCHEMY_DATABASE_URI"].startswith("sqlite"):
+        # Pragmas are set per connection, see sqlite_pragmas()
+        return {
+            "connect_args": {"timeout": config["SQLITE_BUSY_TIMEOUT_MS"] / 1000}
+        }
+
+    return {
+        "pool_size": config["DB_POOL_SIZE"],
+        "max_overflow": config["DB_MAX_OVERFLOW"],
+        "pool_timeout": config["DB_POOL_TIMEOUT"],
+        "pool_recycle": config["DB_POOL_RECYCLE"],
+        "pool_pre_ping": config["DB_POOL_PRE_PING"],
+    }
+
+
+def sqlite_pragmas(config):
+    pragmas = [
+        f"PRAGMA busy_timeout = {int(config['SQLITE_BUSY_TIMEOUT_MS'])}",
+        f"PRAGMA synchronous = {config['SQLITE_SYNCHRONOUS']}",
+        f"PRAGMA mmap_size = {int(config['SQLITE_MMAP_SIZE'])}",
+    ]
+    if config["SQLITE_WAL"]:
+        # Readers no longer block the writer (and vice versa)
+        pragmas.insert(0, "PRAGMA journal_mode = WAL")
+    return pragmas
@@ -0,0 +1,5 @@
+from flask_sqlalchemy import SQLAlchemy
+
+
+# Bound to the app in create_app()
+db = SQLAlchemy()
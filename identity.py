@@ -0,0 +1,110 @@
+from collections import namedtuple
+from functools import wraps
+from flask import current_app, g, redirect, session, url_for
+from werkzeug.local import LocalProxy
+
+from extensions import db
+from models import StudyTime, User
+
+
+CurrentUser = namedtuple("CurrentUser", ["id", "name", "email", "study_time"])
+StudySettings = namedtuple("StudySettings", ["hours_per_day", "days_per_week"])
+
+
+def load_profile(user_id):
+    """Profile and study-time settings of one user, in one query."""
+    row = db.session.query(
+        User.id, User.name, User.email, StudyTime.hours_per_day, StudyTime.days_per_week
+    ).outerjoin(StudyTime, StudyTime.user_id == User.id).filter(User.id == user_id).first()
+
+    if row is None:
+        return None
+    return {
+        "id": row.id,
+        "name": row.name,
+        "email": row.email,
+        "study_time": (
+            None if row.hours_per_day is None
+            else [row.hours_per_day, row.days_per_week]
+        ),
+    }
+
+
+def get_current_user():
+    """The logged-in user, loaded at most once per request.
+
+    With a server-side session store the profile is also kept there
+    between requests (see invalidate_profile()), so most requests never
+    query for it.
+    """
+    if "user" in g:
+        return g.user
+
+    user_id = session.get("user_id")
+    profile = None
+
+    if user_id:
+        store = current_app.extensions["session_store"]
+        key = f"profile:{user_id}"
+
+        profile = store.get(key) if store else None
+        if profile is None:
+            profile = load_profile(user_id)
+            if profile is not None and store:
+                store.set(key, profile, current_app.config["PROFILE_CACHE_TTL"])
+
+        if profile is None:
+            # The account is gone; forget the login
+            session.pop("user_id", None)
+
+    g.user = profile and CurrentUser(
+        profile["id"],
+        profile["name"],
+        profile["email"],
+        profile["study_time"] and StudySettings(*profile["study_time"])
+    )
+    return g.user
+
+
+current_user = LocalProxy(get_current_user)
+
+
+def invalidate_profile(user_id):
+    """Drop the cached profile after a write to it or to the study time.
+
+    Call after the commit, so the next load sees the new values.
+    """
+    store = current_app.extensions["session_store"]
+    if store:
+        store.delete(f"profile:{user_id}")
+
+    if g.get("user") and g.user.id == user_id:
+        g.pop("user")
+
+
+def login_user(user_id):
+    regenerate = getattr(session, "regenerate", None)
+    if regenerate:
+        regenerate()
+    session["user_id"] = user_id
+    g.pop("user", None)
+
+
+def logout_user():
+    session.pop("user_id", None)
+    g.pop("user", None)
+
+
+def login_required(view):
+    """Send anonymous visitors to the login page.
+
+    Only the session is checked; the profile is loaded when the view
+    uses ``current_user``.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not session.get("user_id"):
+            return redirect(url_for("auth.login"))
+        return view(*args, **kwargs)
+
+    return wrapper
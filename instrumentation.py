@@ -0,0 +1,289 @@
+import inspect
+import threading
+import time
+from functools import partial
+from flask import Response, before_render_template, current_app, g, has_app_context, request
+from flask import template_rendered
+from sqlalchemy import event
+
+from extensions import db
+from utils.video_cache import video_lookup, youtube_search
+
+
+# Upper bounds, in seconds, of the latency histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Statements kept per request for the slow-request log
+MAX_LOGGED_STATEMENTS = 50
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class Metrics:
+    """Counters and histograms for one process, in Prometheus text format.
+
+    Each worker process keeps its own numbers; the scraper (or whoever
+    reads /metrics) sees the worker that served the scrape.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters = {}
+            self.histograms = {}
+
+    def inc(self, name, labels, value=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def render(self):
+        lines = []
+        typed = set()
+
+        def declare(name, kind):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                declare(name, "counter")
+                lines.append(f"{name}{format_labels(labels)} {value:g}")
+
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                declare(name, "histogram")
+                bounds = [f"{bound:g}" for bound in histogram.buckets] + ["+Inf"]
+                counts = histogram.counts + [histogram.count]
+                for bound, count in zip(bounds, counts):
+                    lines.append(
+                        f"{name}_bucket{format_labels(labels + (('le', bound),))} {count}"
+                    )
+                lines.append(f"{name}_sum{format_labels(labels)} {histogram.sum:g}")
+                lines.append(f"{name}_count{format_labels(labels)} {histogram.count}")
+
+        return "\n".join(lines) + "\n"
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+
+    pairs = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"')
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+metrics = Metrics()
+
+
+# -------------------------
+# Per-request collection
+# -------------------------
+
+def current_stats():
+    # Only requests collect; background threads have no app context
+    if has_app_context():
+        return g.get("perf")
+    return None
+
+
+def start_request():
+    g.perf = {
+        "started": time.perf_counter(),
+        "status": 500,
+        "sql_count": 0,
+        "sql_time": 0.0,
+        "statements": [],
+        "video_calls": 0,
+        "video_time": 0.0,
+        "render_time": 0.0,
+    }
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept with the statement's context, so a failed statement's entry
+    # can be told apart from an outer one's (see query_failed)
+    conn.info.setdefault("query_started", []).append((context, time.perf_counter()))
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _, started = conn.info["query_started"].pop()
+    elapsed = time.perf_counter() - started
+
+    stats = current_stats()
+    if stats is None:
+        return
+
+    stats["sql_count"] += 1
+    stats["sql_time"] += elapsed
+    if len(stats["statements"]) < MAX_LOGGED_STATEMENTS:
+        stats["statements"].append((elapsed, statement))
+
+
+def query_failed(exception_context):
+    # A statement that raised never reaches after_cursor_execute; drop
+    # its start time, unless it failed before it got one
+    conn = exception_context.connection
+    started = conn.info.get("query_started") if conn is not None else None
+    if started and started[-1][0] is exception_context.execution_context:
+        started.pop()
+
+
+def template_started(app, template, context, **extra):
+    stats = current_stats()
+    if stats is not None:
+        stats["render_started"] = time.perf_counter()
+
+
+def template_finished(app, template, context, **extra):
+    stats = current_stats()
+    if stats is not None and "render_started" in stats:
+        stats["render_time"] += time.perf_counter() - stats.pop("render_started")
+
+
+def video_lookup_finished(source, topics, seconds, **extra):
+    metrics.inc("studyplanner_video_lookups_total", {"source": source})
+    metrics.inc("studyplanner_video_topics_total", {"source": source}, topics)
+    metrics.inc("studyplanner_video_lookup_seconds_total", {"source": source}, seconds)
+
+    stats = current_stats()
+    if stats is not None:
+        stats["video_calls"] += 1
+        stats["video_time"] += seconds
+
+
+def youtube_search_finished(sender, seconds, failed, refused=False, **extra):
+    if refused:
+        # Circuit open, out of quota or rate limited: no request was made
+        metrics.inc("studyplanner_youtube_requests_total", {"outcome": "refused"})
+        return
+
+    outcome = "error" if failed else "ok"
+    metrics.inc("studyplanner_youtube_requests_total", {"outcome": outcome})
+    metrics.observe("studyplanner_youtube_request_seconds", {}, seconds)
+
+
+def after_request(response):
+    stats = current_stats()
+    if stats is None:
+        return response
+
+    stats["status"] = response.status_code
+
+    if current_app.config["SERVER_TIMING"]:
+        elapsed = time.perf_counter() - stats["started"]
+        response.headers["Server-Timing"] = ", ".join([
+            f'db;dur={stats["sql_time"] * 1000:.1f};desc="{stats["sql_count"]} queries"',
+            f'video;dur={stats["video_time"] * 1000:.1f};desc="{stats["video_calls"]} lookups"',
+            f'render;dur={stats["render_time"] * 1000:.1f}',
+            f'app;dur={elapsed * 1000:.1f}',
+        ])
+
+    if inspect.isgenerator(response.response):
+        # A streamed view (stream_with_context) has returned but its body
+        # hasn't been produced yet; record once it has been sent, with
+        # the queries it ran
+        stats["deferred"] = True
+        response.call_on_close(partial(
+            record_request, current_app._get_current_object(), stats,
+            request.endpoint, request.method, request.full_path
+        ))
+    return response
+
+
+def teardown_request(exc):
+    stats = current_stats()
+    if stats is None or stats.get("deferred"):
+        return
+
+    if exc is not None:
+        stats["status"] = 500
+    record_request(
+        current_app, stats, request.endpoint, request.method, request.full_path
+    )
+
+
+def record_request(app, stats, endpoint, method, path):
+    elapsed = time.perf_counter() - stats["started"]
+    labels = {"endpoint": endpoint or "unmatched"}
+
+    metrics.inc("studyplanner_requests_total", dict(
+        labels, method=method, status=str(stats["status"])
+    ))
+    metrics.observe("studyplanner_request_seconds", labels, elapsed)
+    metrics.inc("studyplanner_sql_queries_total", labels, stats["sql_count"])
+    metrics.inc("studyplanner_sql_seconds_total", labels, stats["sql_time"])
+    metrics.inc("studyplanner_template_seconds_total", labels, stats["render_time"])
+
+    threshold = app.config["SLOW_REQUEST_MS"]
+    if threshold and elapsed * 1000 >= threshold:
+        metrics.inc("studyplanner_slow_requests_total", labels)
+        app.logger.warning(slow_request_message(stats, elapsed, method, path))
+
+
+def slow_request_message(stats, elapsed, method, path):
+    lines = [
+        f"Slow request: {method} {path.rstrip('?')} -> {stats['status']} "
+        f"in {elapsed * 1000:.0f} ms "
+        f"(sql {stats['sql_count']} queries / {stats['sql_time'] * 1000:.0f} ms, "
+        f"video {stats['video_calls']} lookups / {stats['video_time'] * 1000:.0f} ms, "
+        f"render {stats['render_time'] * 1000:.0f} ms)"
+    ]
+
+    # Slowest statements first
+    for seconds, statement in sorted(stats["statements"], key=lambda s: s[0], reverse=True):
+        lines.append(f"  {seconds * 1000:8.1f} ms  {' '.join(statement.split())}")
+    if stats["sql_count"] > len(stats["statements"]):
+        lines.append(f"  ... {stats['sql_count'] - len(stats['statements'])} more")
+
+    return "\n".join(lines)
+
+
+def metrics_view():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+def init_app(app):
+    app.before_request(start_request)
+    app.after_request(after_request)
+    app.teardown_request(teardown_request)
+
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(db.engine, "after_cursor_execute", after_cursor_execute)
+        event.listen(db.engine, "handle_error", query_failed)
+
+    before_render_template.connect(template_started, app)
+    template_rendered.connect(template_finished, app)
+    video_lookup.connect(video_lookup_finished)
+    youtube_search.connect(youtube_search_finished)
+
+    if app.config["METRICS_ENABLED"]:
+        app.add_url_rule("/metrics", "metrics", metrics_view)
@@ -0,0 +1,311 @@
+"""Nightly maintenance over every user, in chunks, on a process pool.
+
+    flask run-jobs                          # all jobs
+    flask run-jobs reschedule progress --workers 4 --chunk-size 200
+    flask run-jobs --resume                 # continue an interrupted run
+
+Jobs:
+
+    reschedule  move missed tasks onto the next free study slots
+    progress    recompute the stored progress counters
+    videos      queue video lookups for the next few days' topics
+    cleanup     drop empty progress rows, expired video cache entries,
+                sessions and job leases
+
+Each chunk of users is leased in the user_lock table, so two runners
+never work on the same user. Its writes start by bumping the users'
+cache_version, which locks their rows. Live edits to tasks and progress
+start with leases.hold_users(): it takes the same row locks and then
+refuses the edit (503) while a job holds the lease, so an edit never
+interleaves with a chunk or works from what the chunk changed under it.
+The users each finished chunk processed are recorded in a JSON
+checkpoint, which --resume reads to skip them; users that were leased
+elsewhere aren't recorded, so a resumed run retries them.
+"""
+import json
+import multiprocessing
+import os
+import socket
+import time
+from datetime import date, timedelta
+from flask import current_app
+from sqlalchemy import delete, select
+
+from extensions import db
+from models import SubjectProgress, User, UserLock, UserProgress
+from leases import utcnow
+from page_cache import invalidate_pages
+from planning import insert_ignoring_duplicates, prefetch_upcoming_videos, reschedule_missed_tasks
+from progress import ensure_progress
+
+
+# -------------------------
+# Jobs, each run on one chunk of user IDs inside a transaction
+# -------------------------
+
+def reschedule_job(user_ids, today):
+    moved, _ = reschedule_missed_tasks(batch_size=None, user_ids=user_ids)
+    return moved
+
+
+def progress_job(user_ids, today):
+    db.session.execute(delete(UserProgress).where(UserProgress.user_id.in_(user_ids)))
+    db.session.execute(delete(SubjectProgress).where(SubjectProgress.user_id.in_(user_ids)))
+    ensure_progress(user_ids, today)
+    return len(user_ids)
+
+
+def videos_job(user_ids, today):
+    prefetch_upcoming_videos(user_ids)
+    return len(user_ids)
+
+
+def cleanup_job(user_ids, today):
+    # Subjects whose tasks were all replanned away
+    return db.session.execute(
+        delete(SubjectProgress).where(
+            SubjectProgress.user_id.in_(user_ids), SubjectProgress.total == 0
+        )
+    ).rowcount
+
+
+JOBS = {
+    "reschedule": reschedule_job,
+    "progress": progress_job,
+    "videos": videos_job,
+    "cleanup": cleanup_job,
+}
+
+
+def cleanup_shared():
+    """The part of cleanup that isn't per user; runs once per run."""
+    from utils.video_cache import video_cache
+
+    removed = {"video cache entries": video_cache.purge_expired()}
+
+    store = current_app.extensions["session_store"]
+    if store:
+        removed["sessions"] = store.purge()
+
+    removed["leases"] = db.session.execute(
+        delete(UserLock).where(UserLock.expires_at < utcnow())
+    ).rowcount
+    db.session.commit()
+    return removed
+
+
+# -------------------------
+# Leases
+# -------------------------
+
+def acquire_leases(user_ids, owner, ttl):
+    """Lease as many of ``user_ids`` as are free; returns the leased ones."""
+    now = utcnow()
+    # Whole seconds: MySQL's DATETIME would drop the rest, and the
+    # read back below compares it
+    expires_at = (now + timedelta(seconds=ttl)).replace(microsecond=0)
+
+    db.session.execute(
+        delete(UserLock).where(UserLock.user_id.in_(user_ids), UserLock.expires_at < now)
+    )
+    db.session.execute(
+        insert_ignoring_duplicates(UserLock, ["user_id"]),
+        [{"user_id": user_id, "owner": owner, "expires_at": expires_at} for user_id in user_ids]
+    )
+    # Read back rather than RETURNING, which MySQL doesn't have
+    leased = db.session.execute(
+        select(UserLock.user_id).where(
+            UserLock.user_id.in_(user_ids),
+            UserLock.owner == owner,
+            UserLock.expires_at == expires_at
+        )
+    ).scalars().all()
+    db.session.commit()
+    return sorted(leased)
+
+
+def release_leases(user_ids, owner):
+    db.session.execute(
+        delete(UserLock).where(UserLock.user_id.in_(user_ids), UserLock.owner == owner)
+    )
+    db.session.commit()
+
+
+# -------------------------
+# Workers
+# -------------------------
+
+_app = None
+
+
+def init_worker(settings):
+    # Spawned workers build their own app, engine and connections, from
+    # the parent app's settings rather than the environment's defaults
+    global _app
+    from types import SimpleNamespace
+    from app import create_app
+
+    _app = create_app(SimpleNamespace(**settings))
+
+
+def run_chunk(user_ids, job_names, today, lease_ttl):
+    started = time.perf_counter()
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    counts = dict.fromkeys(job_names, 0)
+
+    with _app.app_context():
+        leased = acquire_leases(user_ids, owner, lease_ttl)
+        try:
+            for name in job_names:
+                if not leased:
+                    break
+                invalidate_pages(leased)
+                counts[name] = JOBS[name](leased, today)
+                db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            release_leases(leased, owner)
+
+    return {
+        "done": processed_ranges(user_ids, leased),
+        "users": len(leased),
+        "busy": len(user_ids) - len(leased),
+        "counts": counts,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+# -------------------------
+# Runner
+# -------------------------
+
+def load_checkpoint(path, job_names, today):
+    try:
+        with open(path) as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    # Only a run of the same jobs on the same day can be resumed
+    if checkpoint.get("jobs") != job_names or checkpoint.get("date") != today.isoformat():
+        return None
+    return checkpoint
+
+
+def save_checkpoint(path, checkpoint):
+    temp = f"{path}.tmp"
+    with open(temp, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(temp, path)
+
+
+def processed_ranges(user_ids, leased):
+    """``[first, last]`` ranges of the sorted ``user_ids`` that cover the
+    leased ones and none of the rest, so a resumed run retries the users
+    that were busy."""
+    leased = set(leased)
+    ranges = []
+    run = None
+    for user_id in user_ids:
+        if user_id not in leased:
+            run = None
+        elif run is None:
+            run = [user_id, user_id]
+            ranges.append(run)
+        else:
+            run[1] = user_id
+    return ranges
+
+
+def chunked(user_ids, size):
+    return [user_ids[i:i + size] for i in range(0, len(user_ids), size)]
+
+
+def run_jobs(job_names, workers=1, chunk_size=100, checkpoint_path=None,
+             resume=False, lease_ttl=600, echo=print):
+    """Run ``job_names`` over all users; returns the totals per job."""
+    today = date.today()
+    checkpoint = None
+    if resume and checkpoint_path:
+        checkpoint = load_checkpoint(checkpoint_path, job_names, today)
+        if checkpoint is None:
+            echo("No matching checkpoint, starting from the beginning")
+        else:
+            # They weren't recorded as done, so this run retries them
+            checkpoint["busy"] = 0
+    if checkpoint is None:
+        checkpoint = {"jobs": job_names, "date": today.isoformat(), "done": [],
+                      "counts": dict.fromkeys(job_names, 0), "users": 0, "busy": 0}
+
+    done = checkpoint["done"]
+    user_ids = [
+        user_id for (user_id,) in db.session.query(User.id).order_by(User.id)
+        if not any(first <= user_id <= last for first, last in done)
+    ]
+    db.session.commit()
+    chunks = chunked(user_ids, chunk_size)
+
+    echo(f"{len(user_ids)} user(s) in {len(chunks)} chunk(s) of {chunk_size}, "
+         f"{workers} worker(s), jobs: {', '.join(job_names)}")
+
+    started = time.perf_counter()
+    processed = finished = 0
+
+    def record(result):
+        nonlocal processed, finished
+        done.extend(result["done"])
+        checkpoint["users"] += result["users"]
+        checkpoint["busy"] += result["busy"]
+        for name, count in result["counts"].items():
+            checkpoint["counts"][name] += count
+        if checkpoint_path:
+            save_checkpoint(checkpoint_path, checkpoint)
+
+        processed += result["users"] + result["busy"]
+        finished += 1
+        elapsed = time.perf_counter() - started
+        echo(f"[{finished}/{len(chunks)}] users {processed}/{len(user_ids)}  "
+             f"{processed / elapsed if elapsed else 0:.1f} users/s")
+
+    if workers > 1 and len(chunks) > 1:
+        # spawn, not fork: the parent's pooled connections must not be
+        # shared with the children
+        context = multiprocessing.get_context("spawn")
+        settings = {key: value for key, value in current_app.config.items() if key.isupper()}
+        with context.Pool(workers, initializer=init_worker, initargs=(settings,)) as pool:
+            results = [
+                pool.apply_async(run_chunk, (chunk, job_names, today, lease_ttl))
+                for chunk in chunks
+            ]
+            for result in results:
+                record(result.get())
+    else:
+        global _app
+        _app = current_app._get_current_object()
+        for chunk in chunks:
+            record(run_chunk(chunk, job_names, today, lease_ttl))
+
+    if "cleanup" in job_names:
+        for name, count in cleanup_shared().items():
+            echo(f"cleanup: {count} expired {name} removed")
+
+    elapsed = time.perf_counter() - started
+    for name in job_names:
+        echo(f"{name}: {checkpoint['counts'][name]}")
+    echo(f"{processed} user(s) in {elapsed:.1f}s ({processed / elapsed if elapsed else 0:.1f} users/s), "
+         f"{checkpoint['busy']} skipped while leased by another runner")
+
+    # A finished run leaves nothing to resume
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return checkpoint["counts"]
+
+
+if __name__ == "__main__":
+    import sys
+    from app import create_app
+
+    with create_app().app_context():
+        run_jobs(sys.argv[1:] or list(JOBS), workers=os.cpu_count() or 1)
@@ -0,0 +1,53 @@
+from datetime import datetime, timezone
+from flask import make_response
+
+from extensions import db
+from models import UserLock
+from page_cache import invalidate_pages
+
+
+# Seconds a refused edit is asked to wait; a job holds a user for one
+# chunk, usually a few seconds
+BUSY_RETRY_AFTER = 5
+
+
+class UserBusy(Exception):
+    """A batch job (see jobs.py) holds the lease on a user being edited."""
+
+
+def utcnow():
+    # Naive UTC, like the DateTime column
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def hold_users(user_ids):
+    """Start a live write to these users' tasks or progress counters.
+
+    Call it first in the transaction, before reading anything the write
+    is based on. Bumping the page version takes the users' row locks,
+    which a job also takes on the users it leased, so from here on no
+    job works on them until this transaction ends. If a job got there
+    first, UserBusy is raised instead.
+    """
+    user_ids = list(user_ids)
+    invalidate_pages(user_ids)
+
+    leased = db.session.query(UserLock.user_id).filter(
+        UserLock.user_id.in_(user_ids), UserLock.expires_at >= utcnow()
+    ).first()
+    if leased:
+        db.session.rollback()
+        raise UserBusy(f"User {leased.user_id} is leased by a batch job")
+
+
+def busy_response(error):
+    response = make_response(
+        "Your plan is being updated by scheduled maintenance. "
+        "Please try again in a few seconds.", 503
+    )
+    response.headers["Retry-After"] = str(BUSY_RETRY_AFTER)
+    return response
+
+
+def init_app(app):
+    app.register_error_handler(UserBusy, busy_response)
@@ -0,0 +1,142 @@
+from sqlalchemy import text
+
+
+# Applied in order, once each, by `flask db-upgrade`. Statements are
+# plain SQL that both SQLite and PostgreSQL accept. New tables are
+# created from the models before these run, so migrations only deal
+# with changes to tables that may already hold data.
+MIGRATIONS = [
+    ("0001_hot_path_indexes", [
+        # Duplicate topics would block the unique index; point their
+        # tasks at the oldest copy first
+        """
+        UPDATE study_task SET topic_id = (
+            SELECT MIN(keep.id) FROM topic keep
+            JOIN topic dup ON dup.subject_id = keep.subject_id AND dup.name = keep.name
+            WHERE dup.id = study_task.topic_id
+        )
+        """,
+        """
+        DELETE FROM topic WHERE id NOT IN (
+            SELECT MIN(id) FROM topic GROUP BY subject_id, name
+        )
+        """,
+        """
+        DELETE FROM study_task WHERE id NOT IN (
+            SELECT MIN(id) FROM study_task GROUP BY user_id, topic_id
+        )
+        """,
+        # add_exam and add_study_time always edited the first row
+        """
+        DELETE FROM exam WHERE id NOT IN (
+            SELECT MIN(id) FROM exam GROUP BY subject_id
+        )
+        """,
+        """
+        DELETE FROM study_time WHERE id NOT IN (
+            SELECT MIN(id) FROM study_time GROUP BY user_id
+        )
+        """,
+        # Counters are reseeded on next use
+        "DELETE FROM subject_progress",
+        "DELETE FROM user_progress",
+
+        "CREATE INDEX IF NOT EXISTS ix_subject_user ON subject (user_id)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_topic_subject_name ON topic (subject_id, name)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_exam_subject ON exam (subject_id)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_study_time_user ON study_time (user_id)",
+        "CREATE INDEX IF NOT EXISTS ix_study_task_user_date"
+        " ON study_task (user_id, task_date, is_completed)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_study_task_user_topic"
+        " ON study_task (user_id, topic_id)",
+        "CREATE INDEX IF NOT EXISTS ix_study_task_date_completed"
+        " ON study_task (task_date, is_completed)",
+    ]),
+    ("0002_user_cache_version", [
+        'ALTER TABLE "user" ADD COLUMN cache_version INTEGER NOT NULL DEFAULT 0',
+    ]),
+    ("0003_task_completed_at", [
+        "ALTER TABLE study_task ADD COLUMN completed_at TIMESTAMP",
+    ]),
+    ("0004_task_completed_at_index", [
+        "CREATE INDEX IF NOT EXISTS ix_study_task_user_completed_at"
+        " ON study_task (user_id, completed_at)",
+    ]),
+    ("0005_user_feed_secret", [
+        'ALTER TABLE "user" ADD COLUMN feed_secret VARCHAR(32)',
+    ]),
+]
+
+
+def applied_migrations(connection):
+    connection.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        " name VARCHAR(100) PRIMARY KEY,"
+        " applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    ))
+    return {
+        name for (name,) in
+        connection.execute(text("SELECT name FROM schema_migrations"))
+    }
+
+
+def upgrade(engine, fresh=False):
+    """Apply pending migrations. Returns the names that were applied.
+
+    With ``fresh`` (the tables were just created from the models) the
+    migrations are only recorded, not run.
+    """
+    ran = []
+
+    with engine.begin() as connection:
+        done = applied_migrations(connection)
+
+        for name, statements in MIGRATIONS:
+            if name in done:
+                continue
+
+            if not fresh:
+                for statement in statements:
+                    connection.execute(text(statement))
+
+            connection.execute(
+                text("INSERT INTO schema_migrations (name) VALUES (:name)"),
+                {"name": name}
+            )
+            ran.append(name)
+
+    return ran
+
+
+# -------------------------
+# Index usage check
+# -------------------------
+
+def explain(connection, statement):
+    """Return the query plan of a SQLAlchemy statement as text lines."""
+    dialect = connection.dialect.name
+    compiled = statement.compile(
+        dialect=connection.dialect, compile_kwargs={"literal_binds": True}
+    )
+
+    if dialect == "sqlite":
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}")
+        return [row[-1] for row in rows]
+
+    if dialect == "postgresql":
+        # Tiny tables make a sequential scan the cheapest plan; we want
+        # to know whether an index *can* serve the query
+        connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        rows = connection.exec_driver_sql(f"EXPLAIN {compiled}")
+        return [row[0] for row in rows]
+
+    raise ValueError(f"Don't know how to EXPLAIN on {dialect}")
+
+
+def full_scans(plan):
+    # Plan lines that read a whole table instead of seeking an index
+    return [
+        line for line in plan
+        if (line.startswith("SCAN ") and "CONSTANT ROW" not in line)
+        or "Seq Scan" in line
+    ]
@@ -0,0 +1,156 @@
+from extensions import db
+
+
+class User(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    email = db.Column(db.String(100), unique=True, nullable=False)
+    password = db.Column(db.String(200), nullable=False)
+
+    # Bumped by every write that changes the user's pages, see page_cache.py
+    cache_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    # Part of the calendar feed token; replacing it revokes old feed
+    # links, see blueprints/exports.py
+    feed_secret = db.Column(db.String(32))
+
+    def __repr__(self):
+        return f"<User {self.email}>"
+
+class Subject(db.Model):
+    __table_args__ = (
+        db.Index('ix_subject_user', 'user_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+
+    user = db.relationship('User', backref=db.backref('subjects', lazy=True))
+
+    def __repr__(self):
+        return f"<Subject {self.name}>"
+
+class Topic(db.Model):
+    __table_args__ = (
+        db.Index('uq_topic_subject_name', 'subject_id', 'name', unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(150), nullable=False)
+
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id'), nullable=False)
+
+    subject = db.relationship('Subject', backref=db.backref('topics', lazy=True))
+
+    def __repr__(self):
+        return f"<Topic {self.name}>"
+
+class Exam(db.Model):
+    __table_args__ = (
+        db.Index('uq_exam_subject', 'subject_id', unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    exam_date = db.Column(db.Date, nullable=False)
+
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id'), nullable=False)
+
+    subject = db.relationship('Subject', backref=db.backref('exam', uselist=False))
+
+    def __repr__(self):
+        return f"<Exam {self.exam_date}>"
+
+class StudyTime(db.Model):
+    __table_args__ = (
+        db.Index('uq_study_time_user', 'user_id', unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    hours_per_day = db.Column(db.Float, nullable=False)
+    days_per_week = db.Column(db.Integer, nullable=False)
+
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+
+    user = db.relationship('User', backref=db.backref('study_time', uselist=False))
+
+    def __repr__(self):
+        return f"<StudyTime {self.hours_per_day}h/day>"
+
+
+class StudyTask(db.Model):
+    __table_args__ = (
+        # Per-user date lookups; is_completed makes the counter and
+        # rollover queries index-only
+        db.Index('ix_study_task_user_date', 'user_id', 'task_date', 'is_completed'),
+        # One task per topic, also serves the "already planned" lookups
+        db.Index('uq_study_task_user_topic', 'user_id', 'topic_id', unique=True),
+        # Cross-user missed-task sweep in auto_reschedule
+        db.Index('ix_study_task_date_completed', 'task_date', 'is_completed'),
+        # Recent completions for the dashboard forecast
+        db.Index('ix_study_task_user_completed_at', 'user_id', 'completed_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    task_date = db.Column(db.Date, nullable=False)
+    is_completed = db.Column(db.Boolean, default=False)
+    # Local time the task was ticked off, cleared when it's reopened.
+    # Empty for tasks completed before it was recorded.
+    completed_at = db.Column(db.DateTime)
+
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id'), nullable=False)
+    topic_id = db.Column(db.Integer, db.ForeignKey('topic.id'), nullable=False)
+
+    user = db.relationship('User', backref=db.backref('tasks', lazy=True))
+    subject = db.relationship('Subject')
+    topic = db.relationship('Topic')
+
+    def __repr__(self):
+        return f"<Task {self.task_date} - {self.topic.name}>"
+
+
+class UserProgress(db.Model):
+    # Task counters kept up to date on every write, so the dashboard
+    # doesn't have to aggregate the task history. missed/due_today/
+    # upcoming are relative to as_of and roll over lazily when read.
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    as_of = db.Column(db.Date, nullable=False)
+
+    total = db.Column(db.Integer, nullable=False, default=0)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+    missed = db.Column(db.Integer, nullable=False, default=0)
+    due_today = db.Column(db.Integer, nullable=False, default=0)
+    upcoming = db.Column(db.Integer, nullable=False, default=0)
+
+    # When the plan started; only ever moves earlier
+    first_task_date = db.Column(db.Date)
+
+    def __repr__(self):
+        return f"<UserProgress {self.user_id} {self.completed}/{self.total}>"
+
+
+class SubjectProgress(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id'), primary_key=True)
+
+    total = db.Column(db.Integer, nullable=False, default=0)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+
+    subject = db.relationship('Subject')
+
+    def __repr__(self):
+        return f"<SubjectProgress {self.subject_id} {self.completed}/{self.total}>"
+
+
+class UserLock(db.Model):
+    # Lease held by a batch job runner while it works on a user, see
+    # jobs.py; an expired lease may be taken over
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    owner = db.Column(db.String(100), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<UserLock {self.user_id} {self.owner}>"
@@ -0,0 +1,129 @@
+import time
+from datetime import date
+from functools import wraps
+from flask import Response, current_app, g, has_request_context, request, session
+from sqlalchemy import update
+
+from extensions import db
+from instrumentation import metrics
+from models import User
+from utils.stores import MemoryStore, RedisStore
+from utils.video_cache import video_lookup
+
+
+def make_backend(config):
+    # Rendered pages in Redis, shared by every worker on the host, or
+    # in this process with the least recently used dropped first
+    if config["PAGE_CACHE_URL"]:
+        return RedisStore(config["PAGE_CACHE_URL"])
+    return MemoryStore(config["PAGE_CACHE_SIZE"])
+
+
+# -------------------------
+# Invalidation
+# -------------------------
+
+def invalidate_pages(user_ids):
+    """Bump the page version of these users, in the current transaction.
+
+    Call this next to any write that changes what the user's cached
+    pages show; the bump commits (or rolls back) with the write.
+    """
+    user_ids = list(user_ids)
+    if user_ids:
+        db.session.execute(
+            update(User)
+            .where(User.id.in_(user_ids))
+            .values(cache_version=User.cache_version + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def videos_pending(source, missing=0, **extra):
+    # A page showing placeholders for videos still being fetched must
+    # not be stored, or the videos would never show up
+    if missing and has_request_context():
+        g.page_uncacheable = True
+
+
+video_lookup.connect(videos_pending)
+
+
+# -------------------------
+# Cached views
+# -------------------------
+
+def cached_page(view):
+    """Serve the view from the per-user page cache.
+
+    Pages are keyed by user and URL and are valid while the user's
+    ``cache_version`` and the date are unchanged. Responses carry an
+    ETag and Last-Modified, so a browser revalidating an unchanged page
+    gets a 304 without the page being rendered or even looked up.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        user_id = session.get("user_id")
+        config = current_app.config
+
+        # Flashed messages are shown once; pages with them aren't reused
+        if not config["PAGE_CACHE_ENABLED"] or not user_id or session.get("_flashes"):
+            metrics.inc("studyplanner_page_cache_total", {"result": "bypass"})
+            return view(*args, **kwargs)
+
+        version = db.session.query(User.cache_version).filter(User.id == user_id).scalar()
+        if version is None:
+            return view(*args, **kwargs)
+
+        etag = f"{user_id}-{version}-{date.today().isoformat()}"
+        if config["PAGE_CACHE_SALT"]:
+            etag += f"-{config['PAGE_CACHE_SALT']}"
+        backend = current_app.extensions["page_cache"]
+        key = f"page:{user_id}:{request.full_path}"
+
+        if request.if_none_match.contains_weak(etag):
+            metrics.inc("studyplanner_page_cache_total", {"result": "not_modified"})
+            return not_modified(etag)
+
+        entry = backend.get(key)
+        if entry and entry["etag"] == etag:
+            metrics.inc("studyplanner_page_cache_total", {"result": "hit"})
+            response = Response(entry["body"], mimetype=entry["mimetype"])
+            return conditional(response, etag, entry["last_modified"])
+
+        metrics.inc("studyplanner_page_cache_total", {"result": "miss"})
+        response = current_app.make_response(view(*args, **kwargs))
+        if response.status_code != 200 or g.get("page_uncacheable"):
+            return response
+
+        last_modified = int(time.time())
+        backend.set(key, {
+            "etag": etag,
+            "last_modified": last_modified,
+            "body": response.get_data(as_text=True),
+            "mimetype": response.mimetype,
+        }, config["PAGE_CACHE_TTL"])
+        return conditional(response, etag, last_modified)
+
+    return wrapper
+
+
+def conditional(response, etag, last_modified):
+    response.set_etag(etag, weak=True)
+    response.last_modified = last_modified
+    # Always revalidate: the page changes whenever the user writes
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+def not_modified(etag):
+    response = Response(status=304)
+    response.set_etag(etag, weak=True)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def init_app(app):
+    app.extensions["page_cache"] = make_backend(app.config)
@@ -0,0 +1,129 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+from instrumentation import metrics
+
+
+class HashingBusy(Exception):
+    """More password hashes are queued than allowed; try again later."""
+
+
+def canonical_method(method):
+    """The method prefix werkzeug writes into hashes, with its defaults
+    filled in: ``scrypt`` -> ``scrypt:32768:8:1``."""
+    name, *args = method.split(":")
+
+    if name == "scrypt":
+        defaults = ["32768", "8", "1"]
+    elif name == "pbkdf2":
+        defaults = ["sha256", str(DEFAULT_PBKDF2_ITERATIONS)]
+    else:
+        raise ValueError(f"Unsupported PASSWORD_HASH_METHOD: {method}")
+
+    if len(args) > len(defaults):
+        raise ValueError(f"Unsupported PASSWORD_HASH_METHOD: {method}")
+    return ":".join([name] + args + defaults[len(args):])
+
+
+def lower_priority(nice):
+    # Linux applies PRIO_PROCESS to a single thread when given its id
+    if not nice or not hasattr(os, "setpriority"):
+        return
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), nice)
+    except OSError:
+        pass
+
+
+class PasswordHasher:
+    """Password hashing on a small pool of its own threads.
+
+    scrypt and PBKDF2 release the GIL, so at most ``workers`` hashes
+    run at a time however many logins arrive together, and the threads
+    serving other pages keep their share of the CPU. At most
+    ``max_pending`` more may wait; past that HashingBusy is raised
+    instead of queueing without bound. ``workers=0`` hashes on the
+    calling thread.
+
+    On Linux the pool threads also run at a lower priority (``nice``),
+    so when the CPU is short, requests get it before the hashes do.
+    """
+
+    def __init__(self, method="scrypt", workers=2, max_pending=32, nice=10):
+        self.method = canonical_method(method)
+        self._executor = None
+        if workers:
+            self._executor = ThreadPoolExecutor(
+                workers, thread_name_prefix="password-hash",
+                initializer=lower_priority, initargs=(nice,)
+            )
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._dummy_hash = None
+
+    def _run(self, operation, func, *args):
+        started = time.perf_counter()
+
+        if self._executor is None:
+            result = func(*args)
+        else:
+            if not self._slots.acquire(blocking=False):
+                metrics.inc("studyplanner_password_hash_rejected_total", {})
+                raise HashingBusy("Too many password checks in progress")
+            try:
+                future = self._executor.submit(func, *args)
+            except BaseException:
+                self._slots.release()
+                raise
+            future.add_done_callback(lambda _: self._slots.release())
+            result = future.result()
+
+        metrics.observe(
+            "studyplanner_password_hash_seconds", {"operation": operation},
+            time.perf_counter() - started
+        )
+        return result
+
+    def hash(self, password):
+        return self._run("hash", generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        if pwhash is None:
+            # Unknown account: spend the same time as for a known one,
+            # so response times don't tell which emails are registered
+            if self._dummy_hash is None:
+                self._dummy_hash = self.hash("not a password")
+            self._run("verify", check_password_hash, self._dummy_hash, password)
+            return False
+        return self._run("verify", check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        return pwhash.split("$", 1)[0] != self.method
+
+
+def hasher():
+    return current_app.extensions["password_hasher"]
+
+
+def hash_password(password):
+    return hasher().hash(password)
+
+
+def verify_password(pwhash, password):
+    return hasher().verify(pwhash, password)
+
+
+def needs_rehash(pwhash):
+    return hasher().needs_rehash(pwhash)
+
+
+def init_app(app):
+    app.extensions["password_hasher"] = PasswordHasher(
+        app.config["PASSWORD_HASH_METHOD"],
+        app.config["PASSWORD_HASH_WORKERS"],
+        app.config["PASSWORD_HASH_QUEUE"],
+        app.config["PASSWORD_HASH_NICE"],
+    )
@@ -0,0 +1,425 @@
+from collections import namedtuple
+from datetime import date, timedelta
+from flask import current_app
+from sqlalchemy import delete, func, insert, update
+
+from extensions import db
+from leases import hold_users
+from models import Exam, StudyTask, StudyTime, Subject, Topic
+from page_cache import invalidate_pages
+from progress import ProgressDelta
+from utils.scheduler import diff_plan, reschedule, schedule
+from utils.video_prefetch import enqueue_topics
+
+
+def prefetch_upcoming_videos(user_ids):
+    # Queue video lookups for the next few days of pending tasks
+    if not user_ids:
+        return
+
+    today = date.today()
+    horizon = today + timedelta(days=current_app.config['VIDEO_PREFETCH_DAYS'])
+
+    rows = db.session.query(Topic.name).join(
+        StudyTask, StudyTask.topic_id == Topic.id
+    ).filter(
+        StudyTask.user_id.in_(list(user_ids)),
+        StudyTask.task_date >= today,
+        StudyTask.task_date < horizon,
+        StudyTask.is_completed == False
+    ).distinct().all()
+
+    enqueue_topics(name for (name,) in rows)
+
+
+PlanResult = namedtuple("PlanResult", ["inserted", "updated", "deleted", "unplaced"])
+
+
+def plan_tasks(user_id, study_time, subject_ids=None, rebalance=False):
+    """Schedule the user's unplanned topics and, optionally, re-plan.
+
+    Without ``rebalance`` only topics that have no task yet are added.
+    With it, pending tasks from today onward in ``subject_ids`` (all
+    subjects when None) are re-placed too, and only the rows whose date
+    actually changes are written. Everything else on the calendar is
+    left alone and counts against each day's capacity. All changes are
+    applied in one transaction.
+    """
+    today = date.today()
+    hold_users([user_id])
+
+    # Preload everything up front: a constant number of queries
+    # no matter how many subjects and topics the user has
+    exam_dates = dict(
+        db.session.query(Exam.subject_id, Exam.exam_date)
+        .join(Subject)
+        .filter(Subject.user_id == user_id)
+        .all()
+    )
+
+    topics_query = db.session.query(Topic.id, Topic.subject_id).join(Subject).filter(
+        Subject.user_id == user_id
+    )
+    tasks_query = db.session.query(StudyTask.topic_id).filter(
+        StudyTask.user_id == user_id
+    )
+    if subject_ids is not None:
+        topics_query = topics_query.filter(Topic.subject_id.in_(subject_ids))
+        tasks_query = tasks_query.filter(StudyTask.subject_id.in_(subject_ids))
+
+    planned_topic_ids = {topic_id for (topic_id,) in tasks_query}
+
+    # Tasks being re-planned, keyed by topic: topic_id -> (task_id, date)
+    current = {}
+    if rebalance:
+        movable = db.session.query(
+            StudyTask.topic_id, StudyTask.id, StudyTask.task_date, StudyTask.subject_id
+        ).filter(
+            StudyTask.user_id == user_id,
+            StudyTask.task_date >= today,
+            StudyTask.is_completed == False
+        )
+        if subject_ids is not None:
+            movable = movable.filter(StudyTask.subject_id.in_(subject_ids))
+        current = {}
+        subject_of = {}
+        for topic_id, task_id, task_date, subject_id in movable:
+            # Without an exam there's no deadline to plan against (e.g. a
+            # subject created by a CSV import); those tasks stay put
+            if subject_id not in exam_dates:
+                continue
+            current[topic_id] = (task_id, task_date)
+            subject_of[task_id] = subject_id
+
+    # Tasks that stay put use up part of each day's capacity
+    load = dict(
+        db.session.query(StudyTask.task_date, func.count(StudyTask.id))
+        .filter(StudyTask.user_id == user_id, StudyTask.task_date >= today)
+        .group_by(StudyTask.task_date)
+        .all()
+    )
+    for _, task_date in current.values():
+        load[task_date] -= 1
+
+    planned, unplaced = schedule(
+        [
+            topic for topic in topics_query
+            if topic.id not in planned_topic_ids or topic.id in current
+        ],
+        exam_dates,
+        tasks_per_day=int(study_time.hours_per_day),
+        days_per_week=study_time.days_per_week,
+        start=today,
+        load=load,
+        current={topic_id: task_date for topic_id, (_, task_date) in current.items()}
+    )
+
+    changes = diff_plan(current, planned)
+
+    progress = ProgressDelta(today)
+    for task in changes.inserts:
+        progress.add(user_id, task.subject_id, task.task_date)
+    old_dates = dict(current.values())
+    for task_id, task_date in changes.updates:
+        progress.move(user_id, subject_of[task_id], old_dates[task_id], task_date)
+    for task_id in changes.deletes:
+        progress.remove(user_id, subject_of[task_id], old_dates[task_id])
+    progress.apply()
+
+    if changes.inserts:
+        db.session.execute(insert(StudyTask), [
+            {
+                "task_date": task.task_date,
+                "user_id": user_id,
+                "subject_id": task.subject_id,
+                "topic_id": task.topic_id
+            }
+            for task in changes.inserts
+        ])
+
+    if changes.updates:
+        db.session.execute(update(StudyTask), [
+            {"id": task_id, "task_date": task_date}
+            for task_id, task_date in changes.updates
+        ])
+
+    if changes.deletes:
+        db.session.execute(
+            delete(StudyTask).where(StudyTask.id.in_(changes.deletes))
+        )
+
+    db.session.commit()
+
+    return PlanResult(
+        len(changes.inserts), len(changes.updates), len(changes.deletes), unplaced
+    )
+
+
+
+def reschedule_missed_tasks(user_id=None, batch_size=1000, user_ids=None):
+    """Move every missed task onto the owner's next free study slots.
+
+    Limited to one user with ``user_id``, or to a list with ``user_ids``.
+
+    Uses three queries regardless of how many users and days are
+    involved: the missed tasks, per-user per-date load from tomorrow on
+    (one GROUP BY) and the users' study settings. Free slots are then
+    found in memory and the moves are written in batches of
+    ``batch_size`` (all in one transaction when None). Returns
+    ``(moved, user_ids)``.
+    """
+    today = date.today()
+    start = today + timedelta(days=1)
+
+    missed = db.session.query(
+        StudyTask.user_id, StudyTask.id, StudyTask.subject_id, StudyTask.task_date
+    ).filter(
+        StudyTask.task_date < today,
+        StudyTask.is_completed == False
+    )
+    if user_id is not None:
+        missed = missed.filter(StudyTask.user_id == user_id)
+    if user_ids is not None:
+        missed = missed.filter(StudyTask.user_id.in_(list(user_ids)))
+
+    missed_by_user = {}
+    originals = {}
+    for owner_id, task_id, subject_id, task_date in missed.order_by(
+        StudyTask.user_id, StudyTask.task_date, StudyTask.id
+    ):
+        missed_by_user.setdefault(owner_id, []).append(task_id)
+        originals[task_id] = (subject_id, task_date)
+
+    if not missed_by_user:
+        return 0, set()
+
+    user_ids = list(missed_by_user)
+
+    load = {}
+    for owner_id, task_date, count in db.session.query(
+        StudyTask.user_id, StudyTask.task_date, func.count(StudyTask.id)
+    ).filter(
+        StudyTask.user_id.in_(user_ids),
+        StudyTask.task_date >= start
+    ).group_by(StudyTask.user_id, StudyTask.task_date):
+        load.setdefault(owner_id, {})[task_date] = count
+
+    settings = {
+        study_time.user_id: study_time
+        for study_time in StudyTime.query.filter(StudyTime.user_id.in_(user_ids))
+    }
+
+    moved = 0
+    pending = []
+    progress = ProgressDelta(today)
+
+    for owner_id, task_ids in missed_by_user.items():
+        study_time = settings.get(owner_id)
+
+        # Without study settings, fall back to one task a day, every day
+        tasks_per_day = int(study_time.hours_per_day) if study_time else 1
+        days_per_week = study_time.days_per_week if study_time else 7
+
+        for task_id, new_date in reschedule(
+            task_ids, tasks_per_day, days_per_week, start, load.get(owner_id)
+        ):
+            pending.append({"id": task_id, "task_date": new_date})
+            subject_id, old_date = originals[task_id]
+            progress.move(owner_id, subject_id, old_date, new_date)
+
+        if batch_size and len(pending) >= batch_size:
+            progress.apply()
+            db.session.execute(update(StudyTask), pending)
+            db.session.commit()
+            moved += len(pending)
+            pending = []
+
+    if pending:
+        progress.apply()
+        db.session.execute(update(StudyTask), pending)
+        db.session.commit()
+        moved += len(pending)
+
+    return moved, set(user_ids)
+
+
+ImportResult = namedtuple(
+    "ImportResult", ["added", "duplicates", "rejected", "new_subjects", "subject_ids"]
+)
+
+TOPIC_NAME_LENGTH = Topic.__table__.c.name.type.length
+
+
+def insert_ignoring_duplicates(model, index_elements):
+    # INSERT ... ON CONFLICT DO NOTHING where the database has it, INSERT
+    # IGNORE on MySQL; other databases rely on the caller having filtered
+    # out existing rows
+    dialect = db.engine.dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect in ("mysql", "mariadb"):
+        return insert(model).prefix_with("IGNORE")
+    else:
+        return insert(model)
+    return dialect_insert(model).on_conflict_do_nothing(index_elements=index_elements)
+
+
+def import_topics(user_id, pairs, default_subject_id=None):
+    """Add ``(subject_name, topic_name)`` pairs to the user's subjects.
+
+    Topics without a subject name go to ``default_subject_id``; unknown
+    subject names are created. Duplicates are dropped in memory, both
+    within the input and against the existing topics (compared without
+    case), which are read in one query. All new topics are then written
+    with one bulk INSERT that skips anything added concurrently.
+    """
+    # Newest first, so the oldest of two same-named subjects wins
+    subjects = {
+        name.casefold(): subject_id
+        for subject_id, name in db.session.query(Subject.id, Subject.name)
+        .filter(Subject.user_id == user_id)
+        .order_by(Subject.id.desc())
+    }
+    owned_ids = set(subjects.values())
+    if default_subject_id not in owned_ids:
+        default_subject_id = None
+
+    wanted = []
+    rejected = 0
+    new_subjects = {}
+
+    for subject_name, topic_name in pairs:
+        if len(topic_name) > TOPIC_NAME_LENGTH or (subject_name is None and default_subject_id is None):
+            rejected += 1
+            continue
+        if subject_name is not None and subject_name.casefold() not in subjects:
+            new_subjects.setdefault(subject_name.casefold(), subject_name)
+        wanted.append((subject_name, topic_name))
+
+    if new_subjects:
+        db.session.execute(
+            insert(Subject),
+            [{"name": name, "user_id": user_id} for name in new_subjects.values()]
+        )
+        # Read back rather than RETURNING, which MySQL doesn't have
+        created = (
+            db.session.query(Subject.id, Subject.name)
+            .filter(Subject.user_id == user_id, Subject.name.in_(new_subjects.values()))
+            .order_by(Subject.id.desc())
+        )
+        for subject_id, name in created:
+            subjects[name.casefold()] = subject_id
+
+    def subject_of(subject_name):
+        return default_subject_id if subject_name is None else subjects[subject_name.casefold()]
+
+    subject_ids = {subject_of(subject_name) for subject_name, _ in wanted}
+
+    seen = {
+        (subject_id, name.casefold())
+        for subject_id, name in db.session.query(Topic.subject_id, Topic.name)
+        .filter(Topic.subject_id.in_(subject_ids & owned_ids))
+    }
+
+    rows = []
+    for subject_name, topic_name in wanted:
+        key = (subject_of(subject_name), topic_name.casefold())
+        if key not in seen:
+            seen.add(key)
+            rows.append({"subject_id": key[0], "name": topic_name})
+
+    added = 0
+    if rows:
+        insert_topics = insert_ignoring_duplicates(Topic, ["subject_id", "name"])
+        if db.engine.dialect.insert_returning:
+            added = len(db.session.execute(insert_topics.returning(Topic.id), rows).all())
+        else:
+            # MySQL has no RETURNING; the rowcount of an INSERT IGNORE
+            # leaves out the rows it skipped (the ORM's bulk insert
+            # doesn't pass it on, so this goes to the connection)
+            added = db.session.connection().execute(insert_topics, rows).rowcount
+
+    if added or new_subjects:
+        invalidate_pages([user_id])
+    db.session.commit()
+
+    return ImportResult(
+        added,
+        len(wanted) - added,
+        rejected,
+        len(new_subjects),
+        sorted({row["subject_id"] for row in rows})
+    )
+
+
+
+TaskImportResult = namedtuple("TaskImportResult", ["added", "duplicates", "rejected"])
+
+
+def import_tasks(user_id, rows):
+    """Add ``(task_date, subject_name, topic_name, completed)`` rows to
+    the user's plan, e.g. one batch of an uploaded CSV.
+
+    Unknown subjects and topics are created first (see import_topics()).
+    A topic has one task, so rows for topics already in the plan, or
+    seen earlier in the batch, are skipped. New tasks are written with
+    one bulk INSERT, together with their progress counters.
+    """
+    rows = list(rows)
+    valid = [row for row in rows if row[0] and row[1] and row[2]]
+    rejected = len(rows) - len(valid)
+
+    if not valid:
+        return TaskImportResult(0, 0, rejected)
+
+    import_topics(user_id, [(subject_name, topic_name) for _, subject_name, topic_name, _ in valid])
+    hold_users([user_id])
+
+    # Oldest first wins where two subjects (or topics) share a name
+    topics = {
+        (subject_name.casefold(), topic_name.casefold()): (topic_id, subject_id)
+        for topic_id, subject_id, topic_name, subject_name in db.session.query(
+            Topic.id, Topic.subject_id, Topic.name, Subject.name
+        ).join(Subject, Topic.subject_id == Subject.id)
+        .filter(Subject.user_id == user_id)
+        .order_by(Subject.id.desc(), Topic.id.desc())
+    }
+
+    planned = {
+        topic_id for (topic_id,) in db.session.query(StudyTask.topic_id)
+        .filter(StudyTask.user_id == user_id)
+    }
+
+    progress = ProgressDelta()
+    new_tasks = []
+    duplicates = 0
+
+    for task_date, subject_name, topic_name, completed in valid:
+        found = topics.get((subject_name.casefold(), topic_name.casefold()))
+        if found is None:
+            # import_topics() turned it down, e.g. a name too long
+            rejected += 1
+            continue
+
+        topic_id, subject_id = found
+        if topic_id in planned:
+            duplicates += 1
+            continue
+
+        planned.add(topic_id)
+        progress.add(user_id, subject_id, task_date, completed)
+        new_tasks.append({
+            "user_id": user_id, "subject_id": subject_id, "topic_id": topic_id,
+            "task_date": task_date, "is_completed": completed,
+        })
+
+    if new_tasks:
+        progress.apply()
+        db.session.execute(
+            insert_ignoring_duplicates(StudyTask, ["user_id", "topic_id"]), new_tasks
+        )
+    db.session.commit()
+
+    return TaskImportResult(len(new_tasks), duplicates, rejected)
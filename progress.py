@@ -0,0 +1,342 @@
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import and_, bindparam, case, func, insert, or_
+
+from extensions import db
+from models import Exam, StudyTask, Subject, SubjectProgress, UserProgress
+from page_cache import invalidate_pages
+
+
+PROGRESS_FIELDS = ("total", "completed", "missed", "due_today", "upcoming")
+
+
+def aggregate_progress(user_ids, today):
+    """Recompute progress counters from the task table.
+
+    Returns ``(users, subjects)``: per-user counter dicts and
+    ``{(user_id, subject_id): [total, completed]}``. Two GROUP BY
+    queries, used to seed and to verify the stored counters.
+    """
+    completed = func.coalesce(StudyTask.is_completed, False) == True
+    pending = func.coalesce(StudyTask.is_completed, False) == False
+
+    def count_where(condition):
+        return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+    users = {
+        user_id: dict(zip(PROGRESS_FIELDS, (0, 0, 0, 0, 0)), first_task_date=None)
+        for user_id in user_ids
+    }
+
+    for row in db.session.query(
+        StudyTask.user_id,
+        func.count(StudyTask.id),
+        count_where(completed),
+        count_where(pending & (StudyTask.task_date < today)),
+        count_where(pending & (StudyTask.task_date == today)),
+        count_where(pending & (StudyTask.task_date > today)),
+        func.min(StudyTask.task_date)
+    ).filter(
+        StudyTask.user_id.in_(user_ids)
+    ).group_by(StudyTask.user_id):
+        users[row[0]] = dict(zip(PROGRESS_FIELDS, row[1:6]), first_task_date=row[6])
+
+    subjects = {}
+    for user_id, subject_id, total, done in db.session.query(
+        StudyTask.user_id,
+        StudyTask.subject_id,
+        func.count(StudyTask.id),
+        count_where(completed)
+    ).filter(
+        StudyTask.user_id.in_(user_ids)
+    ).group_by(StudyTask.user_id, StudyTask.subject_id):
+        subjects[(user_id, subject_id)] = [total, done]
+
+    return users, subjects
+
+
+def ensure_progress(user_ids, today):
+    """Make sure each user has counters that are current as of ``today``.
+
+    Missing rows are seeded from the task table. Rows from an earlier
+    day are rolled forward: yesterday's due tasks become missed and
+    pending tasks that have come due since leave the upcoming bucket.
+    That needs one GROUP BY over just the days in between.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+
+    with db.session.no_autoflush:
+        _ensure_progress(user_ids, today)
+
+    db.session.flush()
+
+
+def _ensure_progress(user_ids, today):
+    rows = {
+        progress.user_id: progress
+        for progress in UserProgress.query.filter(UserProgress.user_id.in_(user_ids))
+    }
+
+    missing = [user_id for user_id in user_ids if user_id not in rows]
+    if missing:
+        users, subjects = aggregate_progress(missing, today)
+        for user_id, counters in users.items():
+            db.session.add(UserProgress(user_id=user_id, as_of=today, **counters))
+        db.session.query(SubjectProgress).filter(
+            SubjectProgress.user_id.in_(missing)
+        ).delete(synchronize_session=False)
+        for (user_id, subject_id), (total, done) in subjects.items():
+            db.session.add(SubjectProgress(
+                user_id=user_id, subject_id=subject_id, total=total, completed=done
+            ))
+
+    stale = [progress for progress in rows.values() if progress.as_of < today]
+    if stale:
+        came_due = {}
+        for user_id, task_date, count in db.session.query(
+            StudyTask.user_id, StudyTask.task_date, func.count(StudyTask.id)
+        ).filter(
+            StudyTask.user_id.in_([progress.user_id for progress in stale]),
+            func.coalesce(StudyTask.is_completed, False) == False,
+            StudyTask.task_date > min(progress.as_of for progress in stale),
+            StudyTask.task_date <= today
+        ).group_by(StudyTask.user_id, StudyTask.task_date):
+            came_due.setdefault(user_id, []).append((task_date, count))
+
+        for progress in stale:
+            overdue = due_now = 0
+            for task_date, count in came_due.get(progress.user_id, []):
+                if task_date <= progress.as_of:
+                    continue
+                if task_date < today:
+                    overdue += count
+                else:
+                    due_now += count
+
+            progress.missed += progress.due_today + overdue
+            progress.upcoming -= overdue + due_now
+            progress.due_today = due_now
+            progress.as_of = today
+
+
+class ProgressDelta:
+    """Collects counter changes for a batch of task writes.
+
+    Describe each change with ``add``/``remove`` (or the ``move`` and
+    ``set_completed`` shortcuts) before the tasks are written, then call
+    ``apply`` inside the same transaction.
+    """
+
+    def __init__(self, today=None):
+        self.today = today or date.today()
+        self.users = {}
+        self.subjects = {}
+        self.first_dates = {}
+
+    def add(self, user_id, subject_id, task_date, completed=False, sign=1):
+        counters = self.users.setdefault(user_id, dict.fromkeys(PROGRESS_FIELDS, 0))
+        counters["total"] += sign
+
+        if completed:
+            counters["completed"] += sign
+        elif task_date < self.today:
+            counters["missed"] += sign
+        elif task_date == self.today:
+            counters["due_today"] += sign
+        else:
+            counters["upcoming"] += sign
+
+        subject = self.subjects.setdefault((user_id, subject_id), [0, 0])
+        subject[0] += sign
+        if completed:
+            subject[1] += sign
+
+        if sign > 0:
+            first = self.first_dates.get(user_id)
+            self.first_dates[user_id] = task_date if first is None else min(first, task_date)
+
+    def remove(self, user_id, subject_id, task_date, completed=False):
+        self.add(user_id, subject_id, task_date, completed, sign=-1)
+
+    def move(self, user_id, subject_id, old_date, new_date, completed=False):
+        self.remove(user_id, subject_id, old_date, completed)
+        self.add(user_id, subject_id, new_date, completed)
+
+    def set_completed(self, user_id, subject_id, task_date, completed):
+        self.remove(user_id, subject_id, task_date, not completed)
+        self.add(user_id, subject_id, task_date, completed)
+
+    def apply(self):
+        if not self.users:
+            return
+
+        # Seeds and rolls over counters from the tasks as they are
+        # *before* this batch is written
+        ensure_progress(self.users, self.today)
+        invalidate_pages(self.users)
+
+        table = UserProgress.__table__
+        first = bindparam("first_date")
+        db.session.execute(
+            table.update()
+            .where(table.c.user_id == bindparam("uid"))
+            .values(
+                first_task_date=func.coalesce(
+                    case((table.c.first_task_date > first, first),
+                         else_=table.c.first_task_date),
+                    first
+                ),
+                **{
+                    field: table.c[field] + bindparam(f"d_{field}")
+                    for field in PROGRESS_FIELDS
+                }
+            ),
+            [
+                dict(
+                    {f"d_{field}": counters[field] for field in PROGRESS_FIELDS},
+                    uid=user_id,
+                    first_date=self.first_dates.get(user_id)
+                )
+                for user_id, counters in self.users.items()
+            ]
+        )
+
+        existing = set(db.session.query(
+            SubjectProgress.user_id, SubjectProgress.subject_id
+        ).filter(SubjectProgress.user_id.in_(list(self.users))))
+
+        new_rows = [key for key in self.subjects if key not in existing]
+        if new_rows:
+            db.session.execute(insert(SubjectProgress), [
+                {"user_id": user_id, "subject_id": subject_id, "total": 0, "completed": 0}
+                for user_id, subject_id in new_rows
+            ])
+
+        table = SubjectProgress.__table__
+        db.session.execute(
+            table.update()
+            .where(
+                (table.c.user_id == bindparam("uid"))
+                & (table.c.subject_id == bindparam("sid"))
+            )
+            .values(
+                total=table.c.total + bindparam("d_total"),
+                completed=table.c.completed + bindparam("d_completed")
+            ),
+            [
+                {"uid": user_id, "sid": subject_id, "d_total": total, "d_completed": done}
+                for (user_id, subject_id), (total, done) in self.subjects.items()
+            ]
+        )
+
+        self.users = {}
+        self.subjects = {}
+        self.first_dates = {}
+
+
+def dashboard_stats(user_id, today):
+    """Task counters and per-subject progress for one user.
+
+    Reads the stored counters (rolling them over to ``today`` first), so
+    the cost depends on the number of subjects, not tasks. ``plan_rows``
+    adds each subject's exam date, for the forecast.
+    """
+    ensure_progress([user_id], today)
+    progress = db.session.get(UserProgress, user_id)
+
+    subject_rows = db.session.query(
+        SubjectProgress.subject_id, Subject.name, SubjectProgress.total,
+        SubjectProgress.completed, Exam.exam_date
+    ).join(
+        SubjectProgress.subject
+    ).outerjoin(
+        Exam, Exam.subject_id == SubjectProgress.subject_id
+    ).filter(
+        SubjectProgress.user_id == user_id,
+        SubjectProgress.total > 0
+    ).order_by(SubjectProgress.subject_id).all()
+
+    # Persist a rollover or first-time seed
+    db.session.commit()
+
+    subject_progress = {}
+
+    for subject_id, name, total, done, _ in subject_rows:
+        entry = subject_progress.setdefault(
+            name, {"total": 0, "completed": 0, "subject_ids": []}
+        )
+        entry["total"] += total
+        entry["completed"] += done
+        entry["subject_ids"].append(subject_id)
+
+    for entry in subject_progress.values():
+        entry["percentage"] = round(
+            (entry["completed"] / entry["total"]) * 100 if entry["total"] else 0, 2
+        )
+
+    return {
+        "total_tasks": progress.total,
+        "completed_tasks": progress.completed,
+        "pending_tasks": progress.total - progress.completed,
+        "missed_tasks": progress.missed,
+        "today_tasks": progress.due_today,
+        "upcoming_tasks": progress.upcoming,
+        "first_task_date": progress.first_task_date,
+        "subject_progress": subject_progress,
+        # For utils.analytics.plans()
+        "plan_rows": [
+            (user_id, subject_id, total, done, exam_date, progress.first_task_date)
+            for subject_id, _, total, done, exam_date in subject_rows
+        ],
+    }
+
+
+def plan_rows(user_ids=None):
+    """``(user_id, subject_id, total, completed, exam_date,
+    first_task_date)`` per subject with tasks, from the stored counters;
+    see utils.analytics.plans(). The counters must be current."""
+    query = db.session.query(
+        SubjectProgress.user_id,
+        SubjectProgress.subject_id,
+        SubjectProgress.total,
+        SubjectProgress.completed,
+        Exam.exam_date,
+        UserProgress.first_task_date
+    ).join(
+        UserProgress, UserProgress.user_id == SubjectProgress.user_id
+    ).outerjoin(
+        Exam, Exam.subject_id == SubjectProgress.subject_id
+    ).filter(
+        SubjectProgress.total > 0
+    )
+    if user_ids is not None:
+        query = query.filter(SubjectProgress.user_id.in_(user_ids))
+    return query.all()
+
+
+def completed_since(start):
+    """Filter for tasks completed on or after ``start``. Tasks completed
+    before completion times were recorded are picked by their planned
+    date instead."""
+    return and_(
+        StudyTask.is_completed == True,
+        or_(
+            StudyTask.completed_at >= datetime.combine(start, time()),
+            and_(StudyTask.completed_at.is_(None), StudyTask.task_date >= start)
+        )
+    )
+
+
+def completion_rows(today, window, user_ids=None):
+    """``(user_id, subject_id, task_date, completed_at)`` of the tasks
+    completed in the ``window`` days up to ``today``; see
+    utils.analytics.completions()."""
+    query = db.session.query(
+        StudyTask.user_id, StudyTask.subject_id, StudyTask.task_date, StudyTask.completed_at
+    ).filter(
+        completed_since(today - timedelta(days=window - 1))
+    )
+    if user_ids is not None:
+        query = query.filter(StudyTask.user_id.in_(user_ids))
+    return query.all()
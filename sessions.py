@@ -0,0 +1,106 @@
+import secrets
+from flask.sessions import SecureCookieSession, SessionInterface
+from itsdangerous import BadSignature, Signer
+
+from utils.stores import make_store
+
+
+# -------------------------
+# Server-side sessions
+# -------------------------
+
+class ServerSession(SecureCookieSession):
+    def __init__(self, initial=None, sid=None, new=False):
+        super().__init__(initial)
+        self.sid = sid or secrets.token_urlsafe(32)
+        self.new = new
+        self.old_sid = None
+
+    def regenerate(self):
+        """Move the data to a fresh id, e.g. on login, so an id known
+        before the login is worthless after it."""
+        if self.old_sid is None:
+            self.old_sid = self.sid
+        self.sid = secrets.token_urlsafe(32)
+        self.modified = True
+
+
+class ServerSessionInterface(SessionInterface):
+    """Sessions kept in a store; the cookie only carries a signed id."""
+
+    session_class = ServerSession
+
+    def __init__(self, store):
+        self.store = store
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt="studyplanner-session")
+
+    def open_session(self, app, request):
+        if not app.secret_key:
+            return None
+
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = self._signer(app).unsign(cookie).decode()
+            except BadSignature:
+                sid = None
+
+            data = self.store.get(f"session:{sid}") if sid else None
+            if data is not None:
+                return self.session_class(data, sid=sid)
+
+        return self.session_class(new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        partitioned = self.get_cookie_partitioned(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+
+        if session.accessed:
+            response.vary.add("Cookie")
+
+        if session.old_sid is not None:
+            self.store.delete(f"session:{session.old_sid}")
+
+        if not session:
+            if session.modified and not session.new:
+                self.store.delete(f"session:{session.sid}")
+                response.delete_cookie(
+                    name, domain=domain, path=path, secure=secure,
+                    partitioned=partitioned, samesite=samesite, httponly=httponly
+                )
+            return
+
+        if not self.should_set_cookie(app, session):
+            return
+
+        ttl = app.permanent_session_lifetime.total_seconds()
+        self.store.set(f"session:{session.sid}", dict(session), ttl)
+        response.set_cookie(
+            name,
+            self._signer(app).sign(session.sid).decode(),
+            expires=self.get_expiration_time(app, session),
+            httponly=httponly,
+            domain=domain,
+            path=path,
+            secure=secure,
+            partitioned=partitioned,
+            samesite=samesite,
+        )
+
+
+def init_app(app):
+    """Keep sessions in SESSION_STORE_URL when set; otherwise Flask's
+    signed-cookie sessions stay and nothing is stored server side."""
+    url = app.config["SESSION_STORE_URL"]
+    store = make_store(url) if url else None
+
+    if store is not None:
+        app.session_interface = ServerSessionInterface(store)
+    app.extensions["session_store"] = store
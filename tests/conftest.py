@@ -0,0 +1,18 @@
+import pytest
+
+from app import create_app
+from config import Config
+from extensions import db
+
+
+@pytest.fixture
+def app(tmp_path):
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'test.db'}"
+        TESTING = True
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
@@ -0,0 +1,131 @@
+from datetime import date, datetime, time, timedelta
+
+import numpy as np
+from numpy.testing import assert_allclose, assert_array_equal
+
+from utils.analytics import as_day, burndown, completions, exam_risk, forecast, plans, rolling_velocity
+
+
+TODAY = date(2026, 3, 20)
+
+
+def days(n):
+    return TODAY + timedelta(days=n)
+
+
+def done_on(n):
+    return datetime.combine(days(n), time(18))
+
+
+def test_rolling_velocity_averages_over_the_window():
+    counts = np.array([[1, 1, 1, 1, 1, 1]])
+
+    assert_allclose(rolling_velocity(counts, 4), [[1, 1, 1, 1, 1, 1]])
+
+
+def test_rolling_velocity_of_a_plan_that_started_mid_window():
+    counts = np.array([
+        [1, 1, 1, 1, 1, 1],
+        [0, 0, 0, 2, 2, 2],
+    ])
+
+    velocity = rolling_velocity(counts, 4, first_days=[-10, 3])
+
+    # Started before the first column: the days before it count, empty
+    assert_allclose(velocity[0], [0.25, 0.5, 0.75, 1, 1, 1])
+    # Averaged over the days since it started, not the whole window
+    assert_allclose(velocity[1], [0, 0, 0, 2, 2, 2])
+    assert rolling_velocity(counts, 4)[1, -1] == 1.5
+
+
+def test_exam_risk_shares_ties_and_skips_subjects_without_an_exam():
+    # (user_id, subject_id, total, completed, exam_date, first_task_date)
+    rows = [
+        (1, 13, 4, 0, days(10), days(-5)),
+        (1, 14, 5, 0, None, days(-5)),
+        (1, 11, 3, 0, days(5), days(-5)),
+        (1, 12, 5, 2, days(5), days(-5)),
+        (2, 20, 2, 0, days(1), days(-5)),
+    ]
+
+    risks = exam_risk(plans(rows), np.array([1.0, 0.5]), TODAY)
+
+    assert_array_equal(risks.subject_ids, [13, 14, 11, 12, 20])
+    assert_array_equal(risks.remaining, [4, 5, 3, 3, 2])
+    # 11 and 12 share an exam: both count all 6 tasks due in 5 days,
+    # and 13 the 10 due by its own
+    assert_allclose(risks.risk, [0, np.nan, 1 / 6, 1 / 6, 0.75])
+
+
+def test_exam_risk_of_finished_and_overdue_subjects():
+    rows = [
+        (1, 10, 4, 4, days(-3), days(-20)),
+        (1, 11, 4, 1, days(-1), days(-20)),
+    ]
+
+    risks = exam_risk(plans(rows), np.array([2.0]), TODAY)
+
+    assert_allclose(risks.risk, [0, 1])
+
+
+def test_forecast():
+    rows = [
+        # On track
+        (1, 10, 10, 4, days(10), days(-20)),
+        (1, 11, 5, 5, days(3), days(-20)),
+        # Started yesterday, exam tomorrow
+        (2, 20, 8, 4, days(1), days(-1)),
+        # Finished
+        (3, 30, 3, 3, days(5), days(-30)),
+        # No exam, nothing done
+        (4, 40, 6, 0, None, days(-2)),
+    ]
+    # (user_id, subject_id, task_date, completed_at)
+    done = [(1, 10, days(n), done_on(n)) for n in range(-6, 0)]
+    # Completed before times were recorded, planned for later
+    done.append((1, 10, days(4), None))
+    done += [(2, 20, days(n), done_on(n)) for n in (-1, -1, 0, 0)]
+    # Outside the window
+    done.append((3, 30, days(-7), done_on(-7)))
+
+    pace, risks = forecast(plans(rows), completions(done, TODAY), TODAY, window=7)
+
+    assert_array_equal(pace.user_ids, [1, 2, 3, 4])
+    assert_array_equal(pace.total, [15, 8, 3, 6])
+    assert_array_equal(pace.completed, [9, 4, 3, 0])
+    assert_allclose(pace.velocity, [1, 2, 0, 0])
+    assert_array_equal(
+        pace.finish_dates,
+        [as_day(days(6)), as_day(days(2)), as_day(TODAY), np.datetime64("NaT")]
+    )
+    assert_allclose(pace.exam_risk, [0, 0.5, 0, np.nan])
+    assert_array_equal(risks.subject_ids, [10, 11, 20, 30, 40])
+
+
+def test_forecast_of_no_plans():
+    pace, risks = forecast(plans([]), completions([], TODAY), TODAY)
+
+    assert len(pace.user_ids) == 0
+    assert len(risks.risk) == 0
+
+
+def test_burndown_works_back_from_today():
+    rows = [
+        (1, 7, 10, 6, days(10), days(-10)),
+        (1, 3, 5, 0, days(10), days(-10)),
+    ]
+    done = [
+        (1, 7, days(-5), done_on(-5)),
+        (1, 7, days(-2), done_on(-2)),
+        (1, 7, days(-2), done_on(-2)),
+        (1, 7, days(-1), done_on(-1)),
+        (1, 7, days(0), done_on(0)),
+    ]
+
+    open_tasks = burndown(plans(rows), completions(done, TODAY), days(-3), TODAY)
+
+    # In plans order; completions before the start don't show
+    assert_array_equal(open_tasks, [
+        [8, 6, 5, 4],
+        [5, 5, 5, 5],
+    ])
@@ -0,0 +1,17 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from extensions import db
+
+
+def test_failed_statements_do_not_leave_their_start_time(app):
+    conn = db.session.connection()
+    conn.execute(text("SELECT 1"))
+
+    for _ in range(3):
+        with pytest.raises(OperationalError):
+            conn.execute(text("SELECT * FROM no_such_table"))
+
+    assert conn.info["query_started"] == []
+
@@ -0,0 +1,117 @@
+from datetime import date, timedelta
+
+import pytest
+
+from extensions import db
+from identity import StudySettings
+from models import Exam, StudyTask, Subject, Topic, User
+from planning import import_topics, plan_tasks
+from utils.scheduler import NO_EXAM
+
+
+def days(n):
+    return date.today() + timedelta(days=n)
+
+
+@pytest.fixture
+def user_id(app):
+    user = User(name="A", email="a@example.com", password="x")
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+
+def add_subject(user_id, name, topics, exam_date=None):
+    subject = Subject(name=name, user_id=user_id)
+    db.session.add(subject)
+    db.session.flush()
+    if exam_date:
+        db.session.add(Exam(subject_id=subject.id, exam_date=exam_date))
+    topic_rows = [Topic(name=topic, subject_id=subject.id) for topic in topics]
+    db.session.add_all(topic_rows)
+    db.session.commit()
+    return subject.id, [topic.id for topic in topic_rows]
+
+
+def tasks_of(user_id):
+    return {
+        task.topic_id: task.task_date
+        for task in StudyTask.query.filter_by(user_id=user_id)
+    }
+
+
+def test_plan_places_topics_before_the_exam(user_id):
+    _, topic_ids = add_subject(user_id, "Math", ["A", "B", "C"], days(10))
+
+    result = plan_tasks(user_id, StudySettings(1, 7))
+
+    assert result.inserted == 3
+    assert result.unplaced == []
+    assert sorted(tasks_of(user_id)) == topic_ids
+    assert all(task_date < days(10) for task_date in tasks_of(user_id).values())
+
+
+def test_topics_without_an_exam_are_reported(user_id):
+    _, topic_ids = add_subject(user_id, "History", ["Rome"])
+
+    result = plan_tasks(user_id, StudySettings(1, 7))
+
+    assert result.inserted == 0
+    assert [(topic.topic_id, topic.reason) for topic in result.unplaced] == [
+        (topic_ids[0], NO_EXAM)
+    ]
+
+
+def test_replan_keeps_tasks_of_subjects_without_an_exam(user_id):
+    # e.g. imported from a CSV, which creates subjects without an exam
+    history_id, history_topics = add_subject(user_id, "History", ["Rome", "Greece"])
+    for topic_id, n in zip(history_topics, (2, 5)):
+        db.session.add(StudyTask(
+            task_date=days(n), user_id=user_id, subject_id=history_id, topic_id=topic_id
+        ))
+    db.session.commit()
+    _, math_topics = add_subject(user_id, "Math", ["A", "B"], days(20))
+    plan_tasks(user_id, StudySettings(2, 7))
+
+    result = plan_tasks(user_id, StudySettings(1, 7), rebalance=True)
+
+    assert result.deleted == 0
+    tasks = tasks_of(user_id)
+    assert tasks[history_topics[0]] == days(2)
+    assert tasks[history_topics[1]] == days(5)
+    assert set(math_topics) <= set(tasks)
+
+
+def test_replan_moves_tasks_and_drops_what_no_longer_fits(user_id):
+    _, topic_ids = add_subject(user_id, "Math", ["A", "B", "C", "D"], days(3))
+    plan_tasks(user_id, StudySettings(2, 7))
+
+    result = plan_tasks(user_id, StudySettings(1, 7), rebalance=True)
+
+    assert result.deleted == 1
+    assert len(result.unplaced) == 1
+    assert len(tasks_of(user_id)) == 3
+
+
+@pytest.mark.parametrize("returning", [True, False])
+def test_import_topics_counts_what_it_added(app, user_id, monkeypatch, returning):
+    # MySQL has no RETURNING; the count then comes from the rowcount
+    monkeypatch.setattr(db.engine.dialect, "insert_returning", returning)
+    math_id, _ = add_subject(user_id, "Math", ["Algebra"])
+
+    result = import_topics(user_id, [
+        ("math", "algebra"),
+        ("Math", "Geometry"),
+        ("Physics", "Optics"),
+        ("physics", "optics"),
+        ("Physics", "Waves"),
+    ])
+
+    physics_id = Subject.query.filter_by(user_id=user_id, name="Physics").one().id
+    assert result.added == 3
+    assert result.duplicates == 2
+    assert result.new_subjects == 1
+    assert result.subject_ids == sorted([math_id, physics_id])
+    assert sorted(topic.name for topic in Topic.query.filter_by(subject_id=physics_id)) == [
+        "Optics", "Waves"
+    ]
@@ -0,0 +1,152 @@
+from datetime import date, timedelta
+
+import pytest
+
+from extensions import db
+from models import StudyTask, Subject, SubjectProgress, Topic, User, UserProgress
+from progress import PROGRESS_FIELDS, ProgressDelta, aggregate_progress, ensure_progress
+
+
+DAY0 = date(2026, 3, 2)
+
+
+def days(n):
+    return DAY0 + timedelta(days=n)
+
+
+@pytest.fixture
+def plan(app):
+    """One user with two subjects and a task a day on days 0-9, every
+    third one completed. Returns ``(user_id, subject_ids, tasks)``."""
+    user = User(name="A", email="a@example.com", password="x")
+    db.session.add(user)
+    db.session.flush()
+
+    subjects = [Subject(name=name, user_id=user.id) for name in ("Math", "Physics")]
+    db.session.add_all(subjects)
+    db.session.flush()
+
+    tasks = []
+    for n in range(10):
+        subject = subjects[n % 2]
+        topic = Topic(name=f"Topic {n}", subject_id=subject.id)
+        db.session.add(topic)
+        db.session.flush()
+        tasks.append(StudyTask(
+            task_date=days(n), user_id=user.id, subject_id=subject.id,
+            topic_id=topic.id, is_completed=n % 3 == 0
+        ))
+    db.session.add_all(tasks)
+    db.session.commit()
+
+    return user.id, [subject.id for subject in subjects], tasks
+
+
+def stored(user_id):
+    progress = db.session.get(UserProgress, user_id)
+    counters = {field: getattr(progress, field) for field in PROGRESS_FIELDS}
+    counters["first_task_date"] = progress.first_task_date
+    subjects = {
+        (row.user_id, row.subject_id): [row.total, row.completed]
+        for row in SubjectProgress.query.filter_by(user_id=user_id)
+        if row.total
+    }
+    return counters, subjects
+
+
+def expected(user_id, today):
+    users, subjects = aggregate_progress([user_id], today)
+    return users[user_id], subjects
+
+
+def test_seeded_counters_match_the_tasks(plan):
+    user_id, _, _ = plan
+
+    ensure_progress([user_id], days(4))
+
+    assert stored(user_id) == expected(user_id, days(4))
+
+
+@pytest.mark.parametrize("later", [1, 3, 12])
+def test_rollover_over_several_days(plan, later):
+    user_id, _, _ = plan
+    ensure_progress([user_id], days(2))
+    db.session.commit()
+
+    ensure_progress([user_id], days(2 + later))
+
+    assert stored(user_id) == expected(user_id, days(2 + later))
+
+
+def test_rollover_in_steps_matches_one_jump(plan):
+    user_id, _, _ = plan
+    for n in (1, 2, 5, 6, 9):
+        ensure_progress([user_id], days(n))
+        db.session.commit()
+
+    assert stored(user_id) == expected(user_id, days(9))
+
+
+def test_delta_after_a_multi_day_gap(plan):
+    user_id, subject_ids, tasks = plan
+    ensure_progress([user_id], days(1))
+    db.session.commit()
+
+    topic = Topic(name="Early", subject_id=subject_ids[1])
+    db.session.add(topic)
+    db.session.flush()
+
+    # Four days later: complete a missed task, reopen a completed one,
+    # move a pending one into the past and add one before the plan start.
+    # The delta is described before anything is flushed.
+    today = days(5)
+    delta = ProgressDelta(today)
+
+    missed, done, pending = tasks[2], tasks[3], tasks[8]
+    delta.set_completed(user_id, missed.subject_id, missed.task_date, True)
+    missed.is_completed = True
+    delta.set_completed(user_id, done.subject_id, done.task_date, False)
+    done.is_completed = False
+    delta.move(user_id, pending.subject_id, pending.task_date, days(4))
+    pending.task_date = days(4)
+    delta.add(user_id, subject_ids[1], days(-3))
+
+    delta.apply()
+    db.session.add(StudyTask(
+        task_date=days(-3), user_id=user_id, subject_id=subject_ids[1], topic_id=topic.id
+    ))
+    db.session.commit()
+
+    counters, subjects = stored(user_id)
+    assert (counters, subjects) == expected(user_id, today)
+    assert counters["first_task_date"] == days(-3)
+
+
+def test_delta_then_rollover_stays_consistent(plan):
+    user_id, _, tasks = plan
+    delta = ProgressDelta(days(0))
+    for task in tasks[4:7]:
+        delta.move(user_id, task.subject_id, task.task_date, days(20), task.is_completed)
+        task.task_date = days(20)
+    delta.apply()
+    db.session.commit()
+
+    ensure_progress([user_id], days(15))
+
+    assert stored(user_id) == expected(user_id, days(15))
+
+
+def test_delta_that_cancels_out_changes_nothing(plan):
+    user_id, _, tasks = plan
+    ensure_progress([user_id], days(3))
+    db.session.commit()
+    before = stored(user_id)
+
+    delta = ProgressDelta(days(3))
+    task = tasks[5]
+    delta.set_completed(user_id, task.subject_id, task.task_date, True)
+    delta.set_completed(user_id, task.subject_id, task.task_date, False)
+    delta.apply()
+    db.session.commit()
+
+    assert stored(user_id) == before
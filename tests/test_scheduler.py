@@ -0,0 +1,113 @@
+from datetime import date, timedelta
+
+import pytest
+
+from utils.scheduler import NO_EXAM, PAST_DEADLINE, PlannedTask, diff_plan, schedule
+
+
+MONDAY = date(2026, 3, 2)
+
+
+def days(n):
+    return MONDAY + timedelta(days=n)
+
+
+def test_earliest_exam_is_planned_first():
+    topics = [(1, "late"), (2, "late"), (3, "early"), (4, "early")]
+    exams = {"late": days(30), "early": days(10)}
+
+    planned, unplaced = schedule(topics, exams, tasks_per_day=1, days_per_week=7, start=MONDAY)
+
+    assert unplaced == []
+    assert [task.topic_id for task in planned] == [3, 4, 1, 2]
+    assert [task.task_date for task in planned] == [days(0), days(1), days(2), days(3)]
+
+
+def test_every_task_is_before_its_exam():
+    topics = [(topic_id, topic_id % 3) for topic_id in range(30)]
+    exams = {0: days(5), 1: days(12), 2: days(40)}
+
+    planned, unplaced = schedule(topics, exams, tasks_per_day=2, days_per_week=7, start=MONDAY)
+
+    assert len(planned) + len(unplaced) == 30
+    assert all(task.task_date < exams[task.subject_id] for task in planned)
+
+
+def test_current_dates_keep_their_order_within_an_exam():
+    topics = [(1, "math"), (2, "math"), (3, "math")]
+    current = {1: days(9), 2: days(3), 3: days(6)}
+
+    planned, _ = schedule(topics, {"math": days(20)}, tasks_per_day=1, days_per_week=7,
+                          start=MONDAY, current=current)
+
+    assert [task.topic_id for task in planned] == [2, 3, 1]
+
+
+def test_only_the_first_days_of_each_week_are_study_days():
+    topics = [(topic_id, "math") for topic_id in range(10)]
+
+    planned, _ = schedule(topics, {"math": days(60)}, tasks_per_day=1, days_per_week=5,
+                          start=MONDAY)
+
+    assert all(task.task_date.weekday() < 5 for task in planned)
+    assert [task.task_date for task in planned][5] == days(7)
+
+
+@pytest.mark.parametrize("days_per_week, study_days", [(0, {0}), (1, {0}), (9, set(range(7)))])
+def test_days_per_week_is_clamped(days_per_week, study_days):
+    topics = [(topic_id, "math") for topic_id in range(7)]
+
+    planned, _ = schedule(topics, {"math": days(60)}, tasks_per_day=1,
+                          days_per_week=days_per_week, start=MONDAY)
+
+    assert {task.task_date.weekday() for task in planned} == study_days
+
+
+def test_topics_that_do_not_fit_before_the_exam_are_unplaced():
+    topics = [(topic_id, "math") for topic_id in range(7)]
+
+    planned, unplaced = schedule(topics, {"math": days(3)}, tasks_per_day=2, days_per_week=7,
+                                 start=MONDAY)
+
+    assert len(planned) == 6
+    assert [(topic.topic_id, topic.reason) for topic in unplaced] == [(6, PAST_DEADLINE)]
+
+
+def test_existing_load_counts_against_capacity():
+    topics = [(topic_id, "math") for topic_id in range(4)]
+    load = {days(0): 2, days(1): 1}
+
+    planned, unplaced = schedule(topics, {"math": days(3)}, tasks_per_day=2, days_per_week=7,
+                                 start=MONDAY, load=load)
+
+    assert [task.task_date for task in planned] == [days(1), days(2), days(2)]
+    assert [topic.topic_id for topic in unplaced] == [3]
+
+
+def test_topics_without_an_exam_are_unplaced():
+    planned, unplaced = schedule([(1, "math"), (2, "art")], {"math": days(5)},
+                                 tasks_per_day=1, days_per_week=7, start=MONDAY)
+
+    assert [task.topic_id for task in planned] == [1]
+    assert [(topic.topic_id, topic.reason) for topic in unplaced] == [(2, NO_EXAM)]
+
+
+def test_tasks_per_day_must_be_positive():
+    with pytest.raises(ValueError):
+        schedule([(1, "math")], {"math": days(5)}, tasks_per_day=0, days_per_week=7,
+                 start=MONDAY)
+
+
+def test_diff_plan_only_writes_changes():
+    current = {1: (10, days(0)), 2: (20, days(1)), 3: (30, days(2))}
+    planned = [
+        PlannedTask(1, "math", days(0)),
+        PlannedTask(2, "math", days(4)),
+        PlannedTask(4, "math", days(5)),
+    ]
+
+    changes = diff_plan(current, planned)
+
+    assert changes.inserts == [PlannedTask(4, "math", days(5))]
+    assert changes.updates == [(20, days(4))]
+    assert changes.deletes == [30]
@@ -0,0 +1,63 @@
+import pytest
+
+from utils.stores import MemoryStore, SqliteFile, make_store
+
+
+@pytest.fixture(params=["memory", "sqlite", "file"])
+def store(request, tmp_path):
+    urls = {
+        "memory": "memory://",
+        "sqlite": f"sqlite:///{tmp_path / 'store.db'}",
+        "file": f"file://{tmp_path / 'store'}",
+    }
+    return make_store(urls[request.param])
+
+
+def test_set_get_delete(store):
+    store.set("a", {"user_id": 1}, 60)
+
+    assert store.get("a") == {"user_id": 1}
+    store.delete("a")
+    assert store.get("a") is None
+    store.delete("a")
+
+
+def test_expired_keys_are_gone_and_purged(store):
+    store.set("old", 1, -1)
+    store.set("new", 2, 60)
+
+    assert store.get("old") is None
+    assert store.purge() <= 1
+    assert store.get("new") == 2
+
+
+def test_memory_store_drops_least_recently_used():
+    store = MemoryStore(max_entries=2)
+    store.set("a", 1, 60)
+    store.set("b", 2, 60)
+    store.get("a")
+    store.set("c", 3, 60)
+
+    assert store.get("a") == 1
+    assert store.get("b") is None
+    assert store.get("c") == 3
+
+
+def test_sqlite_file_sets_up_schema_once(tmp_path):
+    file = SqliteFile(str(tmp_path / "deep" / "dir" / "x.db"),
+                      ["CREATE TABLE IF NOT EXISTS t (k TEXT PRIMARY KEY)"])
+
+    conn = file.connect()
+    conn.execute("INSERT INTO t VALUES ('a')")
+    conn.close()
+    conn = file.connect()
+    try:
+        assert conn.execute("SELECT k FROM t").fetchall() == [("a",)]
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    finally:
+        conn.close()
+
+
+def test_unknown_url():
+    with pytest.raises(ValueError):
+        make_store("mongodb://localhost")
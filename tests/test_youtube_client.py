@@ -0,0 +1,266 @@
+from datetime import date, datetime
+
+import pytest
+
+from benchmarks import fake_youtube
+from utils.rate_limit import TokenBucket
+from utils.youtube_client import (
+    CircuitBreaker, CircuitOpen, QuotaExceeded, QuotaTracker, RateLimited, YouTubeClient,
+    YouTubeError,
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def fake():
+    servers = []
+
+    def start(**options):
+        server = fake_youtube.start(**options)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def make_client(server, **options):
+    sleeps = []
+    options.setdefault("retries", 2)
+    client = YouTubeClient(
+        "key", base_url=server.url, timeout=(1, 2), rate=1000, burst=1000, rate_wait=0,
+        sleep=sleeps.append, **options
+    )
+    client.sleeps = sleeps
+    return client
+
+
+def test_search_returns_videos(fake):
+    server = fake()
+    client = make_client(server)
+
+    videos = client.search("recursion")
+
+    assert [video["title"] for video in videos] == ["recursion #1", "recursion #2", "recursion #3"]
+    assert videos[0]["url"] == f"https://www.youtube.com/watch?v={videos[0]['video_id']}"
+    assert client.stats()["calls"] == 1
+    assert client.stats()["quota_used"] == 100
+
+
+def test_server_errors_are_retried_then_raised(fake):
+    server = fake(error_rate=1.0, error_status=500)
+    client = make_client(server, retries=2)
+
+    with pytest.raises(YouTubeError):
+        client.search("recursion")
+
+    assert server.requests == 3
+    assert len(client.sleeps) == 2
+    assert client.stats()["retries"] == 2
+    assert client.stats()["failures"] == 1
+
+
+def test_retry_after_is_honoured(fake):
+    server = fake(error_rate=1.0, error_status=429)
+    client = make_client(server, retries=1)
+
+    with pytest.raises(YouTubeError):
+        client.search("recursion")
+
+    assert client.sleeps == [0.0]
+
+
+def test_bad_requests_are_not_retried(fake):
+    server = fake()
+    client = make_client(server)
+    client.api_key = ""
+
+    with pytest.raises(YouTubeError):
+        client.search("recursion")
+
+    assert server.requests == 1
+    assert client.breaker.state == "closed"
+
+
+def test_circuit_opens_after_repeated_failures(fake):
+    server = fake(error_rate=1.0)
+    client = make_client(server, retries=0, breaker_threshold=2)
+
+    for _ in range(2):
+        with pytest.raises(YouTubeError):
+            client.search("recursion")
+
+    with pytest.raises(CircuitOpen):
+        client.search("recursion")
+
+    assert server.requests == 2
+    assert client.breaker.state == "open"
+    assert not client.available()
+
+
+def half_open_client(server, clock):
+    """A client whose circuit has opened and cooled down."""
+    client = make_client(server, retries=0)
+    client.breaker = CircuitBreaker(threshold=1, cooldown=60, clock=clock)
+    server.error_rate = 1.0
+    with pytest.raises(YouTubeError):
+        client.search("recursion")
+    server.error_rate = 0.0
+
+    clock.now += 60
+    assert client.breaker.state == "half-open"
+    return client
+
+
+def test_successful_trial_closes_the_circuit(fake):
+    client = half_open_client(fake(), Clock())
+
+    assert client.search("recursion")
+    assert client.breaker.state == "closed"
+
+
+def test_failed_trial_reopens_the_circuit(fake):
+    server = fake()
+    clock = Clock()
+    client = half_open_client(server, clock)
+    server.error_rate = 1.0
+
+    with pytest.raises(YouTubeError):
+        client.search("recursion")
+
+    assert client.breaker.state == "open"
+    clock.now += 59
+    with pytest.raises(CircuitOpen):
+        client.search("recursion")
+
+
+def test_only_one_trial_at_a_time(fake):
+    client = half_open_client(fake(), Clock())
+
+    assert client.breaker.allow() == "trial"
+    assert client.breaker.allow() is None
+    assert not client.available()
+
+
+def test_rate_limited_call_does_not_take_the_trial(fake):
+    # Regression: the trial was taken before the rate limit check, and
+    # a RateLimited refusal left the circuit half-open for good
+    client = half_open_client(fake(), Clock())
+    client.bucket = TokenBucket(rate=0, capacity=0)
+
+    with pytest.raises(RateLimited):
+        client.search("recursion")
+
+    assert client.available()
+    client.bucket = TokenBucket(rate=1000, capacity=1000)
+    assert client.search("recursion")
+    assert client.breaker.state == "closed"
+
+
+def test_unexpected_error_gives_the_trial_back(fake):
+    server = fake()
+    client = half_open_client(server, Clock())
+    client.base_url = "http://[not a host"
+
+    with pytest.raises(ValueError):
+        client.search("recursion")
+
+    assert client.available()
+    client.base_url = server.url
+    assert client.search("recursion")
+    assert client.breaker.state == "closed"
+
+
+def test_retries_take_tokens_from_the_bucket(fake):
+    server = fake(error_rate=1.0)
+    client = make_client(server, retries=2)
+    client.bucket = TokenBucket(rate=0, capacity=2)
+
+    with pytest.raises(YouTubeError):
+        client.search("recursion")
+
+    # One call and one retry; no token was left for the second retry
+    assert server.requests == 2
+    assert client.stats()["failures"] == 1
+
+
+def test_quota_refusal_during_the_trial_gives_it_back(fake):
+    client = half_open_client(fake(), Clock())
+    client.quota = QuotaTracker(daily_limit=0)
+
+    with pytest.raises(QuotaExceeded):
+        client.search("recursion")
+
+    # Still half-open: the API never answered
+    assert client.breaker.state == "half-open"
+    assert client.breaker.allow() == "trial"
+
+
+def test_quota_refusal_does_not_reset_failures(fake):
+    server = fake(error_rate=1.0)
+    client = make_client(server, retries=0, breaker_threshold=2)
+
+    with pytest.raises(YouTubeError):
+        client.search("recursion")
+    client.quota = QuotaTracker(daily_limit=0)
+    with pytest.raises(QuotaExceeded):
+        client.search("recursion")
+    client.quota = QuotaTracker()
+    with pytest.raises(YouTubeError):
+        client.search("recursion")
+
+    assert client.breaker.state == "open"
+
+
+def test_local_quota_refuses_before_calling(fake):
+    server = fake()
+    client = make_client(server, daily_quota=250)
+
+    client.search("one")
+    client.search("two")
+    with pytest.raises(QuotaExceeded):
+        client.search("three")
+
+    assert server.requests == 2
+    assert not client.available()
+    assert client.breaker.state == "closed"
+
+
+def test_quota_exceeded_from_the_api(fake):
+    server = fake(quota=1)
+    client = make_client(server)
+
+    client.search("one")
+    with pytest.raises(QuotaExceeded):
+        client.search("two")
+    with pytest.raises(QuotaExceeded):
+        client.search("three")
+
+    # Not retried, not held against the circuit, and no more calls today
+    assert server.requests == 2
+    assert client.stats()["retries"] == 0
+    assert client.breaker.state == "closed"
+    assert client.quota.remaining() == 0
+
+
+def test_quota_resets_on_a_new_day():
+    today = [datetime(2026, 3, 2, 23, 0)]
+    quota = QuotaTracker(daily_limit=200, now=lambda: today[0])
+
+    assert quota.reserve(200)
+    quota.mark_exhausted()
+    assert not quota.reserve(1)
+
+    today[0] = datetime(2026, 3, 3, 0, 5)
+    assert quota.day == date(2026, 3, 2)
+    assert quota.reserve(200)
+    assert quota.remaining() == 0
@@ -0,0 +1,46 @@
+import math
+from flask import current_app, flash, make_response, render_template
+
+from instrumentation import metrics
+from utils.rate_limit import KeyedTokenBuckets
+
+
+def init_app(app):
+    config = app.config
+    app.extensions["throttle"] = {
+        "auth_ip": KeyedTokenBuckets(
+            config["AUTH_IP_PER_MINUTE"] / 60, config["AUTH_IP_BURST"]
+        ),
+        "login_email": KeyedTokenBuckets(
+            config["LOGIN_EMAIL_PER_MINUTE"] / 60, config["LOGIN_EMAIL_BURST"]
+        ),
+    }
+
+
+def retry_after(**keys):
+    """Take a token from each named limit for its key: ``auth_ip=...``.
+
+    Returns the seconds to wait when any of them is used up, else 0.
+    Limits are per process, so with several workers the effective
+    limit is that many times higher.
+    """
+    if not current_app.config["AUTH_THROTTLE_ENABLED"]:
+        return 0
+
+    limits = current_app.extensions["throttle"]
+    wait = 0
+    for scope, key in keys.items():
+        if not key:
+            continue
+        scope_wait = limits[scope].try_acquire(key)
+        if scope_wait:
+            metrics.inc("studyplanner_throttled_total", {"scope": scope})
+            wait = max(wait, scope_wait)
+    return wait
+
+
+def retry_later(template, wait, message, status=429):
+    flash(message, "danger")
+    response = make_response(render_template(template), status)
+    response.headers["Retry-After"] = str(math.ceil(wait))
+    return response
@@ -0,0 +1,249 @@
+from collections import namedtuple
+from datetime import date
+import numpy as np
+
+
+DAY = np.timedelta64(1, "D")
+EPOCH = date(1970, 1, 1).toordinal()
+NOT_A_TIME = np.iinfo(np.int64).min
+
+# Exam risk from which a subject is flagged: over a tenth of its work
+# projected to be left at the exam
+AT_RISK = 0.1
+
+# One element per subject: its task counters, its exam and the day its
+# user's plan started (the same on all of a user's subjects)
+Plans = namedtuple("Plans", [
+    "user_ids", "subject_ids", "total", "completed", "exam_dates", "first_dates",
+])
+
+# One element per completed task
+Completions = namedtuple("Completions", ["user_ids", "subject_ids", "completed_on"])
+
+# One element per user, in user_ids order
+Forecast = namedtuple("Forecast", [
+    "user_ids", "total", "completed", "velocity", "finish_dates", "exam_risk",
+])
+
+# One element per subject, in subject_ids order
+ExamRisk = namedtuple("ExamRisk", [
+    "subject_ids", "user_ids", "remaining", "exam_dates", "risk",
+])
+
+
+def as_day(value):
+    return np.datetime64(value, "D")
+
+
+def day_array(values):
+    """datetime64[D] from dates or datetimes (None becomes NaT). Going
+    through ordinals is many times faster than letting NumPy convert
+    each object."""
+    return np.fromiter(
+        (NOT_A_TIME if value is None else value.toordinal() - EPOCH for value in values),
+        dtype=np.int64, count=len(values)
+    ).view("datetime64[D]")
+
+
+# -------------------------
+# Building the arrays
+# -------------------------
+
+def plans(rows):
+    """Plans from ``(user_id, subject_id, total, completed, exam_date,
+    first_task_date)`` rows, e.g. the stored progress counters."""
+    columns = list(zip(*rows)) or [()] * 6
+    user_ids, subject_ids, total, completed, exam_dates, first_dates = columns
+
+    return Plans(
+        np.array(user_ids, dtype=np.int64),
+        np.array(subject_ids, dtype=np.int64),
+        np.array(total, dtype=np.int64),
+        np.array(completed, dtype=np.int64),
+        day_array(exam_dates),
+        day_array(first_dates),
+    )
+
+
+def completions(rows, today):
+    """Completions from ``(user_id, subject_id, task_date, completed_at)``
+    rows of completed tasks.
+
+    Tasks completed before completion times were recorded count as done
+    on their planned date, or today if that is still ahead.
+    """
+    columns = list(zip(*rows)) or [()] * 4
+    user_ids, subject_ids, task_dates, completed_at = columns
+
+    completed_on = day_array(completed_at)
+    untimed = np.isnat(completed_on)
+    completed_on[untimed] = np.minimum(day_array(task_dates)[untimed], as_day(today))
+
+    return Completions(
+        np.array(user_ids, dtype=np.int64),
+        np.array(subject_ids, dtype=np.int64),
+        completed_on,
+    )
+
+
+def daily_counts(keys, groups, days, start, length):
+    """``len(groups)`` x ``length`` matrix: how many of ``days`` fall on
+    each day from ``start``, per group. ``keys`` says which of the
+    sorted ``groups`` each day belongs to; other keys are left out."""
+    offsets = (days - start) // DAY
+    rows = np.searchsorted(groups, keys)
+    found = rows < len(groups)
+    found[found] = groups[rows[found]] == keys[found]
+
+    inside = found & (offsets >= 0) & (offsets < length)
+    flat = rows[inside] * length + offsets[inside]
+    return np.bincount(flat, minlength=len(groups) * length).reshape(len(groups), length)
+
+
+def first_columns(plans, start):
+    """Each user's first planned day as a column index from ``start``
+    (users in sorted order); unknown first days count as ``start``."""
+    _, first = np.unique(plans.user_ids, return_index=True)
+    first_dates = plans.first_dates[first]
+    first_dates = np.where(np.isnat(first_dates), as_day(start), first_dates)
+    return (first_dates - as_day(start)) // DAY
+
+
+# -------------------------
+# Time series
+# -------------------------
+
+def daily_completions(done, user_ids, start, end):
+    """Tasks completed per user and day from ``start`` to ``end``
+    inclusive: ``counts[i, d]`` is for ``user_ids[i]`` (sorted) on day
+    ``start + d``."""
+    start, end = as_day(start), as_day(end)
+    length = int((end - start) // DAY) + 1
+    return daily_counts(done.user_ids, user_ids, done.completed_on, start, length)
+
+
+def rolling_velocity(counts, window, first_days=None):
+    """Completed tasks per day over the trailing ``window`` days, for
+    every day of ``counts`` (users x days).
+
+    ``first_days`` optionally gives each user's first day as a column
+    index (negative if before the first column); until a full window
+    has passed, the average is over the days since then, so a plan that
+    just started isn't dragged down by days it didn't exist.
+    """
+    totals = np.cumsum(counts, axis=1, dtype=np.float64)
+    rolled = totals.copy()
+    rolled[:, window:] -= totals[:, :-window]
+
+    elapsed = np.arange(1, counts.shape[1] + 1)[np.newaxis, :]
+    if first_days is not None:
+        elapsed = elapsed - np.asarray(first_days)[:, np.newaxis]
+    return rolled / np.clip(elapsed, 1, window)
+
+
+def burndown(plans, done, start, end):
+    """Open tasks per subject (in ``plans`` order) at the end of each day
+    from ``start`` to ``end``, which is taken to be today.
+
+    Worked back from today's counters and the completions since
+    ``start``: tasks a replan added or removed in between aren't
+    reconstructed.
+    """
+    start, end = as_day(start), as_day(end)
+    length = int((end - start) // DAY) + 1
+
+    order = np.argsort(plans.subject_ids)
+    counts = np.empty((len(order), length), dtype=np.int64)
+    counts[order] = daily_counts(
+        done.subject_ids, plans.subject_ids[order], done.completed_on, start, length
+    )
+
+    # Open at the end of day d: open now plus what was completed after d
+    later = np.cumsum(counts[:, ::-1], axis=1)[:, ::-1]
+    later = np.concatenate([later[:, 1:], np.zeros((len(order), 1), dtype=np.int64)], axis=1)
+    return (plans.total - plans.completed)[:, np.newaxis] + later
+
+
+# -------------------------
+# Forecasts
+# -------------------------
+
+def runs(*keys):
+    """Run index of each element of already sorted ``keys``, and where
+    each run starts."""
+    starts = np.zeros(len(keys[0]), dtype=bool)
+    starts[:1] = True
+    for key in keys:
+        starts[1:] |= key[1:] != key[:-1]
+    return np.cumsum(starts) - 1, starts
+
+
+def exam_risk(plans, velocity, today):
+    """How much of each subject's open work won't be done by its exam.
+
+    Plans are worked through earliest exam first, so everything due for
+    that exam and earlier ones has to fit in the days before it at the
+    user's ``velocity`` (tasks per day, aligned with the sorted unique
+    user IDs). ``risk`` is the share of it projected to be left over:
+    0 is on track, 1 is nothing done in time. Subjects without an exam
+    get NaN.
+    """
+    today = as_day(today)
+    _, users = np.unique(plans.user_ids, return_inverse=True)
+    remaining = plans.total - plans.completed
+
+    # Open work due by each exam: cumulative over a user's subjects in
+    # exam order, ties sharing their total; undated subjects sort last
+    due = remaining.astype(np.float64)
+    if len(remaining):
+        order = np.lexsort((plans.exam_dates, users))
+        running = np.cumsum(remaining[order])
+
+        user_run, user_starts = runs(users[order])
+        before_user = (running - remaining[order])[user_starts][user_run]
+        exam_run, exam_starts = runs(users[order], plans.exam_dates[order])
+        exam_ends = np.r_[np.flatnonzero(exam_starts)[1:] - 1, len(order) - 1]
+        due[order] = running[exam_ends][exam_run] - before_user
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        days_left = np.maximum((plans.exam_dates - today) // DAY, 0)
+        risk = np.clip(1 - velocity[users] * days_left / due, 0, 1)
+    risk[remaining <= 0] = 0
+    risk[np.isnat(plans.exam_dates)] = np.nan
+
+    return ExamRisk(plans.subject_ids, plans.user_ids, remaining, plans.exam_dates, risk)
+
+
+def forecast(plans, done, today, window=14):
+    """Per user totals, velocity over the last ``window`` days, the
+    predicted finish date at that pace and the highest exam risk.
+
+    ``done`` needs the completions of the last ``window`` days only.
+    ``finish_dates`` is today for finished plans and NaT when nothing
+    was completed recently. Returns ``(Forecast, ExamRisk)``; every user
+    in ``plans`` is handled in the same few array operations.
+    """
+    today = as_day(today)
+    start = today - (window - 1) * DAY
+    user_ids, users = np.unique(plans.user_ids, return_inverse=True)
+    count = len(user_ids)
+
+    total = np.bincount(users, weights=plans.total, minlength=count).astype(np.int64)
+    completed = np.bincount(users, weights=plans.completed, minlength=count).astype(np.int64)
+
+    counts = daily_completions(done, user_ids, start, today)
+    velocity = rolling_velocity(counts, window, first_columns(plans, start))[:, -1]
+
+    remaining = total - completed
+    with np.errstate(divide="ignore", invalid="ignore"):
+        days = np.ceil(remaining / velocity)
+    finish_dates = np.full(count, np.datetime64("NaT"), dtype="datetime64[D]")
+    pace = velocity > 0
+    finish_dates[pace] = today + days[pace].astype(np.int64) * DAY
+    finish_dates[remaining <= 0] = today
+
+    risks = exam_risk(plans, velocity, today)
+    worst = np.full(count, np.nan)
+    np.fmax.at(worst, users, risks.risk)
+
+    return Forecast(user_ids, total, completed, velocity, finish_dates, worst), risks
@@ -0,0 +1,82 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenBucket:
+    """Allow ``rate`` events per second on average, bursts up to ``capacity``.
+
+    Thread-safe. ``clock`` and ``sleep`` can be swapped out to test
+    without waiting.
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1))
+        self.clock = clock
+        self.sleep = sleep
+
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = max(0.0, now - self._updated)
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens=1):
+        """Take ``tokens`` if they are there now. Returns the seconds to
+        wait before they would be (0 when taken)."""
+        with self._lock:
+            self._refill(self.clock())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate if self.rate else float("inf")
+
+    def acquire(self, tokens=1, timeout=None):
+        """Wait up to ``timeout`` seconds (forever when None) for ``tokens``.
+
+        Returns False, without taking anything, if they wouldn't be
+        available in time.
+        """
+        deadline = None if timeout is None else self.clock() + timeout
+
+        while True:
+            wait = self.try_acquire(tokens)
+            if not wait:
+                return True
+            if deadline is not None and self.clock() + wait > deadline:
+                return False
+            self.sleep(wait)
+
+
+class KeyedTokenBuckets:
+    """One TokenBucket per key, e.g. per client IP or per email.
+
+    Only the ``max_keys`` most recently used keys are remembered; a
+    forgotten key starts again with a full bucket.
+    """
+
+    def __init__(self, rate, capacity=None, max_keys=10000, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_keys = max_keys
+        self.clock = clock
+
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, key, tokens=1):
+        """Like TokenBucket.try_acquire, for ``key``'s bucket."""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.rate, self.capacity, self.clock)
+                while len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+
+        return bucket.try_acquire(tokens)
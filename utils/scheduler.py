@@ -0,0 +1,122 @@
+from collections import namedtuple
+from datetime import date, timedelta
+
+
+PlannedTask = namedtuple("PlannedTask", ["topic_id", "subject_id", "task_date"])
+UnplacedTopic = namedtuple("UnplacedTopic", ["topic_id", "subject_id", "reason"])
+PlanDiff = namedtuple("PlanDiff", ["inserts", "updates", "deletes"])
+
+# Reasons a topic can come back unplaced
+NO_EXAM = "no_exam"
+PAST_DEADLINE = "past_deadline"
+
+
+def is_study_day(day, days_per_week):
+    # Study days are the first `days_per_week` days of each week, from Monday
+    return day.weekday() < days_per_week
+
+
+def free_slots(start, tasks_per_day, days_per_week, load=None):
+    """Yield one date per free task slot, in date order, from ``start`` on.
+
+    ``load`` maps a date to the number of tasks already on it; those
+    slots are skipped. The generator is infinite, callers stop pulling
+    when they run out of work.
+    """
+    load = load or {}
+    days_per_week = min(max(int(days_per_week), 1), 7)
+    day = start
+
+    while True:
+        if is_study_day(day, days_per_week):
+            for _ in range(tasks_per_day - load.get(day, 0)):
+                yield day
+        day += timedelta(days=1)
+
+
+def schedule(topics, exam_dates, tasks_per_day, days_per_week, start, load=None,
+             current=None):
+    """Place topics on study days across all subjects, earliest exam first.
+
+    ``topics`` is an iterable of ``(topic_id, subject_id)`` and
+    ``exam_dates`` maps subject_id to its exam date. Each topic takes one
+    slot strictly before its exam; a day holds at most ``tasks_per_day``
+    tasks including those already counted in ``load``.
+
+    ``current`` optionally maps topic_id to the date it is scheduled on
+    now. Among topics with the same exam those keep their relative
+    order, which keeps a re-plan close to the existing schedule.
+
+    Returns ``(planned, unplaced)`` as lists of ``PlannedTask`` and
+    ``UnplacedTopic``. Sorting dominates, so this runs in O(n log n).
+    """
+    if tasks_per_day < 1:
+        raise ValueError("tasks_per_day must be at least 1")
+
+    current = current or {}
+    planned = []
+    unplaced = []
+    queue = []
+
+    for topic_id, subject_id in topics:
+        exam_date = exam_dates.get(subject_id)
+        if exam_date is None:
+            unplaced.append(UnplacedTopic(topic_id, subject_id, NO_EXAM))
+        else:
+            queue.append(
+                (exam_date, current.get(topic_id, date.max), subject_id, topic_id)
+            )
+
+    # Earliest-deadline-first: if a topic misses its exam here, no
+    # other order would have fitted more topics
+    queue.sort()
+
+    slots = free_slots(start, tasks_per_day, days_per_week, load)
+    slot = next(slots) if queue else None
+
+    for exam_date, _, subject_id, topic_id in queue:
+        if slot < exam_date:
+            planned.append(PlannedTask(topic_id, subject_id, slot))
+            slot = next(slots)
+        else:
+            unplaced.append(UnplacedTopic(topic_id, subject_id, PAST_DEADLINE))
+
+    return planned, unplaced
+
+
+def diff_plan(current, planned):
+    """Changes that turn the current tasks into ``planned``.
+
+    ``current`` maps topic_id to ``(task_id, task_date)`` for the tasks
+    being re-planned. Returns a ``PlanDiff`` of new ``PlannedTask`` rows,
+    ``(task_id, new_date)`` moves and task IDs that no longer fit.
+    """
+    inserts = []
+    updates = []
+    placed = set()
+
+    for task in planned:
+        placed.add(task.topic_id)
+        existing = current.get(task.topic_id)
+
+        if existing is None:
+            inserts.append(task)
+        elif existing[1] != task.task_date:
+            updates.append((existing[0], task.task_date))
+
+    deletes = [
+        task_id for topic_id, (task_id, _) in current.items()
+        if topic_id not in placed
+    ]
+
+    return PlanDiff(inserts, updates, deletes)
+
+
+def reschedule(task_ids, tasks_per_day, days_per_week, start, load=None):
+    """Move tasks, in the given order, onto the next free slots from ``start``.
+
+    Returns ``(task_id, new_date)`` pairs. Each task costs one step of
+    the slot generator, so this is linear in tasks plus days walked.
+    """
+    slots = free_slots(start, max(int(tasks_per_day), 1), days_per_week, load)
+    return [(task_id, next(slots)) for task_id in task_ids]
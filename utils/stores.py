@@ -0,0 +1,224 @@
+"""Key-value stores with expiry, shared by the session store, the page
+cache, the video cache and the prefetch queue.
+
+All of them take JSON-serialisable values and a time to live in seconds
+per ``set``.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class SqliteFile:
+    """A SQLite file of our own (not the app database), created on first
+    use: its directory, WAL mode and ``schema`` are set up on the first
+    connection of each process.
+
+    Connections are in autocommit mode; open a transaction explicitly
+    where several statements must go together.
+    """
+
+    def __init__(self, path, schema):
+        self.path = path
+        self.schema = schema
+        self._ready = False
+
+    def connect(self):
+        if not self._ready:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        if not self._ready:
+            conn.execute("PRAGMA journal_mode = WAL")
+            for statement in self.schema:
+                conn.execute(statement)
+            self._ready = True
+        return conn
+
+
+class MemoryStore:
+    """Keys in this process only; for a single worker or tests.
+
+    With ``max_entries`` the least recently used keys are dropped first
+    once it is full.
+    """
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            if self.max_entries:
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def purge(self):
+        now = time.time()
+        with self._lock:
+            expired = [key for key, (expires_at, _) in self._entries.items() if expires_at < now]
+            for key in expired:
+                del self._entries[key]
+        return len(expired)
+
+
+class SqliteStore:
+    """Keys in a SQLite file of their own, shared by the workers on a host."""
+
+    def __init__(self, path):
+        self.file = SqliteFile(path, [
+            "CREATE TABLE IF NOT EXISTS store ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        ])
+
+    def get(self, key):
+        conn = self.file.connect()
+        try:
+            row = conn.execute(
+                "SELECT value FROM store WHERE key = ? AND expires_at >= ?",
+                (key, time.time())
+            ).fetchone()
+        finally:
+            conn.close()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, value, ttl):
+        conn = self.file.connect()
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO store (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time() + ttl)
+            )
+        finally:
+            conn.close()
+
+    def delete(self, key):
+        conn = self.file.connect()
+        try:
+            conn.execute("DELETE FROM store WHERE key = ?", (key,))
+        finally:
+            conn.close()
+
+    def purge(self):
+        conn = self.file.connect()
+        try:
+            return conn.execute("DELETE FROM store WHERE expires_at < ?", (time.time(),)).rowcount
+        finally:
+            conn.close()
+
+
+class FileStore:
+    """One JSON file per key in a directory."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest())
+
+    def _read(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def get(self, key):
+        item = self._read(self._path(key))
+        if not item or item["expires_at"] < time.time():
+            return None
+        return item["value"]
+
+    def set(self, key, value, ttl):
+        path = self._path(key)
+        # Write aside and rename, so readers never see half a file
+        temp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp, "w") as f:
+            json.dump({"expires_at": time.time() + ttl, "value": value}, f)
+        os.replace(temp, path)
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def purge(self):
+        removed = 0
+        now = time.time()
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            item = self._read(path)
+            if item is None and not name.endswith(".tmp"):
+                continue
+            if item is None or item["expires_at"] < now:
+                try:
+                    os.remove(path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+
+class RedisStore:
+    """Keys in Redis, shared by every worker that can reach it."""
+
+    def __init__(self, url):
+        # Optional dependency, only needed for redis:// store URLs
+        import redis
+
+        self._redis = redis.Redis.from_url(url)
+
+    def get(self, key):
+        raw = self._redis.get(key)
+        return json.loads(raw) if raw else None
+
+    def set(self, key, value, ttl):
+        self._redis.setex(key, int(ttl), json.dumps(value))
+
+    def delete(self, key):
+        self._redis.delete(key)
+
+    def purge(self):
+        # Redis expires keys itself
+        return 0
+
+
+def make_store(url):
+    """``memory://``, ``sqlite:///path/store.db``, ``file:///path/dir``
+    or ``redis://host:port/db``."""
+    if url == "memory://":
+        return MemoryStore()
+    if url.startswith("sqlite:///"):
+        return SqliteStore(url[len("sqlite:///"):])
+    if url.startswith("file://"):
+        return FileStore(url[len("file://"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisStore(url)
+    raise ValueError(f"Unsupported store URL: {url}")
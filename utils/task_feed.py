@@ -0,0 +1,135 @@
+import csv
+import io
+from datetime import datetime, timedelta, timezone
+
+
+CSV_COLUMNS = ["date", "subject", "topic", "completed"]
+
+TRUE_VALUES = {"1", "true", "yes", "y", "x", "done", "completed", "✓"}
+
+
+# -------------------------
+# iCalendar (RFC 5545)
+# -------------------------
+
+def ical_escape(text):
+    return (
+        text.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def ical_fold(line):
+    # Content lines are at most 75 octets; continuations start with a space
+    data = line.encode()
+    if len(data) <= 75:
+        return line + "\r\n"
+
+    parts = []
+    limit = 75
+    while data:
+        cut = min(limit, len(data))
+        # Don't split a UTF-8 sequence
+        while cut < len(data) and (data[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(data[:cut].decode())
+        data = data[cut:]
+        limit = 74
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def ical_events(rows, calendar_name, domain, stamp=None):
+    """Lines of a calendar with an all-day event per task.
+
+    ``rows`` yields ``(task_id, task_date, completed, subject, topic)``
+    and is consumed lazily, so a large plan is never held in memory.
+    """
+    stamp = (stamp or datetime.now(timezone.utc)).strftime("%Y%m%dT%H%M%SZ")
+
+    yield "BEGIN:VCALENDAR\r\n"
+    yield "VERSION:2.0\r\n"
+    yield "PRODID:-//Prepify//Study Planner//EN\r\n"
+    yield "CALSCALE:GREGORIAN\r\n"
+    yield "METHOD:PUBLISH\r\n"
+    yield ical_fold(f"X-WR-CALNAME:{ical_escape(calendar_name)}")
+
+    for task_id, task_date, completed, subject, topic in rows:
+        summary = f"{subject}: {topic}"
+        if completed:
+            summary = "✓ " + summary
+
+        yield (
+            "BEGIN:VEVENT\r\n"
+            f"UID:task-{task_id}@{domain}\r\n"
+            f"DTSTAMP:{stamp}\r\n"
+            f"DTSTART;VALUE=DATE:{task_date:%Y%m%d}\r\n"
+            f"DTEND;VALUE=DATE:{task_date + timedelta(days=1):%Y%m%d}\r\n"
+            + ical_fold(f"SUMMARY:{ical_escape(summary)}")
+            + ical_fold(f"CATEGORIES:{ical_escape(subject)}")
+            + "TRANSP:TRANSPARENT\r\n"
+            "END:VEVENT\r\n"
+        )
+
+    yield "END:VCALENDAR\r\n"
+
+
+# -------------------------
+# CSV
+# -------------------------
+
+def csv_chunks(rows, chunk_size=500):
+    """CSV text for ``(task_date, subject, topic, completed)`` rows, a
+    few hundred rows per chunk."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+
+    count = 0
+    for task_date, subject, topic, completed in rows:
+        writer.writerow([task_date.isoformat(), subject, topic, int(bool(completed))])
+        count += 1
+        if count % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+
+def parse_task_csv(lines):
+    """``(task_date, subject, topic, completed)`` per CSV row, lazily.
+
+    Needs a header with ``date``, ``subject`` and ``topic`` columns
+    (``completed`` is optional), as written by csv_chunks(). Rows with a
+    bad date or a missing name come out with ``None`` in their place.
+    """
+    reader = csv.reader(lines)
+    header = [cell.strip().lower() for cell in next(reader, [])]
+
+    missing = [c for c in ("date", "subject", "topic") if c not in header]
+    if missing:
+        raise ValueError(f"Missing column(s): {', '.join(missing)}")
+
+    date_col, subject_col, topic_col = (header.index(c) for c in ("date", "subject", "topic"))
+    completed_col = header.index("completed") if "completed" in header else None
+
+    def cell(row, index):
+        return " ".join(row[index].split()) if index is not None and index < len(row) else ""
+
+    for row in reader:
+        if not any(c.strip() for c in row):
+            continue
+        try:
+            task_date = datetime.strptime(cell(row, date_col), "%Y-%m-%d").date()
+        except ValueError:
+            task_date = None
+
+        yield (
+            task_date,
+            cell(row, subject_col) or None,
+            cell(row, topic_col) or None,
+            cell(row, completed_col).lower() in TRUE_VALUES,
+        )
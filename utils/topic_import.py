@@ -0,0 +1,130 @@
+import csv
+import io
+import json
+import re
+
+
+# "- Trees", "* Trees", "• Trees", "3. Trees", "3) Trees"
+BULLET = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+")
+
+
+def clean_name(name):
+    return " ".join(str(name or "").split())
+
+
+def parse_text(text):
+    """Topics from pasted text: comma or line separated.
+
+    A line starting with ``#`` names the subject for the lines below it
+    (``# Data Structures``); topics before any heading have no subject.
+    List bullets and numbering are dropped.
+    """
+    pairs = []
+    subject = None
+
+    for line in text.splitlines():
+        if line.lstrip().startswith("#"):
+            subject = clean_name(line.lstrip().lstrip("#")) or None
+            continue
+
+        for name in BULLET.sub("", line).split(","):
+            name = clean_name(name)
+            if name:
+                pairs.append((subject, name))
+
+    return pairs
+
+
+def parse_csv(text):
+    """Topics from CSV with ``topic`` and optional ``subject`` columns.
+
+    Without a header row, one column is the topic and two columns are
+    subject, topic.
+    """
+    rows = [row for row in csv.reader(io.StringIO(text)) if any(cell.strip() for cell in row)]
+    if not rows:
+        return []
+
+    header = [cell.strip().lower() for cell in rows[0]]
+    topic_column = next((header.index(c) for c in ("topic", "name") if c in header), None)
+
+    if topic_column is not None:
+        subject_column = header.index("subject") if "subject" in header else None
+        rows = rows[1:]
+    elif len(header) >= 2:
+        subject_column, topic_column = 0, 1
+    else:
+        subject_column, topic_column = None, 0
+
+    pairs = []
+    for row in rows:
+        name = clean_name(row[topic_column]) if topic_column < len(row) else ""
+        subject = ""
+        if subject_column is not None and subject_column < len(row):
+            subject = clean_name(row[subject_column])
+        if name:
+            pairs.append((subject or None, name))
+    return pairs
+
+
+def parse_json(text):
+    """Topics from JSON in any of these shapes::
+
+        ["Arrays", "Trees"]
+        {"Data Structures": ["Arrays", "Trees"]}
+        [{"subject": "Data Structures", "topic": "Arrays"}, ...]
+    """
+    try:
+        data = json.loads(text)
+    except ValueError as e:
+        raise ValueError(f"Not valid JSON: {e}")
+
+    if isinstance(data, dict):
+        items = [
+            (subject, name)
+            for subject, names in data.items()
+            for name in (names if isinstance(names, list) else [names])
+        ]
+    elif isinstance(data, list):
+        items = []
+        for entry in data:
+            if isinstance(entry, dict):
+                items.append((entry.get("subject"), entry.get("topic", entry.get("name"))))
+            else:
+                items.append((None, entry))
+    else:
+        raise ValueError("Expected a list of topics or an object of subject: topics")
+
+    pairs = []
+    for subject, name in items:
+        if isinstance(name, (dict, list)):
+            raise ValueError("Topic names must be strings")
+        name = clean_name(name)
+        if name:
+            pairs.append((clean_name(subject) or None, name))
+    return pairs
+
+
+def parse_topics(text, filename=None):
+    """``(subject_name or None, topic_name)`` pairs, in input order.
+
+    The format comes from the file extension when there is one,
+    otherwise from the content. Raises ValueError for malformed input.
+    """
+    extension = filename.rsplit(".", 1)[-1].lower() if filename and "." in filename else ""
+    stripped = text.lstrip()
+
+    if extension == "json":
+        return parse_json(text)
+    if not extension and stripped[:1] in ("[", "{"):
+        # Pasted JSON; text that merely starts with a bracket is just text
+        try:
+            return parse_json(text)
+        except ValueError:
+            pass
+
+    first_line = stripped.split("\n", 1)[0].strip().lower().replace(" ", "")
+    if extension == "csv" or first_line in ("subject,topic", "topic,subject", "topic", "subject,name"):
+        return parse_csv(text)
+
+    return parse_text(text)
@@ -0,0 +1,219 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from blinker import signal
+
+from utils.stores import SqliteFile
+
+
+DEFAULT_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "instance",
+    "video_cache.db"
+)
+
+
+# Sent after video lookups (with ``topics``, ``seconds`` and, for cache
+# reads, how many are still ``missing``) and after
+# each YouTube search (with ``seconds`` and ``failed``), for whoever
+# wants to measure them; see instrumentation.py
+video_lookup = signal("video-lookup")
+youtube_search = signal("youtube-search")
+
+
+def normalize_query(topic):
+    # "  Linear   algebra " and "linear algebra" share one entry
+    return " ".join((topic or "").split()).lower()
+
+
+class VideoCache:
+    """Two-level cache for video lookups.
+
+    An in-process LRU sits on top of a SQLite table so results survive
+    restarts. Every entry has a fresh window (``ttl``) and a further
+    window (``stale_ttl``) in which it may still be served while a
+    refresh runs. Empty or failed lookups are stored with the shorter
+    ``negative_ttl`` and are never served stale.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, max_entries=512, ttl=24 * 3600,
+                 stale_ttl=7 * 24 * 3600, negative_ttl=15 * 60):
+        self.path = path
+        self.file = SqliteFile(path, [
+            "CREATE TABLE IF NOT EXISTS video_cache ("
+            " query TEXT PRIMARY KEY,"
+            " videos TEXT NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " stale_until REAL NOT NULL)"
+        ])
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "disk_hits": 0,
+            "stale_hits": 0,
+            "negative_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+        }
+
+    # -------------------------
+    # Persistent store
+    # -------------------------
+
+    def _read_disk(self, key):
+        try:
+            conn = self.file.connect()
+            try:
+                row = conn.execute(
+                    "SELECT videos, expires_at, stale_until FROM video_cache"
+                    " WHERE query = ?",
+                    (key,)
+                ).fetchone()
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            return None
+
+        if row is None:
+            return None
+
+        return (json.loads(row[0]), row[1], row[2])
+
+    def _write_disk(self, key, entry):
+        videos, expires_at, stale_until = entry
+        try:
+            conn = self.file.connect()
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO video_cache"
+                    " (query, videos, expires_at, stale_until)"
+                    " VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(videos), expires_at, stale_until)
+                )
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            # The in-memory layer still holds the entry
+            pass
+
+    # -------------------------
+    # Public API
+    # -------------------------
+
+    def lookup(self, key):
+        """Return ``(videos, state)`` where state is "fresh", "stale" or None."""
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                source = "hits"
+
+        if entry is None or now >= entry[1]:
+            # Another process (e.g. the prefetch worker) may have refreshed it
+            disk_entry = self._read_disk(key)
+            if disk_entry is not None and (entry is None or disk_entry[1] > entry[1]):
+                entry = disk_entry
+                source = "disk_hits"
+                self._remember(key, entry)
+
+        if entry is None or now >= entry[2]:
+            self._count("misses")
+            return None, None
+
+        videos, expires_at, _ = entry
+
+        if now < expires_at:
+            self._count(source)
+            if not videos:
+                self._count("negative_hits")
+            return videos, "fresh"
+
+        self._count("stale_hits")
+        return videos, "stale"
+
+    def store(self, key, videos):
+        now = time.time()
+
+        if videos:
+            expires_at = now + self.ttl
+            stale_until = expires_at + self.stale_ttl
+        else:
+            expires_at = stale_until = now + self.negative_ttl
+
+        entry = (videos, expires_at, stale_until)
+        self._remember(key, entry)
+        self._write_disk(key, entry)
+        self._count("stores")
+
+    def purge_expired(self):
+        now = time.time()
+
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if now >= e[2]]:
+                del self._entries[key]
+
+        try:
+            conn = self.file.connect()
+            try:
+                removed = conn.execute(
+                    "DELETE FROM video_cache WHERE stale_until <= ?", (now,)
+                ).rowcount
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            return 0
+
+        return removed
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._counters)
+            data["entries"] = len(self._entries)
+            data["max_entries"] = self.max_entries
+
+        lookups = data["hits"] + data["disk_hits"] + data["stale_hits"] + data["misses"]
+        data["hit_ratio"] = round(
+            (lookups - data["misses"]) / lookups if lookups else 0, 4
+        )
+        return data
+
+    # -------------------------
+    # Internals
+    # -------------------------
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+
+# Shared by the views, the prefetch queue and the YouTube client. Lives
+# here rather than in youtube_helper so reading the cache doesn't pull
+# in the HTTP stack.
+video_cache = VideoCache(
+    path=os.getenv("VIDEO_CACHE_PATH", DEFAULT_PATH),
+    max_entries=int(os.getenv("VIDEO_CACHE_SIZE", "512")),
+    ttl=int(os.getenv("VIDEO_CACHE_TTL", str(24 * 3600))),
+    stale_ttl=int(os.getenv("VIDEO_CACHE_STALE_TTL", str(7 * 24 * 3600))),
+    negative_ttl=int(os.getenv("VIDEO_CACHE_NEGATIVE_TTL", str(15 * 60)))
+)
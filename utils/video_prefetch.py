@@ -0,0 +1,195 @@
+import os
+import sqlite3
+import threading
+import time
+
+from utils.stores import SqliteFile
+from utils.video_cache import normalize_query, video_cache, video_lookup
+
+
+# Searches per second the worker may issue, and how long it idles when
+# the queue is empty
+PREFETCH_RATE = float(os.getenv("VIDEO_PREFETCH_RATE", "2"))
+IDLE_WAIT = float(os.getenv("VIDEO_PREFETCH_IDLE", "5"))
+
+# Set VIDEO_PREFETCH_THREAD=0 when a standalone worker
+# (python -m utils.video_prefetch) drains the queue instead
+RUN_THREAD = os.getenv("VIDEO_PREFETCH_THREAD", "1") != "0"
+
+
+class PrefetchQueue:
+    """Topics waiting for a video lookup, kept next to the video cache.
+
+    The queue lives in SQLite so web processes and a standalone worker
+    can share it, and so nothing is lost on restart.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = SqliteFile(path, [
+            "CREATE TABLE IF NOT EXISTS prefetch_queue ("
+            " query TEXT PRIMARY KEY,"
+            " topic TEXT NOT NULL,"
+            " enqueued_at REAL NOT NULL)"
+        ])
+
+    def put_many(self, topics):
+        rows = {}
+        for topic in topics:
+            key = normalize_query(topic)
+            if key:
+                rows.setdefault(key, topic)
+
+        if not rows:
+            return 0
+
+        now = time.time()
+        conn = self.file.connect()
+        try:
+            conn.executemany(
+                "INSERT OR IGNORE INTO prefetch_queue (query, topic, enqueued_at)"
+                " VALUES (?, ?, ?)",
+                [(key, topic, now) for key, topic in rows.items()]
+            )
+        finally:
+            conn.close()
+
+        return len(rows)
+
+    def claim(self, limit):
+        conn = self.file.connect()
+        try:
+            # IMMEDIATE takes the write lock up front so two workers
+            # never claim the same rows
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT query, topic FROM prefetch_queue"
+                " ORDER BY enqueued_at LIMIT ?",
+                (limit,)
+            ).fetchall()
+            conn.executemany(
+                "DELETE FROM prefetch_queue WHERE query = ?",
+                [(row[0],) for row in rows]
+            )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+        return [row[1] for row in rows]
+
+    def __len__(self):
+        conn = self.file.connect()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM prefetch_queue").fetchone()[0]
+        finally:
+            conn.close()
+
+
+queue = PrefetchQueue(video_cache.path)
+
+_wakeup = threading.Event()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def drain_once(rate=PREFETCH_RATE):
+    # Imported here so processes that only read the cache never load
+    # requests; the first claimed topic pays for it instead
+    from utils import youtube_helper
+
+    # Leave the queue alone while the API is refusing calls; the topics
+    # are still there once the circuit closes or the quota resets
+    if not youtube_helper.client.available():
+        return 0
+
+    batch_size = max(1, int(rate))
+    topics = queue.claim(batch_size)
+    if not topics:
+        return 0
+
+    started = time.monotonic()
+    refused = youtube_helper.prefetch_many(topics)
+    if refused:
+        # Claiming took them off the queue; put them back for when the
+        # API takes calls again
+        queue.put_many(refused)
+
+    # Keep the average below `rate` searches per second
+    elapsed = time.monotonic() - started
+    time.sleep(max(0.0, len(topics) / rate - elapsed))
+    return len(topics) - len(refused)
+
+
+def run_worker(stop=None):
+    stop = stop or threading.Event()
+
+    while not stop.is_set():
+        try:
+            processed = drain_once()
+        except sqlite3.Error:
+            processed = 0
+
+        if not processed:
+            _wakeup.wait(IDLE_WAIT)
+            _wakeup.clear()
+
+
+def _ensure_worker():
+    global _worker
+
+    if not RUN_THREAD:
+        return
+
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(
+                target=run_worker, name="video-prefetch", daemon=True
+            )
+            _worker.start()
+
+
+def enqueue_topics(topics):
+    try:
+        added = queue.put_many(topics)
+    except sqlite3.Error:
+        return 0
+
+    if added:
+        _ensure_worker()
+        _wakeup.set()
+    return added
+
+
+def stored_videos_for(topics):
+    """Videos for each topic from the cache only, never the network.
+
+    Anything missing or stale is queued so the worker resolves it
+    before the next view.
+    """
+    started = time.perf_counter()
+    results = {}
+    to_fetch = []
+
+    for topic in topics:
+        videos, state = video_cache.lookup(normalize_query(topic))
+
+        if state != "fresh":
+            to_fetch.append(topic)
+        results[topic] = videos or []
+
+    if to_fetch:
+        enqueue_topics(to_fetch)
+
+    video_lookup.send(
+        "stored_videos_for", topics=len(results), missing=len(to_fetch),
+        seconds=time.perf_counter() - started
+    )
+    return results
+
+
+if __name__ == "__main__":
+    print(f"Draining video prefetch queue at {PREFETCH_RATE}/s")
+    try:
+        run_worker()
+    except KeyboardInterrupt:
+        pass
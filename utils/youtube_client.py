@@ -0,0 +1,321 @@
+import random
+import threading
+import time
+from datetime import datetime, timezone
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.rate_limit import TokenBucket
+
+try:
+    from zoneinfo import ZoneInfo
+    QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+except Exception:
+    # No tz database on this machine; the day boundary is off by a few hours
+    QUOTA_TIMEZONE = timezone.utc
+
+
+DEFAULT_BASE_URL = "https://www.googleapis.com/youtube/v3"
+
+# Quota units per call, from the YouTube Data API docs
+SEARCH_COST = 100
+
+
+class YouTubeError(Exception):
+    pass
+
+
+class YouTubeUnavailable(YouTubeError):
+    """The call wasn't attempted: circuit open, out of quota or rate limited.
+
+    Nothing is known about the query itself, so callers shouldn't cache
+    this as an empty result.
+    """
+
+
+class CircuitOpen(YouTubeUnavailable):
+    pass
+
+
+class QuotaExceeded(YouTubeUnavailable):
+    pass
+
+
+class RateLimited(YouTubeUnavailable):
+    pass
+
+
+class CircuitBreaker:
+    """Fail fast after ``threshold`` failures in a row.
+
+    Once open, calls are refused for ``cooldown`` seconds. After that
+    one trial call is let through (half-open): success closes the
+    circuit, failure opens it for another cooldown. A trial that ends
+    without an answer from the API must be given back with release().
+    """
+
+    def __init__(self, threshold=5, cooldown=60, clock=time.monotonic):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.clock = clock
+
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if self.clock() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        """"closed" or "trial" if a call may go ahead, None if not."""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return "closed"
+            if state == "half-open" and not self._trial:
+                self._trial = True
+                return "trial"
+            return None
+
+    def would_allow(self):
+        with self._lock:
+            state = self.state
+            return state == "closed" or (state == "half-open" and not self._trial)
+
+    def release(self):
+        # The trial call didn't reach the API; let the next one try
+        with self._lock:
+            self._trial = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.threshold:
+                self.opened_at = self.clock()
+            self._trial = False
+
+
+class QuotaTracker:
+    """Daily quota units spent, reset at midnight Pacific like the API's."""
+
+    def __init__(self, daily_limit=10000, now=None):
+        self.daily_limit = daily_limit
+        self.now = now or (lambda: datetime.now(QUOTA_TIMEZONE))
+
+        self.day = self.now().date()
+        self.used = 0
+        self.exhausted = False
+        self._lock = threading.Lock()
+
+    def _roll(self):
+        today = self.now().date()
+        if today != self.day:
+            self.day = today
+            self.used = 0
+            self.exhausted = False
+
+    def reserve(self, units):
+        with self._lock:
+            self._roll()
+            if self.exhausted or self.used + units > self.daily_limit:
+                return False
+            self.used += units
+            return True
+
+    def mark_exhausted(self):
+        # The API says so, whatever our own count is
+        with self._lock:
+            self._roll()
+            self.exhausted = True
+
+    def remaining(self):
+        with self._lock:
+            self._roll()
+            return 0 if self.exhausted else self.daily_limit - self.used
+
+
+class YouTubeClient:
+    """YouTube Data API client for video searches.
+
+    One pooled keep-alive session, (connect, read) timeouts, and up to
+    ``retries`` retries of timeouts, connection errors, 429s and 5xx
+    with full-jitter exponential backoff (``Retry-After`` is honoured).
+    Calls and each of their retries go through a token bucket (``rate``
+    per second, bursts of ``burst``), are charged against the daily quota, and stop for a
+    while once ``breaker_threshold`` calls in a row have failed.
+
+    ``base_url`` can point at a local fake server for testing, see
+    benchmarks/fake_youtube.py.
+    """
+
+    def __init__(self, api_key, base_url=DEFAULT_BASE_URL, timeout=(3.05, 4),
+                 retries=2, backoff=0.5, max_backoff=8, rate=5, burst=10,
+                 rate_wait=1, daily_quota=10000, breaker_threshold=5,
+                 breaker_cooldown=60, pool_size=8, session=None, sleep=time.sleep):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.rate_wait = rate_wait
+        self.sleep = sleep
+
+        self.bucket = TokenBucket(rate, burst)
+        self.quota = QuotaTracker(daily_quota)
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_cooldown)
+
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+
+        self._counters = {"calls": 0, "retries": 0, "failures": 0, "refused": 0}
+        self._lock = threading.Lock()
+
+    def available(self):
+        """False while calls would be refused outright."""
+        return self.breaker.would_allow() and self.quota.remaining() >= SEARCH_COST
+
+    def search(self, query, max_results=3):
+        data = self._get("search", {
+            "part": "snippet",
+            "q": query,
+            "type": "video",
+            "order": "viewCount",
+            "maxResults": max_results,
+        }, cost=SEARCH_COST)
+
+        return [
+            {
+                "title": item["snippet"]["title"],
+                "thumbnail": item["snippet"]["thumbnails"]["medium"]["url"],
+                "video_id": item["id"]["videoId"],
+                "url": f"https://www.youtube.com/watch?v={item['id']['videoId']}"
+            }
+            for item in data.get("items", [])
+        ]
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._counters)
+        data.update(
+            circuit=self.breaker.state,
+            quota_used=self.quota.used,
+            quota_remaining=self.quota.remaining(),
+        )
+        return data
+
+    # -------------------------
+    # Internals
+    # -------------------------
+
+    def _get(self, resource, params, cost):
+        # Rate limit first: a call refused here mustn't take the trial
+        if not self.bucket.acquire(timeout=self.rate_wait):
+            self._count("refused")
+            raise RateLimited("YouTube API rate limit reached")
+
+        permit = self.breaker.allow()
+        if permit is None:
+            self._count("refused")
+            raise CircuitOpen("YouTube API circuit is open")
+
+        try:
+            return self._attempt(resource, params, cost, permit)
+        except YouTubeError:
+            # Success or failure was recorded on the way out
+            raise
+        except BaseException:
+            # e.g. an invalid URL or an interrupt: says nothing about
+            # the API, but the trial must not stay taken
+            if permit == "trial":
+                self.breaker.release()
+            raise
+
+    def _attempt(self, resource, params, cost, permit):
+        attempt = 0
+        while True:
+            if not self.quota.reserve(cost):
+                self._count("refused")
+                # The API wasn't asked, so this says nothing about it;
+                # only give back the trial if this was one
+                if permit == "trial":
+                    self.breaker.release()
+                raise QuotaExceeded("Daily YouTube API quota used up")
+
+            self._count("calls")
+            try:
+                response = self.session.get(
+                    f"{self.base_url}/{resource}",
+                    params=dict(params, key=self.api_key),
+                    timeout=self.timeout
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error, retry_after = e, None
+            else:
+                if response.status_code < 400:
+                    self.breaker.record_success()
+                    return response.json()
+
+                if self._is_quota_error(response):
+                    self.quota.mark_exhausted()
+                    self.breaker.record_success()
+                    raise QuotaExceeded("YouTube API reports the quota as exceeded")
+
+                error = YouTubeError(f"YouTube API returned {response.status_code}")
+                if response.status_code != 429 and response.status_code < 500:
+                    # Our request is wrong; retrying won't help and the
+                    # API itself is fine
+                    self.breaker.record_success()
+                    raise error
+                retry_after = self._retry_after(response)
+
+            # Retries go through the rate limit like any other call; if
+            # there's no token for one, give up as if they had run out
+            if attempt >= self.retries or not self.bucket.acquire(timeout=self.rate_wait):
+                self._count("failures")
+                self.breaker.record_failure()
+                raise error
+
+            attempt += 1
+            self._count("retries")
+            self.sleep(retry_after if retry_after is not None else self._backoff(attempt))
+
+    def _backoff(self, attempt):
+        # Full jitter: spreads retries from many workers apart
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+
+    def _retry_after(self, response):
+        try:
+            return min(float(response.headers["Retry-After"]), self.max_backoff)
+        except (KeyError, ValueError):
+            return None
+
+    @staticmethod
+    def _is_quota_error(response):
+        if response.status_code != 403:
+            return False
+        try:
+            errors = response.json()["error"]["errors"]
+        except (ValueError, KeyError, TypeError):
+            return False
+        return any(e.get("reason") in ("quotaExceeded", "dailyLimitExceeded") for e in errors)
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
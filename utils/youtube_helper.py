@@ -1,35 +1,194 @@
 import os
-import requests
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from dotenv import load_dotenv
 
+from utils.video_cache import normalize_query, video_cache, video_lookup, youtube_search
+from utils.youtube_client import DEFAULT_BASE_URL, YouTubeClient, YouTubeUnavailable
+
 load_dotenv()
 
 API_KEY = os.getenv("YOUTUBE_API_KEY")
 
+# Per-request (connect, read) timeout and the default deadline for a batch
+REQUEST_TIMEOUT = (3.05, float(os.getenv("YOUTUBE_READ_TIMEOUT", "4")))
+BATCH_DEADLINE = float(os.getenv("YOUTUBE_BATCH_DEADLINE", "5"))
+MAX_WORKERS = int(os.getenv("YOUTUBE_MAX_WORKERS", "8"))
+
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+client = YouTubeClient(
+    API_KEY,
+    base_url=os.getenv("YOUTUBE_API_URL", DEFAULT_BASE_URL),
+    timeout=REQUEST_TIMEOUT,
+    retries=int(os.getenv("YOUTUBE_RETRIES", "2")),
+    rate=float(os.getenv("YOUTUBE_RATE", "5")),
+    burst=int(os.getenv("YOUTUBE_BURST", "10")),
+    daily_quota=int(os.getenv("YOUTUBE_DAILY_QUOTA", "10000")),
+    breaker_threshold=int(os.getenv("YOUTUBE_BREAKER_THRESHOLD", "5")),
+    breaker_cooldown=float(os.getenv("YOUTUBE_BREAKER_COOLDOWN", "60")),
+    pool_size=MAX_WORKERS
+)
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS,
+                               thread_name_prefix="youtube")
+
+
+def search_videos(topic):
+    started = time.perf_counter()
+    failed = True
+    refused = False
+    try:
+        videos = client.search(topic + " tutorial", max_results=3)
+        failed = False
+    except YouTubeUnavailable:
+        refused = True
+        raise
+    finally:
+        youtube_search.send(
+            "search_videos", seconds=time.perf_counter() - started,
+            failed=failed, refused=refused
+        )
+
+    return videos
+
+
+def _try_fetch_and_store(key, topic):
+    # None when the API refused the call (see YouTubeUnavailable)
+    try:
+        videos = search_videos(topic)
+    except YouTubeUnavailable:
+        return None
+    except Exception:
+        # Negative entry: don't hammer the API for the same failing query
+        videos = []
+
+    video_cache.store(key, videos)
+    return videos
+
+
+def _fetch_and_store(key, topic):
+    videos = _try_fetch_and_store(key, topic)
+    if videos is None:
+        # Nothing was asked: keep serving whatever is cached and let a
+        # later lookup try again once the API is back
+        videos, _ = video_cache.lookup(key)
+        return videos or []
+    return videos
+
+
+def _refresh_in_background(key, topic):
+    with _refreshing_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    def run():
+        try:
+            _fetch_and_store(key, topic)
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(key)
+
+    _executor.submit(run)
+
+
 def get_top_videos(topic):
-    search_url = "https://www.googleapis.com/youtube/v3/search"
-
-    params = {
-        "part": "snippet",
-        "q": topic + " tutorial",
-        "type": "video",
-        "order": "viewCount",
-        "maxResults": 3,
-        "key": API_KEY
-    }
-
-    response = requests.get(search_url, params=params)
-    data = response.json()
-
-    videos = []
-
-    for item in data.get("items", []):
-        video = {
-            "title": item["snippet"]["title"],
-            "thumbnail": item["snippet"]["thumbnails"]["medium"]["url"],
-            "video_id": item["id"]["videoId"],
-            "url": f"https://www.youtube.com/watch?v={item['id']['videoId']}"
-        }
-        videos.append(video)
-
-    return videos
\ No newline at end of file
+    started = time.perf_counter()
+    try:
+        return _get_top_videos(topic)
+    finally:
+        video_lookup.send(
+            "get_top_videos", topics=1, seconds=time.perf_counter() - started
+        )
+
+
+def _get_top_videos(topic):
+    key = normalize_query(topic)
+    if not key:
+        return []
+
+    videos, state = video_cache.lookup(key)
+
+    if state == "fresh":
+        return videos
+
+    if state == "stale":
+        # Serve what we have, refresh for the next caller
+        _refresh_in_background(key, topic)
+        return videos
+
+    return _fetch_and_store(key, topic)
+
+
+def get_top_videos_many(topics, deadline=BATCH_DEADLINE):
+    """Look up several topics at once, keyed by the topic as given.
+
+    Cache hits are answered inline; misses are fetched in parallel on a
+    shared, bounded pool. Topics still running when ``deadline`` seconds
+    have passed map to an empty list so one slow search can't stall the
+    page. Their fetches keep running and fill the cache for next time.
+    """
+    started = time.perf_counter()
+    results = {}
+    pending = {}
+
+    for topic in topics:
+        key = normalize_query(topic)
+        if topic in results or not key:
+            results.setdefault(topic, [])
+            continue
+
+        videos, state = video_cache.lookup(key)
+
+        if state is None:
+            if key not in pending:
+                pending[key] = _executor.submit(_fetch_and_store, key, topic)
+            results[topic] = None
+            continue
+
+        if state == "stale":
+            _refresh_in_background(key, topic)
+        results[topic] = videos
+
+    if pending:
+        wait(pending.values(), timeout=deadline)
+
+        by_key = {}
+        for key, future in pending.items():
+            by_key[key] = future.result() if future.done() else []
+
+        for topic, videos in results.items():
+            if videos is None:
+                results[topic] = by_key.get(normalize_query(topic), [])
+
+    video_lookup.send(
+        "get_top_videos_many", topics=len(results), seconds=time.perf_counter() - started
+    )
+    return results
+
+
+def prefetch_many(topics):
+    """Fetch every topic that isn't fresh in the cache, in parallel, and
+    wait for all of them.
+
+    Returns the topics the API refused (circuit open, quota used up or
+    rate limited), so the caller can try them again later.
+    """
+    pending = {}
+    for topic in topics:
+        key = normalize_query(topic)
+        if not key or key in pending:
+            continue
+
+        _, state = video_cache.lookup(key)
+        if state != "fresh":
+            pending[key] = (topic, _executor.submit(_try_fetch_and_store, key, topic))
+
+    return [topic for topic, future in pending.values() if future.result() is None]
+
+
+def video_cache_stats():
+    return video_cache.stats()